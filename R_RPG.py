@@ -1,17 +1,43 @@
 # ------------------------------------------------------------------  Setup  -------------------------------------------
 import sqlite3
 import random
+import threading
+import atexit
+import multiprocessing
+import argparse
+import time
+import sys
+import os
+import heapq
+import struct
+import json
+import functools
+import re
 from math import floor
+from collections import namedtuple
 
 positive_responses = ['yes', 'y', 'ya', 'yep', 'sure']
 negative_responses = ['no', 'n', 'na', 'nah', 'nope']
 response_list = positive_responses + negative_responses
+# Every battle and shop visit gets its own seed from this, setting RPG_SEED makes a whole session play out the same way
+seed_source = random.Random(os.environ.get("RPG_SEED"))
 
 # ----------------------------------------------------------------   Extra Additions ------------------------------------
 
 class Colours:  # Will be used to create coloured text
-    def __init__(self):
+    def __init__(self, plain=False):
         self.colour_dictionary = self.get_colour_dictionary()
+        self.effect_dictionary = self.get_effect_dictionary()
+        self.set_plain(plain)
+
+    def set_plain(self, plain):  # Plain text has no escape codes, for NO_COLOR terminals and battles nobody watches
+        self.plain = plain
+        # Labels that are shown every turn are only coloured once, entity names are added the first time they're shown
+        self.labels = {}
+        self.effect_labels = {name: self.return_colour_text(colour, name.title())
+                              for name, colour in self.effect_dictionary.items()}
+        for label in ["Gold", "Exp", "Level", "Mana Cost"]:
+            self.label("None", label)
 
     @staticmethod
     def get_colour_dictionary():
@@ -38,15 +64,25 @@ class Colours:  # Will be used to create coloured text
         return dictionary
 
     def return_colour_text(self, colour, text):
+        if self.plain:
+            return f"{text}"
         colour = self.colour_dictionary[colour]
         return f"\033[{colour}{text}\033[0;0m"
 
+    def label(self, colour, text):  # Memoised return_colour_text, only for text that is shown over and over
+        key = (colour, text)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = self.return_colour_text(colour, text)
+        return label
+
     def return_multiple_colour(self, colour, array):
         colour = self.colour_dictionary[colour]
         string = ','.join(self.return_colour_text(colour, *array))
         return string
 
-    def effect_colour(self, status_effect_name):
+    @staticmethod
+    def get_effect_dictionary():
         dictionary = {
             "burn": "red",
             "wet": "teal",
@@ -67,357 +103,643 @@ class Colours:  # Will be used to create coloured text
             "aoe": "red",
             "aggro": "orange"
         }
-        if status_effect_name in dictionary:
-            colour = dictionary[status_effect_name]
-            return self.return_colour_text(colour, status_effect_name.title())
-        else:
-            return status_effect_name.title()
+        return dictionary
+
+    def effect_colour(self, status_effect_name):
+        label = self.effect_labels.get(status_effect_name)
+        if label is None:  # Effects without a colour are just given a capital letter
+            label = self.effect_labels[status_effect_name] = status_effect_name.title()
+        return label
+
+
+colours = Colours(bool(os.environ.get("NO_COLOR")))  # Shared by everything that writes coloured text, see no-color.org
+
+
+class ScriptFinished(Exception):  # Raised by ScriptedIO when there are no keystrokes left to type
+    pass
+
+
+class GameIO:  # Every menu reads and writes through this, so the game can be played by a script instead of a keyboard
+    def input(self, prompt=""):
+        return input(prompt)
+
+    def print(self, *values, sep=" ", end="\n"):
+        print(*values, sep=sep, end=end)
+
+
+class ScriptedIO(GameIO):  # Inheritance, types out a list of keystrokes and keeps everything the game printed
+    def __init__(self, keystrokes, fallback=None, echo=False):
+        self.keystrokes = iter(keystrokes)
+        self.fallback = fallback  # Called with the prompt once the keystrokes run out, None ends the script instead
+        self.echo = echo  # Also shows the game on the screen, with each keystroke after its prompt
+        self.output = []
+        self.keystrokes_typed = 0
+
+    def input(self, prompt=""):
+        self.print(prompt, end="")
+        keystroke = next(self.keystrokes, None)
+        if keystroke is None:
+            if self.fallback is None:
+                raise ScriptFinished(f"The script ran out of keystrokes at: {self.get_last_line()!r}")
+            keystroke = self.fallback(prompt)
+        self.keystrokes_typed += 1
+        self.print(keystroke)
+        return keystroke
+
+    def print(self, *values, sep=" ", end="\n"):
+        text = sep.join(str(value) for value in values) + end
+        self.output.append(text)
+        if self.echo:
+            print(text, end="")
+
+    def get_last_line(self):  # The last line that had something on it, normally the question being asked
+        lines = self.get_last_lines(1)
+        return lines[0] if lines else ""
+
+    def get_last_lines(self, count):  # The question is printed before the "Enter a value" prompt, so is the one before
+        lines = []
+        for text in reversed(self.output):
+            lines = [line.strip() for line in text.strip().splitlines() if line.strip()] + lines
+            if len(lines) >= count:
+                break
+        return lines[-count:]
+
+    def clear(self):
+        self.output = []
+
+
+game_io = GameIO()  # Swapped for a ScriptedIO by the benchmarks and tests, every menu looks it up when it is used
+
+class BattleLog:  # Everything that happens in a battle is recorded through this, by default it is just printed
+    def record(self, event_type, message, **details):
+        game_io.print(message)
+
+    def start(self, battle):  # Called once both teams are ready
+        pass
+
+    def action(self, action_type, actor=None, target=None, sp_atk=None, number=0):  # What the player chose to do
+        pass
+
+    def finish(self, outcome):
+        pass
+
+
+class EventLog(BattleLog):  # Inheritance, keeps every event as a dictionary instead of printing it
+    # actor, attacker, entity and target hold the entities themselves, two monsters can share a name
+    def __init__(self):
+        self.events = []
+
+    def record(self, event_type, message, **details):
+        self.events.append({"type": event_type, "message": message, **details})
+
+
+console_log = BattleLog()  # Shared by every battle and entity that is being played at the keyboard
 
 # ----------------------------------------------------------------  Database Setup  ------------------------------------
 
 
-connection = sqlite3.connect('RPG_game_file_database')
-cursor = connection.cursor()
-
-# Creating the user table, decided to remove the one-to-one relationships in the previous database
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS USER
-            (user_id INTEGER PRIMARY KEY, 
-            save_file_name TEXT, 
-            lvl INTEGER DEFAULT 0,
-            exp INTEGER DEFAULT 0,
-            gold INTEGER DEFAULT 0,
-            pvp_games_won DEFAULT 0,
-            games_played INTEGER DEFAULT 0,
-            games_won INTEGER DEFAULT 0,
-            games_fled INTEGER DEFAULT 0,
-            games_lost INTEGER DEFAULT 0,
-            enemies_defeated INTEGER DEFAULT 0,
-            bosses_defeated INTEGER DEFAULT 0,
-            potions_used INTEGER DEFAULT 0,
-            lesser_hp_potion INTEGER DEFAULT 0, 
-            medium_hp_potion INTEGER DEFAULT 0,
-            grand_hp_potion INTEGER DEFAULT 0,
-            ph_atk_potion INTEGER DEFAULT 0,
-            ph_def_potion INTEGER DEFAULT 0,
-            sp_atk_potion INTEGER DEFAULT 0,
-            sp_def_potion INTEGER DEFAULT 0, 
-            crit_chance_potion INTEGER DEFAULT 0,
-            crit_damage_potion INTEGER DEFAULT 0
-            )''')
-
-# Creating the teams table, creating a relationship between the user id from both tables
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS TEAMS
-            (team_id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            hero_id_1 INTEGER,
-            hero_id_2 INTEGER,
-            hero_id_3 INTEGER,
-            hero_id_4 INTEGER,
-            hero_id_5 INTEGER,
-            hero_id_6 INTEGER,
-            FOREIGN KEY (user_id) REFERENCES USER (user_id))''')
-
-# Creating the heroes table, decided to shift them together and make user_id = None when they are built in
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS HEROES
-            (hero_id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            hero_name TEXT,
-            hp TEXT,
-            ph_atk TEXT, 
-            ph_def TEXT, 
-            sp_atk TEXT, 
-            sp_def TEXT, 
-            crit_rate TEXT, 
-            crit_damage TEXT,
-            FOREIGN KEY (user_id) REFERENCES USER (user_id))''')
-
-# Creating the status effects table
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS STATUS_EFFECTS
-            (status_id INTEGER PRIMARY KEY,
-            status_name TEXT,
-            status_description TEXT,
-            status_effect_1 TEXT,
-            status_effect_1_percentage INTEGER,
-            status_effect_2 TEXT,
-            status_effect_2_percentage INTEGER,
-            duration INTEGER DEFAULT 0,
-            condition_1 TEXT,
-            condition_2 TEXT
-            )''')  # Condition refers to the two effects combined to make that special attack
-
-# Creating the special attack table, this will store the built in special attacks
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS SP_ATK
-            (sp_atk_id INTEGER PRIMARY KEY,
-            sp_atk_name TEXT,
-            sp_atk_percentage INTEGER,
-            sp_atk_duration INTEGER,
-            status_id INTEGER,
-            mana_cost INTEGER,
-            FOREIGN KEY (status_id) REFERENCES STATUS_EFFECTS (status_id))''')
-
-# Creates the relationship between heroes and special attack in order to resolve a many-to-many relationship
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS HEROES_SP_ATK
-            (hero_id INTEGER,
-            sp_atk_id INTEGER,
-            FOREIGN KEY (hero_id) REFERENCES HEROES (hero_id),
-            FOREIGN KEY (sp_atk_id) REFERENCES SP_ATK (sp_atk_id))''')
-
-# Creates the monsters table
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS MONSTERS
-            (monster_id INTEGER PRIMARY KEY,
-            enemy_name TEXT,
-            enemy_type TEXT,
-            hp TEXT,
-            ph_atk TEXT, 
-            ph_def TEXT,
-            sp_atk TEXT,
-            sp_def TEXT,
-            gold INTEGER,
-            exp INTEGER)''')
-
-# Creates the shop_prices table, stores general data about items
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS SHOP_PRICES
-            (item_id INTEGER PRIMARY KEY,
-            item_name TEXT,
-            price INTEGER,
-            description TEXT)''')
-
-# Creates the POTIONS table to store the data for potions that will be used in battle
-cursor.execute('''
-            CREATE TABLE IF NOT EXISTS POTIONS
-            (item_id INTEGER PRIMARY KEY,
-            item_name TEXT,
-            percentage INTEGER,
-            stat TEXT,
-            duration INTEGER)''')
-
-connection = sqlite3.connect('RPG_game_file_database')
-cursor = connection.cursor()
-
-query = cursor.execute("SELECT * FROM HEROES")  # A check to see if data exists in the database
-if not query.fetchall():  # if data is already made, nothing will happen
-    # This section will create some fake users to test, this will be deleted towards the end of this project
-    records = [('save_1', 3000, 21, 2300000),
-               ('save_2', 23, 45, 54),
-               ('save_3', 45, 43, 32)]  # Some template user data
-    insert = """INSERT INTO USER (save_file_name, lvl, exp, gold)
-                VALUES (?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the built-in status effects
-    description = {
-        # Status effects
-        "wet": 'Inflicts the target the "wet" status, 10% chance for the affected entity to miss their attack.',
-        "jolt": 'Inflicts the target the "jolt" status, 5% chance to miss an attack and the target loses 2.5% hp'
-                ' each turn.',
-        "burn": 'Inflicts the target with the "burn" status, target loses 5% hp per turn and will also have their '
-                'physical attack lowered by 5%.',
-        "chill": 'Inflicts the target with the "chill" status, target loses 5% hp per turn and will also '
-                 'have their physical defence lowered by 5%.',
-        "dark": 'Inflicts the target with the "dark" status, target will have a 50% chance to miss an attack, however, '
-                'they will have an increased 50% physical attack.',
-        "light": 'Inflicts the target with the "light "status, the target will have a 50% chance to miss an attack, '
-                 'however they will have an increased 50% special attack.',
-        "shock": 'Inflicts the target with the "shock" status, user loses 5% hp per turn and there is also a 25% '
-                 'chance for them to miss an attack.',
-        "backfire": 'This status will be applied if the user attempts to attack while under jolt and fire, there will '
-                    'be a 30% chance of taking 50% of attack as damage. If avoided, there is a 10% chance of dealing '
-                    '200% of you attack to all enemies',
-        "freeze": 'This status will be applied when chill + wet statuses are applied to the target, the frozen target '
-                  'will not be able to attack for 4 turns and also take 50% extra damage from enemy attacks',
-        "holy_fire": 'This status will be applied when the light + burn statuses are applied to a target, all of their '
-                     'attacks will have a 20% chance to deal double damage. They will also lose 15% hp per turn',
-        "dark_flame": 'This status will be applied when light + burn statuses are applied to a target, all of their '
-                      'attacks will have a 10% chance to instantly kill their target, however, they will '
-                      'lose 30% hp per turn.',
-        # Heal effect
-        "heal_percentage": "The selected entity will be healed based on certain factors",
-        # Drain effect
-        "drain_atk": "The selected entity will be healed for 30% of their damage dealt to the enemy",
-        # Aoe effect
-        "aoe": "Damage worth 100% of special attack will be dealt to all enemies",
-        # Aggro effect
-        "aggro": "Deals some damage to the enemy and focuses the enemies attention to the attacker"
-    }
-    records = [
-        # Numbers refer to the effect if in the database
-        # Status effects
-        ("wet", description["wet"], "miss", 10, None, None, None, None),  # 1
-        ("jolt", description["jolt"], "miss", 5, "damage", 2, None, None),  # 2
-        ("burn", description["burn"], "damage", 5, "ph_atk_down", 5, None, None),  # 3
-        ("chill", description["chill"], "damage", 5, "ph_def_down", 5, None, None),  # 4
-        ("dark", description["dark"], "miss", 50, "ph_atk_up", 150, None, None),  # 5
-        ("light", description["light"], "miss", 50, "sp_atk_up", 150, None, None),  # 6
-        ("shock", description["shock"], "miss", 25, "damage", 5, "wet", "jolt"),  # 7
-        ("backfire", description["backfire"], "damage", 50, "aoe", 200, "jolt", "burn"),  # 8
-        ("freeze", description["freeze"], "miss", 100, "ph_def_down", 50, "chill", "wet"),  # 9
-        ("holy fire", description["holy_fire"], "double_dmg", 20, "damage", 15, "light", "burn"),  # 10
-        ("dark flame", description["dark_flame"], "instakill", 1000000, "damage", 30, "dark", "burn"),  # 11
-
-        # Healing effects
-        ("heal percentage hp", description["heal_percentage"], "heal_percentage", 20, None, None, None, None),  # 12
-        ("heal percentage atk", description["heal_percentage"], "heal_percentage", 30, None, None, None, None),  # 13
-
-        # Draining effects
-        ("drain_atk", description["drain_atk"], "drain_atk", 10, None, None, None, None),  # 14
-
-        # Aoe effects
-        ("aoe", description["aoe"], "aoe", 100, None, None, None, None),  # 15
-
-        # Aggro effects
-        ("aggro", description["aggro"], "aggro", 100, None, None, None, None)  # 16
-    ]
-    insert = """INSERT INTO STATUS_EFFECTS (status_name, status_description, status_effect_1, 
-    status_effect_1_percentage, status_effect_2, status_effect_2_percentage, condition_1, condition_2)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the built-in special attacks
-    records = [('Fire Strike', 120, 3, 3, 50),
-               ('Frost Strike', 110, 3, 4, 40),
-               ('Fire Ball', 130, 2, 3, 50),
-               ('Frost Ball', 120, 2, 4, 50),
-               ('Lightning Strike', 150, 2, 2, 50),
-               ('Thunder Bolt', 130, 3, 2, 40),
-               ('Rain Slash', 120, 4, 1, 30),
-               ('Blinding Light', 150, 2, 6, 50),
-               ('Holy Smash', 130, 3, 6, 30),
-               ('Dark Ball', 120, 2, 5, 50),
-               ('Dark Slash', 110, 3, 5, 30),
-               ('Heal', 100, 1, 13, 30),
-               ('Soul Siphon', 130, 1, 14, 50),
-               ('Life Steal', 120, 1, 14, 50),
-               ('Electricute', 130, 3, 2, 50),
-               ('Hellish Fire', 160, 3, 3, 40),
-               ('Frozen Winds', 150, 3, 4, 60),
-               ('Corrupt', 140, 2, 5, 50),
-               ('Water Ball', 120, 3, 1, 30),
-               ('Purify', 120, 2, 6, 30),
-               ('Frost Arrow', 150, 3, 4, 50),
-               ('Flaming Arrow', 130, 2, 3, 40),
-               ('Holy Arrow', 160, 3, 6, 50),
-               ('Corrupt Arrow', 130, 2, 5, 40),
-               ('Heal', 10, 3, 12, 30),
-               ('Explode', 100, 1, 15, 40),
-               ('Taunt', 130, 3, 16, 50)
-               ]
-    insert = """INSERT INTO SP_ATK (sp_atk_name, sp_atk_percentage, sp_atk_duration, status_id, mana_cost)
-                VALUES (?, ?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the built-in Heroes
-    records = [('0', 'Knight 1', 'v high', 'high', 'e low', 'low', 'medium', 5, 150),
-               ('0', 'Knight 2', 'high', 'high', 'medium', 'medium', 'e low', 5, 150),
-               ('0', 'Knight 3', 'high', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Knight 4', 'v high', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Knight 5', 'medium', 'high', 'high', 'medium', 'e low', 5, 150),
-               ('0', 'Archer 1', 'low', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Archer 2', 'medium', 'high', 'high', 'medium', 'e low', 5, 150),
-               ('0', 'Archer 3', 'low', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Archer 4', 'e high', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Archer 5', 'low', 'high', 'medium', 'high', 'e low', 5, 150),
-               ('0', 'Wizard 1', 'high', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Wizard 2', 'e high', 'high', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Wizard 3', 'low', 'high', 'e low', 'medium', 'medium', 5, 150),
-               ('0', 'Wizard 4', 'e low', 'high', 'medium', 'e high', 'e low', 5, 150),
-               ('0', 'Wizard 5', 'high', 'e low', 'high', 'medium', 'medium', 5, 150),
-               ('0', 'Tank 1', 'e high', 'high', 'e high', 'low', 'e high', 5, 150),
-               ('0', 'Tank 2', 'high', 'medium', 'e high', 'high', 'v high', 5, 150),
-               ('0', 'Healer 1', 'medium', 'high', 'e low', 'medium', 'e low', 5, 150),
-               ('0', 'Healer 2', 'e high', 'e low', 'high', 'medium', 'medium', 5, 150),
-               ]
-    # The 0 for user_id means that it will be picked up by the system as a hero available for all users
-    insert = """INSERT INTO HEROES (user_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the built-in Monsters
-    records = [('Lesser Goblin', 'weak', 'e low', 'e low', 'low', 'v low', 'v low', 10, 5),
-               ('Lesser Demon', 'weak', 'v low', 'v low', 'low', 'v low', 'v low', 12, 6),
-               ('Lesser Orc', 'weak', 'low', 'e low', 'medium', 'e low', 'v low', 13, 7),
-               ('Lesser Troll', 'weak', 'v low', 'medium', 'low', 'v low', 'v low', 13, 12),
-               ('Lesser Bandit', 'weak', 'e low', 'medium', 'medium', 'low', 'v low', 9, 12),
-               ('Fallen Knight', 'weak', 'v low', 'medium', 'low', 'v low', 'v low', 12, 12),
-               ('Lesser Witch', 'weak', 'e low', 'e low', 'low', 'low', 'low', 13, 14),
-               ('Lesser Reptile', 'weak', 'medium', 'e low', 'medium', 'medium', 'v low', 12, 9),
-               ('Lesser Wizard', 'weak', 'high', 'medium', 'low', 'v low', 'medium', 13, 12),
-               ('Armed Goblin', 'medium', 'high', 'e low', 'low', 'medium', 'v low', 20, 21),
-               ('Armed Bandit', 'medium', 'medium', 'medium', 'low', 'medium', 'medium', 23, 19),
-               ('Armed Knight', 'medium', 'high', 'e low', 'low', 'medium', 'v low', 15, 25),
-               ('Witch Apprentice', 'medium', 'e high', 'medium', 'low', 'medium', 'v low', 23, 21),
-               ('Corrupt Knight', 'medium', 'e high', 'medium', 'low', 'v low', 'medium', 23, 22),
-               ('Fallen Angel', 'medium', 'e high', 'medium', 'medium', 'medium', 'v low', 22, 19),
-               ('Giant Orc', 'strong', 'e high', 'medium', 'medium', 'v low', 'v low', 30, 23),
-               ('Giant Troll', 'strong', 'e low', 'e low', 'medium', 'v low', 'v low', 35, 25),
-               ('Bandit Leader', 'strong', 'medium', 'e low', 'medium', 'v low', 'v low', 32, 25),
-               ('Goblin Leader', 'strong', 'v high', 'e low', 'medium', 'v low', 'v low', 29, 35),
-               ('Arch Wizard', 'strong', 'high', 'e low', 'medium', 'high', 'v high', 35, 32),
-               ('Arch Demon', 'strong', 'high', 'medium', 'medium', 'medium', 'v high', 32, 34),
-               ('Arch Witch', 'strong', 'medium', 'high', 'high', 'high', 'v high', 33, 36),
-               ('Cthulhu', 'boss', 'e high', 'e high', 'high', 'v high', 'v high', 100, 100),
-               ('Cerberus', 'boss', 'e high', 'v high', 'e high', 'medium', 'v high', 100, 100),
-               ('Demon King', 'boss', 'e high', 'e high', 'v high', 'v high', 'v high', 100, 100),
-               ('Corrupt King', 'boss', 'e high', 'e high', 'high', 'v high', 'v high', 100, 100),
-               ]
-    insert = """INSERT INTO MONSTERS (enemy_name, enemy_type, hp, ph_atk, ph_def, sp_atk, sp_def, gold, exp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the link between built in heroes and sp_atk
-    records = [(1, 1), (1, 2), (2, 2), (2, 3), (3, 4), (3, 6),
-               (4, 5), (4, 8), (5, 5), (5, 9), (6, 21), (6, 22),
-               (7, 22), (7, 23), (8, 24), (8, 23), (9, 22),
-               (9, 21), (10, 22), (10, 21), (11, 10), (11, 12),
-               (12, 15), (12, 7), (13, 19), (13, 16), (14, 17),
-               (14, 16), (15, 18), (15, 19), (16, 20), (16, 21),
-               (17, 22), (17, 23), (18, 14), (18, 12), (19, 13),
-               (19, 12)
-               ]
-    insert = """INSERT INTO HEROES_SP_ATK (hero_id, sp_atk_id)
-                VALUES (?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    # This section will create the shop prices table
-    records = [('Lesser Hp Potion', 500, 'Heals the selected user for 5-10% of max hp.'),
-               ('Medium Hp Potion', 2000, 'Heals the selected user for 10-20%% of max hp.'),
-               ('Grand Hp Potion', 20000, 'Heals the selected user for 20-50% of max hp.'),
-               ('Ph Atk Potion', 1000, 'Increases the selected user\'s ph_atk by 20% for 3 turns'),
-               ('Ph Def Potion', 300, 'Increases the selected user\'s ph_def by 30% for 4 turns'),
-               ('Sp Atk Potion', 1000, 'Increases the selected user\'s sp_atk by 20% for 3 turns'),
-               ('Sp Def Potion', 300, 'Increases the selected user\'s sp_def by 30% for 4 turns'),
-               ('Crit Rate potion', 500, 'Increases the selected user\'s crit rate by 5% for 5 turns'),
-               ('Crit Damage Potion', 500, 'Increases the user\'s crit damage by 100% for 5 turns'),
-               ('Hero', 10000, 'You will be given a unique hero with randomly generated stats and sp_atks.'
-                               'Re-rolling the stats/sp_atks will cost 1000 gold per roll')
-               ]
-    insert = """INSERT INTO SHOP_PRICES (item_name, price, description)
-                VALUES (?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    records = [('Lesser Hp Potion', 5, 'hp', 0),
-               ('Medium Hp Potion', 10, 'hp', 0),
-               ('Grand Hp Potion', 20, 'hp', 0),
-               ('Ph Atk Potion', 20, 'ph_atk', 3),
-               ('Ph Def Potion', 30, 'ph_def', 4),
-               ('Sp Atk Potion', 20, 'sp_atk', 3),
-               ('Sp Def Potion', 30, 'sp_def', 4),
-               ('Crit Rate Potion', 5, 'crit_rate', 5),
-               ('Crit Damage Potion', 100, 'crit_damage', 5)
-               ]
-    insert = """INSERT INTO POTIONS (item_name, percentage, stat, duration)
-                VALUES  (?, ?, ?, ?)"""
-    cursor.executemany(insert, [i for i in records])
-
-    connection.commit()
-    # Saves the file
+class ConnectionPool:  # Shares one long-lived connection per thread instead of opening one for every statement
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.local = threading.local()  # Each thread gets its own connection as sqlite connections aren't thread safe
+        self.connections = []  # Every connection made, so they can all be closed on shutdown
+        self.lock = threading.Lock()
+        self.migrated = False  # The save file is only opened and brought up to date when it is first needed
+
+    def get_connection(self):
+        conn = getattr(self.local, "connection", None)
+        if conn is None:
+            # check_same_thread is turned off so that close_all can close connections made by other threads
+            conn = sqlite3.connect(self.file_name, check_same_thread=False,
+                                   factory=sqlite3.Connection if sql_tracer is None else TracingConnection)
+            self.local.connection = conn
+            with self.lock:
+                self.connections.append(conn)
+                if not self.migrated:
+                    migrate(conn)
+                    self.migrated = True
+        return conn
+
+    def close_all(self):  # Called on shutdown, any later use of the pool will simply reconnect
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+            self.local = threading.local()
+
+
+class SQLTracer:  # Records every statement the game runs, turned on by setting RPG_SQL_TRACE to a file name
+    def __init__(self, path):
+        self.path = path
+        self.records = []  # (screen, visit, turn, caller, statement, seconds, rows)
+        self.visits = []  # (screen, visit) for every screen shown, including those that ran no statements
+        self.screen = None
+        self.visit = 0  # Goes up every time a screen is shown, so statements can be counted per visit
+        self.turn = None  # The battle turn, None outside of a battle
+        self.lock = threading.Lock()
+
+    def set_screen(self, name):
+        self.screen = name
+        self.visit += 1
+        self.turn = None
+        with self.lock:
+            self.visits.append((name, self.visit))
+
+    def record(self, statement, seconds, rows):
+        caller = sys._getframe(2)
+        while caller.f_back is not None and self.get_caller_name(caller).split(".")[0] in ("SQLite", "TracingCursor"):
+            caller = caller.f_back
+        record = [self.screen, self.visit, self.turn, self.get_caller_name(caller), statement, seconds, rows]
+        with self.lock:
+            self.records.append(record)
+            if len(self.records) >= 5000:
+                self.write()
+        return record
+
+    @staticmethod
+    def get_caller_name(frame):  # co_qualname is only on python 3.11+, older versions take the class from self
+        name = getattr(frame.f_code, "co_qualname", None)
+        if name is None:
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name if owner is None else f"{type(owner).__name__}.{frame.f_code.co_name}"
+        return name
+
+    def write(self):  # Adds the records to the end of the trace file, one JSON object per line
+        records, self.records = self.records, []
+        visits, self.visits = self.visits, []
+        lines = [json.dumps({"screen": screen, "visit": visit}) for screen, visit in visits]  # No statement, just a visit
+        lines += [json.dumps({"screen": screen, "visit": visit, "turn": turn, "caller": caller, "statement": statement,
+                              "fingerprint": get_fingerprint(statement), "ms": round(seconds * 1000, 4), "rows": rows})
+                  for screen, visit, turn, caller, statement, seconds, rows in records]
+        if lines:
+            with open(self.path, "a") as file:
+                file.write("\n".join(lines) + "\n")
+
+    def flush(self):
+        with self.lock:
+            self.write()
+
+
+class TracingCursor(sqlite3.Cursor):  # Inheritance, times each statement and counts the rows that come back
+    trace_record = None
+
+    def execute(self, sql_statement, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql_statement, parameters)
+        self.trace_record = sql_tracer.record(sql_statement, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql_statement, parameters):
+        start = time.perf_counter()
+        super().executemany(sql_statement, parameters)
+        self.trace_record = sql_tracer.record(sql_statement, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def fetch(self, method, *arguments):  # Fetching is part of the statement's time, SELECTs only step once fetched
+        start = time.perf_counter()
+        rows = method(*arguments)
+        if self.trace_record is not None:
+            self.trace_record[5] += time.perf_counter() - start
+            self.trace_record[6] += len(rows) if isinstance(rows, list) else int(rows is not None)
+        return rows
+
+    def fetchall(self):
+        return self.fetch(super().fetchall)
+
+    def fetchone(self):
+        return self.fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self.fetch(super().fetchmany, size or self.arraysize)
+
+
+class TracingConnection(sqlite3.Connection):  # Inheritance, hands out tracing cursors
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+
+def get_fingerprint(statement):  # The statement with its values taken out, so repeats of the same query group together
+    fingerprint = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    fingerprint = re.sub(r"\b\d+(?:\.\d+)?\b", "?", fingerprint)
+    fingerprint = re.sub(r"\s+", " ", fingerprint).strip()
+    return re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?, ...)", fingerprint)
+
+
+# Off unless RPG_SQL_TRACE is set, the pool then makes tracing connections and the records are written out on exit
+sql_tracer = SQLTracer(os.environ["RPG_SQL_TRACE"]) if os.environ.get("RPG_SQL_TRACE") else None
+if sql_tracer is not None:
+    atexit.register(sql_tracer.flush)
+
+# The save file can be moved with the RPG_DATABASE environment variable, the benchmarks use this to start from scratch
+connection_pool = ConnectionPool(os.environ.get("RPG_DATABASE", "RPG_game_file_database"))
+replay_path = os.environ.get("RPG_REPLAYS", "RPG_game_replays")  # Every battle is added to this, "" turns it off
+atexit.register(connection_pool.close_all)  # Makes sure every file handle is released when the game is closed
+
+
+def create_tables(cursor):  # Schema version 1, the original tables and the built-in game data
+    # Creating the user table, decided to remove the one-to-one relationships in the previous database
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS USER
+                (user_id INTEGER PRIMARY KEY, 
+                save_file_name TEXT, 
+                lvl INTEGER DEFAULT 0,
+                exp INTEGER DEFAULT 0,
+                gold INTEGER DEFAULT 0,
+                pvp_games_won DEFAULT 0,
+                games_played INTEGER DEFAULT 0,
+                games_won INTEGER DEFAULT 0,
+                games_fled INTEGER DEFAULT 0,
+                games_lost INTEGER DEFAULT 0,
+                enemies_defeated INTEGER DEFAULT 0,
+                bosses_defeated INTEGER DEFAULT 0,
+                potions_used INTEGER DEFAULT 0,
+                lesser_hp_potion INTEGER DEFAULT 0, 
+                medium_hp_potion INTEGER DEFAULT 0,
+                grand_hp_potion INTEGER DEFAULT 0,
+                ph_atk_potion INTEGER DEFAULT 0,
+                ph_def_potion INTEGER DEFAULT 0,
+                sp_atk_potion INTEGER DEFAULT 0,
+                sp_def_potion INTEGER DEFAULT 0, 
+                crit_chance_potion INTEGER DEFAULT 0,
+                crit_damage_potion INTEGER DEFAULT 0
+                )''')
+
+    # Creating the teams table, creating a relationship between the user id from both tables
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS TEAMS
+                (team_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                hero_id_1 INTEGER,
+                hero_id_2 INTEGER,
+                hero_id_3 INTEGER,
+                hero_id_4 INTEGER,
+                hero_id_5 INTEGER,
+                hero_id_6 INTEGER,
+                FOREIGN KEY (user_id) REFERENCES USER (user_id))''')
+
+    # Creating the heroes table, decided to shift them together and make user_id = None when they are built in
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS HEROES
+                (hero_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                hero_name TEXT,
+                hp TEXT,
+                ph_atk TEXT, 
+                ph_def TEXT, 
+                sp_atk TEXT, 
+                sp_def TEXT, 
+                crit_rate TEXT, 
+                crit_damage TEXT,
+                FOREIGN KEY (user_id) REFERENCES USER (user_id))''')
+
+    # Creating the status effects table
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS STATUS_EFFECTS
+                (status_id INTEGER PRIMARY KEY,
+                status_name TEXT,
+                status_description TEXT,
+                status_effect_1 TEXT,
+                status_effect_1_percentage INTEGER,
+                status_effect_2 TEXT,
+                status_effect_2_percentage INTEGER,
+                duration INTEGER DEFAULT 0,
+                condition_1 TEXT,
+                condition_2 TEXT
+                )''')  # Condition refers to the two effects combined to make that special attack
+
+    # Creating the special attack table, this will store the built in special attacks
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS SP_ATK
+                (sp_atk_id INTEGER PRIMARY KEY,
+                sp_atk_name TEXT,
+                sp_atk_percentage INTEGER,
+                sp_atk_duration INTEGER,
+                status_id INTEGER,
+                mana_cost INTEGER,
+                FOREIGN KEY (status_id) REFERENCES STATUS_EFFECTS (status_id))''')
+
+    # Creates the relationship between heroes and special attack in order to resolve a many-to-many relationship
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS HEROES_SP_ATK
+                (hero_id INTEGER,
+                sp_atk_id INTEGER,
+                FOREIGN KEY (hero_id) REFERENCES HEROES (hero_id),
+                FOREIGN KEY (sp_atk_id) REFERENCES SP_ATK (sp_atk_id))''')
+
+    # Creates the monsters table
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS MONSTERS
+                (monster_id INTEGER PRIMARY KEY,
+                enemy_name TEXT,
+                enemy_type TEXT,
+                hp TEXT,
+                ph_atk TEXT, 
+                ph_def TEXT,
+                sp_atk TEXT,
+                sp_def TEXT,
+                gold INTEGER,
+                exp INTEGER)''')
+
+    # Creates the shop_prices table, stores general data about items
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS SHOP_PRICES
+                (item_id INTEGER PRIMARY KEY,
+                item_name TEXT,
+                price INTEGER,
+                description TEXT)''')
+
+    # Creates the POTIONS table to store the data for potions that will be used in battle
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS POTIONS
+                (item_id INTEGER PRIMARY KEY,
+                item_name TEXT,
+                percentage INTEGER,
+                stat TEXT,
+                duration INTEGER)''')
+
+    query = cursor.execute("SELECT * FROM HEROES")  # A check to see if data exists in the database
+    if not query.fetchall():  # if data is already made, nothing will happen
+        # This section will create some fake users to test, this will be deleted towards the end of this project
+        records = [('save_1', 3000, 21, 2300000),
+                   ('save_2', 23, 45, 54),
+                   ('save_3', 45, 43, 32)]  # Some template user data
+        insert = """INSERT INTO USER (save_file_name, lvl, exp, gold)
+                    VALUES (?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the built-in status effects
+        description = {
+            # Status effects
+            "wet": 'Inflicts the target the "wet" status, 10% chance for the affected entity to miss their attack.',
+            "jolt": 'Inflicts the target the "jolt" status, 5% chance to miss an attack and the target loses 2.5% hp'
+                    ' each turn.',
+            "burn": 'Inflicts the target with the "burn" status, target loses 5% hp per turn and will also have their '
+                    'physical attack lowered by 5%.',
+            "chill": 'Inflicts the target with the "chill" status, target loses 5% hp per turn and will also '
+                     'have their physical defence lowered by 5%.',
+            "dark": 'Inflicts the target with the "dark" status, target will have a 50% chance to miss an attack, however, '
+                    'they will have an increased 50% physical attack.',
+            "light": 'Inflicts the target with the "light "status, the target will have a 50% chance to miss an attack, '
+                     'however they will have an increased 50% special attack.',
+            "shock": 'Inflicts the target with the "shock" status, user loses 5% hp per turn and there is also a 25% '
+                     'chance for them to miss an attack.',
+            "backfire": 'This status will be applied if the user attempts to attack while under jolt and fire, there will '
+                        'be a 30% chance of taking 50% of attack as damage. If avoided, there is a 10% chance of dealing '
+                        '200% of you attack to all enemies',
+            "freeze": 'This status will be applied when chill + wet statuses are applied to the target, the frozen target '
+                      'will not be able to attack for 4 turns and also take 50% extra damage from enemy attacks',
+            "holy_fire": 'This status will be applied when the light + burn statuses are applied to a target, all of their '
+                         'attacks will have a 20% chance to deal double damage. They will also lose 15% hp per turn',
+            "dark_flame": 'This status will be applied when light + burn statuses are applied to a target, all of their '
+                          'attacks will have a 10% chance to instantly kill their target, however, they will '
+                          'lose 30% hp per turn.',
+            # Heal effect
+            "heal_percentage": "The selected entity will be healed based on certain factors",
+            # Drain effect
+            "drain_atk": "The selected entity will be healed for 30% of their damage dealt to the enemy",
+            # Aoe effect
+            "aoe": "Damage worth 100% of special attack will be dealt to all enemies",
+            # Aggro effect
+            "aggro": "Deals some damage to the enemy and focuses the enemies attention to the attacker"
+        }
+        records = [
+            # Numbers refer to the effect if in the database
+            # Status effects
+            ("wet", description["wet"], "miss", 10, None, None, None, None),  # 1
+            ("jolt", description["jolt"], "miss", 5, "damage", 2, None, None),  # 2
+            ("burn", description["burn"], "damage", 5, "ph_atk_down", 5, None, None),  # 3
+            ("chill", description["chill"], "damage", 5, "ph_def_down", 5, None, None),  # 4
+            ("dark", description["dark"], "miss", 50, "ph_atk_up", 150, None, None),  # 5
+            ("light", description["light"], "miss", 50, "sp_atk_up", 150, None, None),  # 6
+            ("shock", description["shock"], "miss", 25, "damage", 5, "wet", "jolt"),  # 7
+            ("backfire", description["backfire"], "damage", 50, "aoe", 200, "jolt", "burn"),  # 8
+            ("freeze", description["freeze"], "miss", 100, "ph_def_down", 50, "chill", "wet"),  # 9
+            ("holy fire", description["holy_fire"], "double_dmg", 20, "damage", 15, "light", "burn"),  # 10
+            ("dark flame", description["dark_flame"], "instakill", 1000000, "damage", 30, "dark", "burn"),  # 11
+
+            # Healing effects
+            ("heal percentage hp", description["heal_percentage"], "heal_percentage", 20, None, None, None, None),  # 12
+            ("heal percentage atk", description["heal_percentage"], "heal_percentage", 30, None, None, None, None),  # 13
+
+            # Draining effects
+            ("drain_atk", description["drain_atk"], "drain_atk", 10, None, None, None, None),  # 14
+
+            # Aoe effects
+            ("aoe", description["aoe"], "aoe", 100, None, None, None, None),  # 15
+
+            # Aggro effects
+            ("aggro", description["aggro"], "aggro", 100, None, None, None, None)  # 16
+        ]
+        insert = """INSERT INTO STATUS_EFFECTS (status_name, status_description, status_effect_1, 
+        status_effect_1_percentage, status_effect_2, status_effect_2_percentage, condition_1, condition_2)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the built-in special attacks
+        records = [('Fire Strike', 120, 3, 3, 50),
+                   ('Frost Strike', 110, 3, 4, 40),
+                   ('Fire Ball', 130, 2, 3, 50),
+                   ('Frost Ball', 120, 2, 4, 50),
+                   ('Lightning Strike', 150, 2, 2, 50),
+                   ('Thunder Bolt', 130, 3, 2, 40),
+                   ('Rain Slash', 120, 4, 1, 30),
+                   ('Blinding Light', 150, 2, 6, 50),
+                   ('Holy Smash', 130, 3, 6, 30),
+                   ('Dark Ball', 120, 2, 5, 50),
+                   ('Dark Slash', 110, 3, 5, 30),
+                   ('Heal', 100, 1, 13, 30),
+                   ('Soul Siphon', 130, 1, 14, 50),
+                   ('Life Steal', 120, 1, 14, 50),
+                   ('Electricute', 130, 3, 2, 50),
+                   ('Hellish Fire', 160, 3, 3, 40),
+                   ('Frozen Winds', 150, 3, 4, 60),
+                   ('Corrupt', 140, 2, 5, 50),
+                   ('Water Ball', 120, 3, 1, 30),
+                   ('Purify', 120, 2, 6, 30),
+                   ('Frost Arrow', 150, 3, 4, 50),
+                   ('Flaming Arrow', 130, 2, 3, 40),
+                   ('Holy Arrow', 160, 3, 6, 50),
+                   ('Corrupt Arrow', 130, 2, 5, 40),
+                   ('Heal', 10, 3, 12, 30),
+                   ('Explode', 100, 1, 15, 40),
+                   ('Taunt', 130, 3, 16, 50)
+                   ]
+        insert = """INSERT INTO SP_ATK (sp_atk_name, sp_atk_percentage, sp_atk_duration, status_id, mana_cost)
+                    VALUES (?, ?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the built-in Heroes
+        records = [('0', 'Knight 1', 'v high', 'high', 'e low', 'low', 'medium', 5, 150),
+                   ('0', 'Knight 2', 'high', 'high', 'medium', 'medium', 'e low', 5, 150),
+                   ('0', 'Knight 3', 'high', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Knight 4', 'v high', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Knight 5', 'medium', 'high', 'high', 'medium', 'e low', 5, 150),
+                   ('0', 'Archer 1', 'low', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Archer 2', 'medium', 'high', 'high', 'medium', 'e low', 5, 150),
+                   ('0', 'Archer 3', 'low', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Archer 4', 'e high', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Archer 5', 'low', 'high', 'medium', 'high', 'e low', 5, 150),
+                   ('0', 'Wizard 1', 'high', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Wizard 2', 'e high', 'high', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Wizard 3', 'low', 'high', 'e low', 'medium', 'medium', 5, 150),
+                   ('0', 'Wizard 4', 'e low', 'high', 'medium', 'e high', 'e low', 5, 150),
+                   ('0', 'Wizard 5', 'high', 'e low', 'high', 'medium', 'medium', 5, 150),
+                   ('0', 'Tank 1', 'e high', 'high', 'e high', 'low', 'e high', 5, 150),
+                   ('0', 'Tank 2', 'high', 'medium', 'e high', 'high', 'v high', 5, 150),
+                   ('0', 'Healer 1', 'medium', 'high', 'e low', 'medium', 'e low', 5, 150),
+                   ('0', 'Healer 2', 'e high', 'e low', 'high', 'medium', 'medium', 5, 150),
+                   ]
+        # The 0 for user_id means that it will be picked up by the system as a hero available for all users
+        insert = """INSERT INTO HEROES (user_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the built-in Monsters
+        records = [('Lesser Goblin', 'weak', 'e low', 'e low', 'low', 'v low', 'v low', 10, 5),
+                   ('Lesser Demon', 'weak', 'v low', 'v low', 'low', 'v low', 'v low', 12, 6),
+                   ('Lesser Orc', 'weak', 'low', 'e low', 'medium', 'e low', 'v low', 13, 7),
+                   ('Lesser Troll', 'weak', 'v low', 'medium', 'low', 'v low', 'v low', 13, 12),
+                   ('Lesser Bandit', 'weak', 'e low', 'medium', 'medium', 'low', 'v low', 9, 12),
+                   ('Fallen Knight', 'weak', 'v low', 'medium', 'low', 'v low', 'v low', 12, 12),
+                   ('Lesser Witch', 'weak', 'e low', 'e low', 'low', 'low', 'low', 13, 14),
+                   ('Lesser Reptile', 'weak', 'medium', 'e low', 'medium', 'medium', 'v low', 12, 9),
+                   ('Lesser Wizard', 'weak', 'high', 'medium', 'low', 'v low', 'medium', 13, 12),
+                   ('Armed Goblin', 'medium', 'high', 'e low', 'low', 'medium', 'v low', 20, 21),
+                   ('Armed Bandit', 'medium', 'medium', 'medium', 'low', 'medium', 'medium', 23, 19),
+                   ('Armed Knight', 'medium', 'high', 'e low', 'low', 'medium', 'v low', 15, 25),
+                   ('Witch Apprentice', 'medium', 'e high', 'medium', 'low', 'medium', 'v low', 23, 21),
+                   ('Corrupt Knight', 'medium', 'e high', 'medium', 'low', 'v low', 'medium', 23, 22),
+                   ('Fallen Angel', 'medium', 'e high', 'medium', 'medium', 'medium', 'v low', 22, 19),
+                   ('Giant Orc', 'strong', 'e high', 'medium', 'medium', 'v low', 'v low', 30, 23),
+                   ('Giant Troll', 'strong', 'e low', 'e low', 'medium', 'v low', 'v low', 35, 25),
+                   ('Bandit Leader', 'strong', 'medium', 'e low', 'medium', 'v low', 'v low', 32, 25),
+                   ('Goblin Leader', 'strong', 'v high', 'e low', 'medium', 'v low', 'v low', 29, 35),
+                   ('Arch Wizard', 'strong', 'high', 'e low', 'medium', 'high', 'v high', 35, 32),
+                   ('Arch Demon', 'strong', 'high', 'medium', 'medium', 'medium', 'v high', 32, 34),
+                   ('Arch Witch', 'strong', 'medium', 'high', 'high', 'high', 'v high', 33, 36),
+                   ('Cthulhu', 'boss', 'e high', 'e high', 'high', 'v high', 'v high', 100, 100),
+                   ('Cerberus', 'boss', 'e high', 'v high', 'e high', 'medium', 'v high', 100, 100),
+                   ('Demon King', 'boss', 'e high', 'e high', 'v high', 'v high', 'v high', 100, 100),
+                   ('Corrupt King', 'boss', 'e high', 'e high', 'high', 'v high', 'v high', 100, 100),
+                   ]
+        insert = """INSERT INTO MONSTERS (enemy_name, enemy_type, hp, ph_atk, ph_def, sp_atk, sp_def, gold, exp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the link between built in heroes and sp_atk
+        records = [(1, 1), (1, 2), (2, 2), (2, 3), (3, 4), (3, 6),
+                   (4, 5), (4, 8), (5, 5), (5, 9), (6, 21), (6, 22),
+                   (7, 22), (7, 23), (8, 24), (8, 23), (9, 22),
+                   (9, 21), (10, 22), (10, 21), (11, 10), (11, 12),
+                   (12, 15), (12, 7), (13, 19), (13, 16), (14, 17),
+                   (14, 16), (15, 18), (15, 19), (16, 20), (16, 21),
+                   (17, 22), (17, 23), (18, 14), (18, 12), (19, 13),
+                   (19, 12)
+                   ]
+        insert = """INSERT INTO HEROES_SP_ATK (hero_id, sp_atk_id)
+                    VALUES (?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        # This section will create the shop prices table
+        records = [('Lesser Hp Potion', 500, 'Heals the selected user for 5-10% of max hp.'),
+                   ('Medium Hp Potion', 2000, 'Heals the selected user for 10-20%% of max hp.'),
+                   ('Grand Hp Potion', 20000, 'Heals the selected user for 20-50% of max hp.'),
+                   ('Ph Atk Potion', 1000, 'Increases the selected user\'s ph_atk by 20% for 3 turns'),
+                   ('Ph Def Potion', 300, 'Increases the selected user\'s ph_def by 30% for 4 turns'),
+                   ('Sp Atk Potion', 1000, 'Increases the selected user\'s sp_atk by 20% for 3 turns'),
+                   ('Sp Def Potion', 300, 'Increases the selected user\'s sp_def by 30% for 4 turns'),
+                   ('Crit Rate potion', 500, 'Increases the selected user\'s crit rate by 5% for 5 turns'),
+                   ('Crit Damage Potion', 500, 'Increases the user\'s crit damage by 100% for 5 turns'),
+                   ('Hero', 10000, 'You will be given a unique hero with randomly generated stats and sp_atks.'
+                                   'Re-rolling the stats/sp_atks will cost 1000 gold per roll')
+                   ]
+        insert = """INSERT INTO SHOP_PRICES (item_name, price, description)
+                    VALUES (?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+        records = [('Lesser Hp Potion', 5, 'hp', 0),
+                   ('Medium Hp Potion', 10, 'hp', 0),
+                   ('Grand Hp Potion', 20, 'hp', 0),
+                   ('Ph Atk Potion', 20, 'ph_atk', 3),
+                   ('Ph Def Potion', 30, 'ph_def', 4),
+                   ('Sp Atk Potion', 20, 'sp_atk', 3),
+                   ('Sp Def Potion', 30, 'sp_def', 4),
+                   ('Crit Rate Potion', 5, 'crit_rate', 5),
+                   ('Crit Damage Potion', 100, 'crit_damage', 5)
+                   ]
+        insert = """INSERT INTO POTIONS (item_name, percentage, stat, duration)
+                    VALUES  (?, ?, ?, ?)"""
+        cursor.executemany(insert, [i for i in records])
+
+
+def create_lookup_indexes(cursor):  # Schema version 2, indexes for the columns that are searched on
+    cursor.execute("CREATE INDEX IF NOT EXISTS heroes_user_id ON HEROES (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS teams_user_id ON TEAMS (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS heroes_sp_atk_hero_id ON HEROES_SP_ATK (hero_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS monsters_enemy_type ON MONSTERS (enemy_type)")
+    # Combos are looked up with condition_1 = x OR condition_2 = x, so each column gets its own index
+    cursor.execute("CREATE INDEX IF NOT EXISTS status_effects_condition_1 ON STATUS_EFFECTS (condition_1)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS status_effects_condition_2 ON STATUS_EFFECTS (condition_2)")
+
+
+def create_leaderboard(cursor):  # Schema version 3, every save file's score for each leaderboard stat, kept by triggers
+    # The stats are written out here rather than shared so that this migration always does the same thing
+    stats = ["pvp_games_won", "games_played", "games_won", "games_fled", "games_lost", "enemies_defeated",
+             "bosses_defeated", "potions_used", "gold", "lvl"]
+    stat_list = ", ".join(f"'{stat}'" for stat in stats)
+    cursor.execute('''
+                CREATE TABLE IF NOT EXISTS LEADERBOARD
+                (stat TEXT,
+                user_id INTEGER,
+                value INTEGER,
+                PRIMARY KEY (stat, user_id)) WITHOUT ROWID''')
+    # Rankings read the index in order, so finding the top of a stat never looks at the rest of the save files
+    cursor.execute("CREATE INDEX IF NOT EXISTS leaderboard_ranking ON LEADERBOARD (stat, value DESC, user_id)")
+
+    values = ", ".join(f"('{stat}', NEW.user_id, NEW.{stat})" for stat in stats)
+    cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS leaderboard_insert AFTER INSERT ON USER BEGIN
+                    INSERT OR REPLACE INTO LEADERBOARD (stat, user_id, value) VALUES {values};
+                END''')
+    for stat in stats:  # One trigger per column, so a battle's UPDATE only touches the stats it changed
+        cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS leaderboard_update_{stat} AFTER UPDATE OF {stat} ON USER BEGIN
+                    UPDATE LEADERBOARD SET value = NEW.{stat} WHERE stat = '{stat}' AND user_id = NEW.user_id;
+                END''')
+    cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS leaderboard_delete AFTER DELETE ON USER BEGIN
+                    DELETE FROM LEADERBOARD WHERE stat IN ({stat_list}) AND user_id = OLD.user_id;
+                END''')
+
+    cursor.execute("DELETE FROM LEADERBOARD")  # Filled from the save files that already exist
+    for stat in stats:
+        cursor.execute(f"INSERT INTO LEADERBOARD (stat, user_id, value) SELECT '{stat}', user_id, {stat} FROM USER")
+
+
+def set_combo_durations(cursor):  # Schema version 4, combo effects wear off, the table was made with every duration 0
+    # Freeze's description promises 4 turns, the rest last as long as most special attacks do
+    durations = [("shock", 3), ("backfire", 3), ("freeze", 4), ("holy fire", 3), ("dark flame", 3)]
+    cursor.executemany("UPDATE STATUS_EFFECTS SET duration = ? WHERE status_name = ?",
+                       [(duration, status_name) for status_name, duration in durations])
+
+
+# Every change to the database goes on the end of this list, the save file remembers how many have been run
+migrations = [create_tables, create_lookup_indexes, create_leaderboard, set_combo_durations]
+
+
+def migrate(conn):  # Runs each migration the save file hasn't had yet, each one in its own transaction
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number in range(version, len(migrations)):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            migrations[number](cursor)
+            cursor.execute(f"PRAGMA user_version = {number + 1}")
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        conn.commit()
+
 
 
 # ---------------------------------------------------------------  Classes  --------------------------------------------
@@ -425,10 +747,11 @@ if not query.fetchall():  # if data is already made, nothing will happen
 
 class SQLite:
     def __init__(self):
-        self.file_name = 'RPG_game_file_database'
+        self.file_name = connection_pool.file_name
+        self.pool = connection_pool  # Aggregation, the pool is shared between every SQLite object
 
-    def create_connection(self):  # creates a connection to the database, allowing the use of SQL
-        conn = sqlite3.connect(self.file_name)
+    def create_connection(self):  # gets this thread's shared connection to the database, allowing the use of SQL
+        conn = self.pool.get_connection()
         return conn
 
     def get_cursor(self):  # Without a cursor, I cannot execute SQL statements
@@ -436,9 +759,9 @@ class SQLite:
         cursor = conn.cursor()
         return cursor
 
-    def query(self, sql_statement):  # stores all records by using a 2d array
+    def query(self, sql_statement, parameters=()):  # stores all records by using a 2d array
         cursor = self.get_cursor()
-        cursor.execute(sql_statement)
+        cursor.execute(sql_statement, parameters)
         data = cursor.fetchall()
         return data
 
@@ -448,7 +771,7 @@ class SQLite:
         FROM {}
         """.format(table_name))
         for row in range(minimum_value - 1, maximum_value):
-            print(data[row])
+            game_io.print(data[row])
 
     def update_record(self, table_name, attr_name, attr_value, p_key, record_number):
         # Need to include the rest of the details in parameters
@@ -483,6 +806,13 @@ class SQLite:
             """.format(table_name, attr_name, attr_value))
         conn.commit()
 
+    def execute(self, sql_statement, parameters=()):  # Runs a parameterised statement and saves the change
+        conn = self.create_connection()
+        cursor = conn.cursor()
+        cursor.execute(sql_statement, parameters)
+        conn.commit()
+        return cursor
+
     def clear_table(self, table_name):
         conn = self.create_connection()
         cursor = conn.cursor()
@@ -491,18 +821,147 @@ class SQLite:
         """.format(table_name))
         conn.commit()
 
-    def increment_value(self, table_name, attr_name, p_key_name, p_key_value):
-        data = self.query(f"""
-        SELECT {attr_name}
-        FROM {table_name}
-        WHERE {p_key_name} = {p_key_value}""")[0][0]
-        data = int(data) + 1
-        self.update_record(table_name, attr_name, data, p_key_name, p_key_value)
+    def increment_value(self, table_name, attr_name, p_key_name, p_key_value, amount=1):  # One statement so no update is lost
+        self.execute(f"""
+        UPDATE {table_name}
+        SET {attr_name} = {attr_name} + ?
+        WHERE {p_key_name} = ?""", (amount, p_key_value))
+
+
+database = SQLite()  # Shared by everything that reads or saves game data, each thread still gets its own connection
+
+
+class StatAccumulator:  # Counts the USER statistics during a battle so they can be saved in one transaction at the end
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.user_data = database  # Aggregation
+        self.counts = {}  # column name -> amount to add
+
+    def increment(self, attr_name, amount=1):
+        self.counts[attr_name] = self.counts.get(attr_name, 0) + amount
+
+    def flush(self):
+        if self.user_id is None or len(self.counts) == 0:  # Battles run by the headless engine aren't tied to a save file
+            self.counts = {}
+            return
+        columns = ", ".join(f"{attr_name} = {attr_name} + ?" for attr_name in self.counts)
+        self.user_data.execute(f"""
+        UPDATE USER
+        SET {columns}
+        WHERE user_id = ?""", (*self.counts.values(), self.user_id))
+        self.counts = {}
+
+
+class Catalog:  # Read-only copy of the game data, loaded in one pass so battles can be set up without any SQL
+    def __init__(self):
+        self.user_data = database  # Aggregation
+        self.status_effects = {}  # status_id -> {column name: value}
+        self.sp_atks = {}  # sp_atk_id -> {column name: value}
+        self.hero_sp_atks = {}  # hero_id -> list of sp_atk ids, for the built-in heroes and those in user_heroes
+        self.heroes = {}  # hero_id -> (hero_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage)
+        self.user_heroes = {}  # hero_id -> the same record, for save file heroes that have been read since startup
+        self.monsters = {}  # monster_id -> full MONSTERS record
+        self.monster_pools = {}  # tuple of enemy types -> list of MONSTERS records of those types
+        self.potions = []  # POTIONS records without the item id
+        self.shop_prices = []  # SHOP_PRICES records
+        self.element_bits = {}  # name of an effect that can be combined -> its bit in a combo mask
+        self.combos = []  # combo mask -> ids of every combo effect those elements make, for every possible mask
+
+    def load(self):  # Called once at startup
+        self.status_effects = self.get_records("STATUS_EFFECTS")
+        self.sp_atks = self.get_records("SP_ATK")
+        self.monsters = {monster[0]: monster for monster in self.user_data.query("SELECT * FROM MONSTERS")}
+        self.monster_pools = {}
+        self.potions = self.user_data.query("""
+        SELECT item_name, percentage, stat, duration
+        FROM POTIONS""")
+        self.shop_prices = self.user_data.query("SELECT * FROM SHOP_PRICES")
+        self.load_heroes()
+        self.load_combos()
+
+    def load_heroes(self):  # Only the built-in heroes, every save file's own heroes are read when they are first needed
+        self.heroes = {hero[0]: hero for hero in self.user_data.query("""
+        SELECT hero_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage
+        FROM HEROES
+        WHERE user_id = 0""")}
+        self.user_heroes = {}
+        self.hero_sp_atks = {}
+        for hero_id, sp_atk_id in self.user_data.query("""
+        SELECT HEROES_SP_ATK.hero_id, sp_atk_id
+        FROM HEROES_SP_ATK
+        JOIN HEROES ON HEROES.hero_id = HEROES_SP_ATK.hero_id
+        WHERE user_id = 0"""):
+            self.hero_sp_atks.setdefault(int(hero_id), []).append(int(sp_atk_id))
+
+    def get_heroes(self, hero_ids):  # hero_id -> record for each of the ids that still exists, one query for any not read yet
+        missing = [hero_id for hero_id in set(hero_ids) if hero_id not in self.heroes and hero_id not in self.user_heroes]
+        if missing:
+            placeholders = ", ".join("?" * len(missing))
+            for hero in self.user_data.query(f"""
+            SELECT hero_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage
+            FROM HEROES
+            WHERE hero_id IN ({placeholders})""", missing):
+                self.user_heroes[hero[0]] = hero
+                self.hero_sp_atks[hero[0]] = []
+            for hero_id, sp_atk_id in self.user_data.query(f"""
+            SELECT hero_id, sp_atk_id
+            FROM HEROES_SP_ATK
+            WHERE hero_id IN ({placeholders})""", missing):
+                if int(hero_id) in self.user_heroes:
+                    self.hero_sp_atks[int(hero_id)].append(int(sp_atk_id))
+        heroes = {}
+        for hero_id in hero_ids:
+            hero = self.heroes.get(hero_id) or self.user_heroes.get(hero_id)
+            if hero is not None:
+                heroes[hero_id] = hero
+        return heroes
+
+    def forget_hero(self, hero_id):  # Called when the shop sells or re-rolls a hero, it is read again if it is still needed
+        self.user_heroes.pop(hero_id, None)
+        if hero_id not in self.heroes:
+            self.hero_sp_atks.pop(hero_id, None)
+
+    def load_combos(self):  # Works out every combination of elements up front so a combo check is one lookup
+        combo_masks = {}  # status_id -> mask of the two elements it needs
+        for status_id, status_effect in self.status_effects.items():
+            if status_effect["condition_1"] is not None and status_effect["condition_2"] is not None:
+                mask = 0
+                for condition in (status_effect["condition_1"], status_effect["condition_2"]):
+                    if condition not in self.element_bits:
+                        self.element_bits[condition] = 1 << len(self.element_bits)
+                    mask |= self.element_bits[condition]
+                combo_masks[status_id] = mask
+        self.combos = [tuple(status_id for status_id, combo_mask in combo_masks.items() if mask & combo_mask == combo_mask)
+                       for mask in range(2 ** len(self.element_bits))]
+
+    def get_records(self, table_name):  # Stores each record as a dictionary so columns can be found by name
+        cursor = self.user_data.get_cursor()
+        cursor.execute(f"SELECT * FROM {table_name}")
+        columns = [column[0] for column in cursor.description]
+        return {record[0]: dict(zip(columns, record)) for record in cursor.fetchall()}
+
+    def get_monster_pool(self, enemy_types):  # Built the first time each combination of enemy types is asked for
+        enemy_types = tuple(enemy_types)
+        if enemy_types not in self.monster_pools:
+            pool = []
+            for enemy_type in enemy_types:
+                pool += [monster for monster in self.monsters.values() if monster[2] == enemy_type]
+            self.monster_pools[enemy_types] = pool
+        return self.monster_pools[enemy_types]
+
+    def get_sp_atk_details(self, sp_atk_id):  # Same layout as the old join: id, effect 1, effect 2, duration
+        sp_atk = self.sp_atks[sp_atk_id]
+        status_effect = self.status_effects[sp_atk["status_id"]]
+        return (sp_atk_id, status_effect["status_effect_1"], status_effect["status_effect_2"],
+                sp_atk["sp_atk_duration"])
+
+
+catalog = Catalog()
 
 
 class Leaderboard:
     def __init__(self):
-        self.user_data = SQLite()
+        self.user_data = database
         self.dictionary = self.create_dictionary("attribute to name")
 
     def create_dictionary(self, purpose):
@@ -521,26 +980,77 @@ class Leaderboard:
             }
             return dictionary
 
-    def receive_highest_data(self, purpose):
+    def receive_highest_data(self):  # The leader of every stat in one query, each one found with a single index lookup
+        stats = ", ".join(f"('{stat}')" for stat in self.dictionary)
         data = self.user_data.query(f'''
-        SELECT save_file_name, MAX({purpose})
-        FROM USER''')
+        WITH stats (stat) AS (VALUES {stats})
+        SELECT stats.stat, USER.save_file_name, LEADERBOARD.value
+        FROM stats
+        JOIN LEADERBOARD ON LEADERBOARD.stat = stats.stat AND LEADERBOARD.user_id = (
+            SELECT user_id
+            FROM LEADERBOARD
+            WHERE stat = stats.stat
+            ORDER BY value DESC, user_id
+            LIMIT 1)
+        JOIN USER ON USER.user_id = LEADERBOARD.user_id''')
+        return {stat: (save_file_name, value) for stat, save_file_name, value in data}
+
+    def receive_rankings(self, stat, page, page_size=10):  # One page of a stat's rankings, ties share a rank
+        # Only the page is ranked, ranking every save file first would read the whole stat for each page. Rows tied
+        # with the top of the page may have started on an earlier page, so their rank is counted instead
+        data = self.user_data.query('''
+        WITH page AS (
+            SELECT user_id, value
+            FROM LEADERBOARD
+            WHERE stat = :stat
+            ORDER BY value DESC, user_id
+            LIMIT :page_size OFFSET :offset),
+        top AS (SELECT MAX(value) AS value FROM page)
+        SELECT CASE WHEN page.value = top.value
+                    THEN 1 + (SELECT COUNT(*) FROM LEADERBOARD WHERE stat = :stat AND value > top.value)
+                    ELSE :offset + RANK() OVER (ORDER BY page.value DESC) END,
+               USER.save_file_name, page.value
+        FROM page
+        JOIN top
+        JOIN USER ON USER.user_id = page.user_id
+        ORDER BY page.value DESC, page.user_id''', {"stat": stat, "page_size": page_size, "offset": page * page_size})
         return data
 
     def present_stats(self):
-        for key, value in self.dictionary.items():
-            data = self.receive_highest_data(key)
-            print(f"{value} - {data[0][0]}")
-            print(f"    Currently: {data[0][1]}\n")
+        highest_data = self.receive_highest_data()
+        for number, (key, value) in enumerate(self.dictionary.items()):
+            save_file_name, stat = highest_data.get(key, (None, None))
+            game_io.print(f"{number + 1}. {value} - {save_file_name}")
+            game_io.print(f"    Currently: {stat}\n")
+
+        stats = list(self.dictionary)
+        response = right_format_response_number("Enter the number of a stat to see everyone's rankings", 1, len(stats))
+        if response != False:
+            self.present_rankings(stats[response - 1])
+
+    def present_rankings(self, stat):
+        page = 0
+        while True:
+            game_io.print(f"\n{self.dictionary[stat]} - page {page + 1}")
+            for rank, save_file_name, value in self.receive_rankings(stat, page):
+                game_io.print(f"    {rank}. {save_file_name} - {value}")
+            response = right_response_list("Enter 'next' or 'previous' to change the page or 'no' to go back: ",
+                                           ["next", "previous"] + negative_responses)
+            if response == "next":
+                page += 1
+            elif response == "previous":
+                page = max(0, page - 1)
+            else:
+                return
 
 
 class MainMenu:
     def __init__(self):
-        self.db_data = SQLite()  # composition
-        self.colour = Colours()
+        self.db_data = database  # Aggregation
+        self.colour = colours
 
     def menu(self):  # Polymorphism
-        print("""
+        game_io.print("""
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       WELCOME TO R.RPG       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
         1. New Game 
@@ -556,78 +1066,78 @@ class MainMenu:
             self.create_new_game()
 
         elif response == 2:
-            self.load_game()
+            return self.load_game()
 
         elif response == 3:
             self.help_menu()
 
         elif response == 4:
-            self.print_save_files()
-            data = self.get_save_files()
-            dictionary = self.number_save_file_dictionary()
-            number = right_format_response_number(f"Enter a value between 1 and {len(data)}", 1, len(data))
-            if number == False:
-                self.menu()
-            save_file_number = dictionary[number]
-            self.db_data.delete_record("USER", "user_id", save_file_number)
+            if self.print_save_files():
+                data = self.get_save_files()
+                dictionary = self.number_save_file_dictionary()
+                number = right_format_response_number(f"Enter a value between 1 and {len(data)}", 1, len(data))
+                if number != False:
+                    save_file_number = dictionary[number]
+                    self.db_data.delete_record("USER", "user_id", save_file_number)
 
         elif response == 5:
             response = right_response_list("Are you sure you want to do this?", response_list)
             if response in positive_responses:
                 self.db_data.clear_table("USER")  # clears all users built in heroes and profiles
                 self.db_data.clear_table("HEROES")
-                print("Data has been cleared successfully")
+                catalog.load_heroes()
+                game_io.print("Data has been cleared successfully")
 
         elif response == 6:  # Leaderboard
             leaderboard = Leaderboard()
             leaderboard.present_stats()
 
         elif response == 7:
-            exit()
+            return None  # Ends the game
 
         else:
-            print("There is no where to go back to")
-            self.menu()
+            game_io.print("There is no where to go back to")
+        return "main menu", None
 
     def create_new_game(self):
         data = self.get_save_files()
         if len(data) == 0:
-            print("There are no current save files created")
+            game_io.print("There are no current save files created")
         else:
-            print("Current save file names: ")
+            game_io.print("Current save file names: ")
             for name in data:
-                print(name[1])
+                game_io.print(name[1])
         save_file_name = response_check("Enter a suitable name for the file", [name for name in data])
         self.db_data.create_record("USER", "save_file_name", f"'{save_file_name}'")
         data = self.get_save_files()  # This method is repeated to get the new primary key
-        response = input("Save file created, enter any value to return to the main menu")
+        response = game_io.input("Save file created, enter any value to return to the main menu")
 
     def load_game(self):
-        self.print_save_files()
+        if not self.print_save_files():
+            return "main menu", None
         data = self.get_save_files()
         dictionary = self.number_save_file_dictionary()
         number = right_format_response_number(f"Enter a value between 1 and {len(data)}", 1, len(data))
         if number == False:
-            self.menu()  # Recursion
-        else:
-            save_file_number = dictionary[number]
-            game = Rpg(save_file_number)
-            game.menu()
+            return "main menu", None
+        save_file_number = dictionary[number]
+        return "game menu", save_file_number
 
-    def print_save_files(self):
+    def print_save_files(self):  # Returns False if there aren't any save files to print
         data = self.get_save_files()
         if len(data) == 0:
-            response = input("There are no save files, please create one to play:")
-            self.menu()
+            response = game_io.input("There are no save files, please create one to play:")
+            return False
 
         for record in range(len(data)):
-            print(f"""
+            game_io.print(f"""
     {self.colour.return_colour_text('None', f'{record + 1})  Save {record + 1}')}
         Name: {data[record][1]}
         Level: {data[record][2]}
         Exp: {data[record][3]}
         Gold: {data[record][4]}""")
-        print()
+        game_io.print()
+        return True
 
     def get_save_files(self):
         data = self.db_data.query("SELECT * FROM USER")
@@ -641,7 +1151,7 @@ class MainMenu:
         return dictionary
 
     def help_menu(self):
-        print("""
+        game_io.print("""
         1. Help on Stats
         2. Help on Special Attacks
         3. Help on Effects
@@ -656,11 +1166,11 @@ class MainMenu:
             self.print_effect_help()
         elif response == 4:
             self.print_battle_help()
-        response = input("Enter any key to return to the main menu: ")
+        response = game_io.input("Enter any key to return to the main menu: ")
 
     @staticmethod
     def print_battle_help():
-        print("""
+        game_io.print("""
         There are 3 types of battles in R.RPG:
 
         Monster Battles - In these kinds of battles, the user will be paired up against 3-6 enemies based on the 
@@ -684,11 +1194,11 @@ class MainMenu:
         FROM STATUS_EFFECTS
         WHERE status_id > 0 and status_id < 12""")
         for status_effect in data:
-            print(f"        {status_effect[0].title()} - {status_effect[1]}\n")
+            game_io.print(f"        {status_effect[0].title()} - {status_effect[1]}\n")
 
     @staticmethod
     def print_sp_atk_help():
-        print("""
+        game_io.print("""
         In R.RPG, there are 5 types of special attacks:
 
         Status Effect Attacks - Using these kind of special attacks will leave an 'effect' on the defending
@@ -708,7 +1218,7 @@ class MainMenu:
 
     @staticmethod
     def print_stat_help():
-        print("""
+        game_io.print("""
         Hp - The 'Health Points' of a character, in the battle system, both sides will experience changes to their
         overall Hp. A hero will be 'defeated' when their Hp hits 0.
 
@@ -736,7 +1246,7 @@ class MainMenu:
 
 class Rpg:
     def __init__(self, user_id):
-        self.user_data = SQLite()
+        self.user_data = database
         self.user_id = user_id
         self.level = self.get_stat("lvl")
         self.gold = self.get_stat("gold")
@@ -744,7 +1254,7 @@ class Rpg:
         self.colours = Colours
 
     def menu(self):  # Polymorphism
-        print("""
+        game_io.print("""
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       MAIN MENU       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     1. Battle (monsters or pvp)
@@ -757,11 +1267,10 @@ class Rpg:
         response = right_format_response_number("\nEnter a number between 1 and 7", 1, 7)
 
         if response == 1:
-            battle = Battle(self.user_id)
-            battle.menu()
+            return "battle", self.user_id
 
         elif response == 2:
-            print("""
+            game_io.print("""
             See stats for:
                 1. Profile stats
                 2. Built-in Heroes
@@ -775,7 +1284,7 @@ class Rpg:
             dictionary = False
 
             if response == False:
-                self.menu()
+                return "game menu", self.user_id
             elif response == 1:
                 data = self.get_data("profile")[0]  # 1d list
                 titles = ["User ID", "Save Name", "Level", "Exp", "Gold", "Games Played", "Games Won",
@@ -790,7 +1299,9 @@ class Rpg:
                     purpose = "built in hero"
                 else:
                     purpose = "user hero"
-                    self.check("user hero exists")
+                    if not self.check("user hero exists"):
+                        return "game menu", self.user_id
+                self.level = self.get_stat("lvl")  # The level may have changed since this screen was made
                 dictionary = []
                 data = self.get_data(purpose)  # 2d list
                 titles = ["Hero id", "User Id", "Hero Name", "Hp", "Physical Attack", "Physical defence",
@@ -801,6 +1312,7 @@ class Rpg:
                     dictionary.append(mini_dictionary)  # creating a list of dictionaries
 
             elif response == 4:
+                self.level = self.get_stat("lvl")
                 dictionary = []
                 data = self.get_data("monster")
                 titles = ["Enemy ID", "Enemy Name", "Enemy Type", "Hp", "Physical Attack", "Physical Defence",
@@ -816,7 +1328,8 @@ class Rpg:
                     user_id = 0
                 else:
                     user_id = self.user_id
-                    self.check("user hero exists")
+                    if not self.check("user hero exists"):
+                        return "game menu", self.user_id
                 data = []
                 temp = self.user_data.query("""
                 SELECT hero_id, hero_name
@@ -844,37 +1357,33 @@ class Rpg:
                     dictionary.append(mini_dictionary)
 
             if not dictionary:
-                response = input("Something went wrong, returning to the main menu, enter any key to return: ")
-                self.menu()
+                response = game_io.input("Something went wrong, returning to the main menu, enter any key to return: ")
 
             elif dictionary is None:
-                print("There is no instance of this, please only check the stats of data that exists.")
+                game_io.print("There is no instance of this, please only check the stats of data that exists.")
 
             elif isinstance(dictionary, list):
                 for i in dictionary:
                     for key, value in i.items():
-                        print(f"{key} : {value}")
-                    print()
+                        game_io.print(f"{key} : {value}")
+                    game_io.print()
             else:
                 for key, value in dictionary.items():
-                    print(f"{key} : {value}")
+                    game_io.print(f"{key} : {value}")
 
         elif response == 3:
-            shop = Shop(self.user_id)
-            shop.menu()
+            return "shop", self.user_id
         elif response == 4:
             pass
 
         elif response == 5:
-            team = Team(self.user_id)
-            team.team_menu()
+            return "teams", self.user_id
 
         elif response == 6:
-            main_menu = MainMenu()
-            main_menu.menu()
+            return "main menu", None
         elif response == 7:
-            exit()
-        self.menu()
+            return None  # Ends the game
+        return "game menu", self.user_id
 
     def get_data(self, purpose):
         data = False
@@ -915,7 +1424,7 @@ class Rpg:
             WHERE user_id = {}""".format(self.user_id))  # single list
 
         if not data:
-            print("An unknown error occurred, please try again")
+            game_io.print("An unknown error occurred, please try again")
             return
         return data
 
@@ -950,22 +1459,22 @@ class Rpg:
                 FROM HEROES
                 WHERE user_id = {}""".format(self.user_id))
             if not test:
-                response = input("""
+                response = game_io.input("""
                 No user-specific heroes have been created
                 Please go to the shop to create one
                 Enter any key to return to the main menu:
                 """)
-                self.menu()
-        return
+                return False
+        return True
 
 
 class Team:
     def __init__(self, user_id):
-        self.user_data = SQLite()
+        self.user_data = database
         self.user_id = user_id
 
-    def team_menu(self):
-        print("""
+    def menu(self):  # Polymorphism
+        game_io.print("""
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       TEAM BUILDING       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
         1. See all teams  
@@ -977,16 +1486,14 @@ class Team:
         if response == 1:
             self.print_team_formations()
         elif response == 2:
-            self.delete_a_team()
+            return self.delete_a_team()
         elif response == 3:
-            self.create_a_team()
+            return self.create_a_team()
         elif response == 4:
-            self.team_edit()
-        elif response == 5:
-            game = Rpg(self.user_id)
-            game.menu()
+            return self.team_edit()
         elif response == False:
-            self.team_menu()  # recursion
+            return "teams", self.user_id
+        return "game menu", self.user_id
 
     def check(self, purpose, data_to_check_1, data_to_check_2):  # Overloading
         if purpose == "team length":
@@ -1010,18 +1517,20 @@ class Team:
         WHERE user_id = {self.user_id}""")  # hero id 1-6 = index 2-7
         return teams
 
-    def print_team_formations(self):
+    def print_team_formations(self):  # One query for the teams and at most one for the names of heroes not read yet
         teams = self.get_team_formations()
+        heroes = catalog.get_heroes([hero_id for team in teams for hero_id in team[2:8]])
         if len(teams) == 0:
-            print("There are no current teams for this account, please create one first")
+            game_io.print("There are no current teams for this account, please create one first")
         else:
-            print()
+            game_io.print()
             for i in range(len(teams)):
-                print(f"~~~~~~~~~~~~~~~~~~~~~~   Team {i + 1}   ~~~~~~~~~~~~~~~~~~~~~~")
+                game_io.print(f"~~~~~~~~~~~~~~~~~~~~~~   Team {i + 1}   ~~~~~~~~~~~~~~~~~~~~~~")
                 for j in range(2, 8):
-                    hero = self.convert("hero id to name", teams[i][j])
-                    print("     Hero {} - {}".format(j - 1, hero))
-                print()
+                    hero = heroes[teams[i][j]][1] if teams[i][j] in heroes else None  # None once a hero is sold
+                    game_io.print("     Hero {} - {}".format(j - 1, hero))
+                game_io.print()
+        return teams
 
     def get_single_team(self, team_number):
         teams = self.user_data.query(f"""
@@ -1032,24 +1541,19 @@ class Team:
         return single_team
 
     def delete_a_team(self):
-        self.print_team_formations()
-        teams = self.get_team_formations()
+        teams = self.print_team_formations()
         team_number = right_format_response_number("Enter the number of the team you wish to delete", 1, len(teams)) - 1
         if team_number == False:
-            self.team_menu()
-        else:
-            response = right_response_list("Are you sure you want to do this? ", response_list)
-            if response in positive_responses:
-                # need to convert the number into a team id to delete
-                team_id = self.convert("number to team id", team_number)
-                print(team_id)
-                self.user_data.delete_record("TEAMS", "team_id", team_id)
-                response = input("Team deleted, enter any key to return to the team menu: ")
-                self.team_menu()  # recursion
-            elif response in negative_responses:
-                response = input("Deletion of teams cancelled, enter any key to return to the main menu: ")
-                game = Rpg(self.user_id)
-                game.menu()
+            return "teams", self.user_id
+        response = right_response_list("Are you sure you want to do this? ", response_list)
+        if response in positive_responses:
+            team_id = teams[team_number][0]  # The rows that were just printed, so the number matches what was shown
+            game_io.print(team_id)
+            self.user_data.delete_record("TEAMS", "team_id", team_id)
+            response = game_io.input("Team deleted, enter any key to return to the team menu: ")
+            return "teams", self.user_id
+        response = game_io.input("Deletion of teams cancelled, enter any key to return to the main menu: ")
+        return "game menu", self.user_id
 
     def create_a_team(self):
         heroes = self.get_all_heroes()
@@ -1063,42 +1567,41 @@ class Team:
                 hero_number = right_format_response_number(f"Enter the number of hero {i} in your team", 1,
                                                            len(heroes))
                 if hero_number == False:
-                    self.team_menu()
+                    return "teams", self.user_id
                 else:
                     hero_number -= 1
                     if self.check("hero in team", hero_number, team_list):
-                        print("You have already added this hero, please add a different one")
+                        game_io.print("You have already added this hero, please add a different one")
                     else:
                         valid = True
                         team_list.append(dictionary[hero_number][1])
-        print("Team: ")
+        game_io.print("Team: ")
         for hero in team_list:
-            print(hero)
+            game_io.print(hero)
         self.user_data.create_record("TEAMS",
                                      "user_id, hero_id_1, hero_id_2, hero_id_3, hero_id_4, hero_id_5, hero_id_6",
                                      "{}, {}, {}, {}, {}, {}, {}".format(self.user_id, *team_list))
-        response = input("Team has been created, enter any value to return to the teams menu: ")
-        self.team_menu()
+        response = game_io.input("Team has been created, enter any value to return to the teams menu: ")
+        return "teams", self.user_id
 
     def team_edit(self):
         hero_to_add = 0  # here to prevent the same error
-        self.print_team_formations()
-        teams = self.get_team_formations()
+        teams = self.print_team_formations()
         response = right_format_response_number(
             "Enter the number of the team you wish to change the members of: ", 1, len(teams) + 1)
         if response == False:
-            repsonse = input("Returning to the main menu, enter any key to return: ")
-            self.team_menu()
+            repsonse = game_io.input("Returning to the main menu, enter any key to return: ")
+            return "teams", self.user_id
         else:
             response -= 1
-            team = self.get_single_team(response)
+            team = teams[response]
 
         for i in range(2, 8):
-            print("Hero {} : {}".format(i - 1, self.convert("hero id to name", team[i])))
+            game_io.print("Hero {} : {}".format(i - 1, self.convert("hero id to name", team[i])))
         hero_to_remove = right_format_response_number("Enter the number of the hero you wish to change:", 1, 6)
         if response == False:
-            response = input("Returning to the main menu, enter any key to return: ")
-            self.team_menu()
+            response = game_io.input("Returning to the main menu, enter any key to return: ")
+            return "teams", self.user_id
         else:
             hero_to_remove += 1
             heroes = self.get_all_heroes()
@@ -1109,18 +1612,19 @@ class Team:
                 hero_to_add = right_format_response_number("Enter the number of the hero you want in the team", 1,
                                                            len(heroes) + 1)
                 if hero_to_add == False:
-                    response = input("Returning to the menu, enter any key to return: ")
-                    self.team_menu()
+                    response = game_io.input("Returning to the menu, enter any key to return: ")
+                    return "teams", self.user_id
                 else:
                     hero_to_add -= 1
                     if self.check("hero in team", hero_to_add, team):
-                        print("This hero is already in the team, please select another")
+                        game_io.print("This hero is already in the team, please select another")
                     else:
                         valid = True
             hero_id_string = "hero_id_" + str(dictionary[hero_to_remove][1] - 2)
             new_hero_id = dictionary[hero_to_add][1]
             team_id = team[0]
             self.user_data.update_record("TEAMS", hero_id_string, new_hero_id, "team_id", team_id)
+        return "game menu", self.user_id
 
     def convert(self, purpose, number):  # Overloading
         if purpose == "number to team id":
@@ -1128,11 +1632,11 @@ class Team:
             team_id = team[0]
             return team_id
 
-        elif purpose == "hero id to name":
-            heroes = self.get_all_heroes()
-            dictionary = {i + 1: heroes[i] for i in range(len(heroes))}
-            hero = dictionary[number][0]
-            return hero
+        elif purpose == "hero id to name":  # The catalog keeps each hero once it has been read, the shop drops sold ones
+            hero = catalog.get_heroes([number]).get(number)
+            if hero is None:
+                return None  # The hero has been sold since the team was made
+            return hero[1]
 
     def get_all_heroes(self):
         heroes = self.user_data.query("""
@@ -1144,206 +1648,46 @@ class Team:
     @staticmethod
     def print_all_heroes(heroes):
         for i in range(len(heroes)):
-            print(f"""  Hero {i + 1}:
+            game_io.print(f"""  Hero {i + 1}:
         Hero Name : {heroes[i][0]}""")
 
 
-class Battle:
-    def __init__(self, user_id):
+class BattleRules:  # The rules of a battle, kept apart from the menus so that a battle can run without a player
+    def __init__(self, user_id, log=None):
         self.user_id = user_id
-        self.user_data = SQLite()  # Composition
         self.game_mode = 0
-        self.level = self.get_stat("lvl")  # will help speed up some processes as less SQL will be needed
-        self.gold = self.get_stat("gold")
-        self.exp = self.get_stat("exp")
         self.team_1 = []
         self.team_2 = []
-        self.potion_list = self.generate_potions()
         self.aggro = None
-        self.colour = Colours()  # Composition
-
-    def menu(self):  # Polymorphism
-        print("""
-~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       BATTLE MENU       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-        1. Battle a monster
-        2. Battle another player AI
-        3. Battle another player (2P)\n""")
-        response = right_format_response_number(f"Enter a number between 1 and 3", 1, 3)
-        if response == 1:
-            self.pve_menu()
-        elif response == 2:
-            self.pvp_ai_menu()
-        elif response == 3:
-            self.pvp_non_ai_menu()
-        elif response == False:
-            response = input("Returning to the main menu, enter any key to return")
-        rpg = Rpg(self.user_id)
-        rpg.menu()
-
-    def get_game_mode(self):
-        print("""
-        Select difficulty:
-            1. Easy
-            2. Medium
-            3. Hard
-            4. Extreme
-            5. Leave\n""")
-        response = right_format_response_number("Please select a number between 1 and 5: ", 1, 5)
-        if response == 5:
-            exit()
-        elif response == False:
-            response = input("Returning to the game menu, enter any key to return: ")
-            self.menu()
-        else:
-            return response
-
-    def pve_menu(self):
-        response = self.get_game_mode()
-        self.game_mode = self.convert("number to game mode type", response)
-        self.team_1 = self.get_user_team(self.user_id)
-        self.start_pve_battle()
-
-    def pvp_ai_menu(self):
-        self.team_1 = self.get_user_team(self.user_id)
-        enemy_id = self.get_user_id()  # Gets the user id of the opposing team
-        self.team_2 = self.get_user_team(enemy_id)
-        response = self.get_game_mode()
-        self.game_mode = self.convert("number to game mode type", response)
-        self.start_pvp_battle("ai")
-
-    def pvp_non_ai_menu(self):
-        self.team_1 = self.get_user_team(self.user_id)
-        enemy_id = self.get_user_id()  # Gets the user id of the opposing team
-        self.team_2 = self.get_user_team(enemy_id)
-        self.start_pvp_battle("2p")
-
-    def get_user_id(self):
-        list_of_users = self.user_data.query("""
-        SELECT user_id, save_file_name
-        FROM USER""")
-        dictionary = {i + 1: list_of_users[i][0] for i in range(len(list_of_users))}
-        print("Select a save file")
-        for i in range(len(list_of_users)):
-            print(f"    {i + 1}. - {list_of_users[i][1]}")
-        response = right_format_response_number("Please enter the number of the save file you wish to battle: ", 1,
-                                                len(list_of_users))
-        if response == False:
-            self.menu()
-        else:
-            user_id = dictionary[response]
-            return user_id
-
-    def start_pvp_battle(self, mode):
-        self.user_data.increment_value("USER", "games_played", "user_id", self.user_id)
-        self.team_1 = self.generate_heroes(self.team_1, "hero")
-
-        if mode == "2p":
-            self.team_2 = self.generate_heroes(self.team_2, "hero")
-        elif mode == "ai":
-            self.team_2 = self.generate_heroes(self.team_2, "")
-        else:
-            print("An unknown error has occured, returning to the main menu")
-            self.menu()
-
-        battle = True
-        while battle == True:
-            battle = self.main_battle(mode, self.team_1, self.team_2)
-
-        if battle == "win":
-            self.user_data.increment_value("USER", "games_won", "user_id", self.user_id)
-            if mode == "ai":
-                for i in range(2):
-                    self.generate_rewards("win")
-            elif mode == "2p":
-                self.user_data.increment_value("USER", "pvp_games_won", "user_id", self.user_id)
-                print("Player 1 wins")
-
-        elif battle == "lose":
-            self.user_data.increment_value("USER", "games_lost", "user_id", self.user_id)
-            if mode == "ai":
-                self.generate_rewards("lose")
-            elif mode == "2p":
-                print("Player 2 wins")
-
-        elif battle == "flee":
-            self.user_data.increment_value("USER", "games_fled", "user_id", self.user_id)
-            if mode == "ai":
-                self.generate_rewards("flee")
-            elif mode == "2p":
-                print("The battle was not decided")
-
-        rpg = Rpg(self.user_id)
-        rpg.menu()
-
-    def start_pve_battle(self):
-        self.user_data.increment_value("USER", "games_played", "user_id", self.user_id)
-        self.team_1 = self.generate_heroes(self.team_1, "hero")
-        self.team_2 = self.generate_enemies(self.game_mode)
-        battle = True
-
-        while battle == True:
-            battle = self.main_battle("pve", self.team_1, self.team_2)
-        if battle == 'win':
-            self.user_data.increment_value("USER", "games_won", "user_id", self.user_id)
-            self.generate_rewards("win")
-        elif battle == 'lose':
-            self.user_data.increment_value("USER", "games_lost", "user_id", self.user_id)
-            self.generate_rewards("lose")
-        elif battle == 'flee':
-            self.user_data.increment_value("USER", "games_fled", "user_id", self.user_id)
-            self.generate_rewards("flee")
+        self.level = 0  # Sets the strength of generated enemies
+        self.seed = None
+        self.random = random  # Every roll of the dice goes through this, set_seed swaps in a stream for one battle
+        self.log = console_log if log is None else log  # Where everything that happens in the battle is sent
+        self.stats = StatAccumulator(user_id)  # Composition
+        self.colour = colours  # Aggregation
+        self.turn = 0
+        self.mode = None  # "pve", "ai" or "2p"
+        self.potion_list = self.generate_potions()
 
-    def select_entity(self, team, text):
-        while True:
-            number = 0
-            if type(team[0]) == Hero or type(team[0]) == AiHero:
-                self.print_hp(team)
-                number = right_format_response_number(text, 1, 6)
-                if number == False:
-                    return - 1
-                else:
-                    number -= 1
-                    if team[number].is_dead:
-                        print("This hero is already dead, please select another one")
-                        number = self.select_entity(team, text)
+    def set_seed(self, seed):  # The same seed always rolls the same dice, so a battle can be replayed or profiled
+        self.seed = seed
+        self.random = random.Random(seed)
 
-            elif type(team[0]) == Enemy:
-                print()
-                self.print_hp(team)
-                number = right_format_response_number("Please select an enemy to attack: ", 1, len(team))
-                print()
-                if number == False:
-                    return -1
-                else:
-                    number -= 1
-                    if team[number].is_dead:
-                        print("This enemy is already dead, please select another one")
-                        number = self.select_entity(team, text)
-            return number
+    def join_battle(self):  # Backfire is rolled by the entity itself, so it has to use the battle's stream and log too
+        for entity in self.team_1 + self.team_2:
+            entity.random = self.random
+            entity.set_log(self.log)
+        self.log.start(self)
 
-    def select_sp_atk(self, entity):
-        for i in range(len(entity.sp_atk_list)):
-            attack_type = "Attack Type"
-            if type(entity.sp_atk_list[i]) == StatusSpecialAttack:
-                attack_type = "Element"
-            special_attack_number = self.colour.return_colour_text("None", "Special Attack " + str(i + 1))
-            print(f"\n{special_attack_number}: {entity.sp_atk_list[i].name}\n"
-                  f"{self.colour.return_colour_text('None', 'Mana Cost')}: {entity.sp_atk_list[i].mana_cost}\n"
-                  f"{self.colour.return_colour_text('None', attack_type)}: "
-                  f"{self.colour.effect_colour(entity.sp_atk_list[i].status_effect.name)}\n")
-        print()
-        response = right_format_response_number(f"""Please select a number between  1 and  {len(entity.sp_atk_list)}""",
-                                                1, len(entity.sp_atk_list))
-        if response == False:
-            return False
-        else:
-            response -= 1
-            if not self.check_mana(entity, entity.sp_atk_list[response]):
-                print("You do not have enough mana for this special attack: ")
-                return False
+    def generate_potions(self):
+        potions = catalog.potions
+        potion_list = []
+        for potion in potions:
+            if potion[3] == 0:  # Means that it is a restoration potion
+                potion_list.append(Potion(potion[0], potion[1]))
             else:
-                return entity.sp_atk_list[response]
+                potion_list.append(BuffPotion(potion[0], potion[1], potion[2], potion[3]))
+        return potion_list
 
     @staticmethod
     def check_mana(entity, sp_atk):
@@ -1352,7 +1696,8 @@ class Battle:
         return True
 
     def use_mana(self, entity, sp_atk):
-        print(f"{self.colour.effect_colour('mana')}: {entity.mana} -> {entity.mana - sp_atk.mana_cost}\n")
+        self.log.record("mana", f"{self.colour.effect_colour('mana')}: {entity.mana} -> "
+                                f"{entity.mana - sp_atk.mana_cost}\n", entity=entity, mana_cost=sp_atk.mana_cost)
         entity.mana -= sp_atk.mana_cost
 
     def backfire(self, entity_attacking, entity_receiving_team):
@@ -1362,34 +1707,40 @@ class Battle:
             crit_damage = self.get_crit_damage(entity_attacking)
             damage = round((entity_attacking.sp_atk * 2) - entity.sp_def * 0.5)
             entity.damage(round(damage * crit_damage))
-        print(
-            f"Damage equal to {damage * crit_damage} has been dealt to all of the monsters due to the 'backfire' status")
+        self.log.record(
+            "backfire",
+            f"Damage equal to {damage * crit_damage} has been dealt to all of the monsters due to the 'backfire' status",
+            attacker=entity_attacking, damage=damage * crit_damage, crit=crit_damage != 1)
 
     def sp_atk(self, e_attacking, e_defending, sp_atk):  # Launches a special attack on an entity
-        print(self.colour.return_colour_text("None", f"\n------ {e_attacking.name} ------"))
+        self.log.record("turn", self.colour.label("None", f"\n------ {e_attacking.name} ------"),
+                        actor=e_attacking)
 
-        number = random.randint(1, 100)
+        number = self.random.randint(1, 100)
         if e_attacking.miss_rate >= number:
             total_damage = 0
-            print(f"{e_attacking.name} missed the attack, no damage was dealt to {e_defending.name}")
+            self.log.record("miss", f"{e_attacking.name} missed the attack, no damage was dealt to {e_defending.name}",
+                            attacker=e_attacking, target=e_defending, sp_atk_id=sp_atk.id)
             return
 
         if type(sp_atk) == HealingSpecialAttack:
-            print(f"{e_attacking.name} has used {sp_atk.name} to heal {e_defending.name}")
+            message = f"{e_attacking.name} has used {sp_atk.name} to heal {e_defending.name}"
         else:
-            print(f"{e_attacking.name} has used {sp_atk.name} on {e_defending.name}")
+            message = f"{e_attacking.name} has used {sp_atk.name} on {e_defending.name}"
+        self.log.record("sp_atk", message, attacker=e_attacking, target=e_defending, sp_atk_id=sp_atk.id)
 
         if sp_atk.type == "status_effect":  # to save until the end
             crit_damage = self.get_crit_damage(e_attacking)
             damage = round((e_attacking.sp_atk * (sp_atk.percentage * 0.01)) - e_defending.sp_def * 0.5)
             e_defending.damage(round(damage * crit_damage))  # Deals sp_atk damage
-            e_defending.effect_count.add_to_list(sp_atk.name, sp_atk)  # Creates a timer for the sp_atk effects
-            print(f"The '{self.colour.effect_colour(sp_atk.status_effect.name)}' status effect has been applied to "
-                  f"{e_defending.name}")
-            element = e_defending.effect_count.check_other_effects()  # Checks if any other sp_atks can be combined
-            if element == None:
+            e_defending.effect_count.add(sp_atk.name, sp_atk)  # Creates a timer for the sp_atk effects
+            self.log.record("status", f"The '{self.colour.effect_colour(sp_atk.status_effect.name)}' status effect has "
+                                      f"been applied to {e_defending.name}", target=e_defending,
+                            effect=sp_atk.status_effect.name, damage=round(damage * crit_damage), crit=crit_damage != 1)
+            combos = e_defending.effect_count.check_other_effects()  # Checks if any other sp_atks can be combined
+            if not combos:
                 e_defending.status_effect_initial(sp_atk)
-            else:
+            for element in combos:
                 attack = e_defending.status_effect_initial(element)  # Deals the initial de buffs of an effects
                 if attack == "aoe":
                     self.backfire(e_attacking, self.team_2)
@@ -1400,26 +1751,34 @@ class Battle:
             e_defending.damage(round(damage * crit_damage))
             heal_amount = round(damage * (sp_atk.status_effect.effect_1_percentage * 0.01))
             e_attacking.heal(round(heal_amount))
-            print(f"{e_attacking.name} has dealt {damage * crit_damage} damage to {e_defending.name}")
-            print(f"{e_attacking.name} has healed by {heal_amount} hit points")
+            self.log.record("damage", f"{e_attacking.name} has dealt {damage * crit_damage} damage to {e_defending.name}",
+                            attacker=e_attacking, target=e_defending, damage=damage * crit_damage,
+                            crit=crit_damage != 1)
+            self.log.record("heal", f"{e_attacking.name} has healed by {heal_amount} hit points",
+                            target=e_attacking, amount=heal_amount)
 
         elif sp_atk.type == "aggro":
             crit_damage = self.get_crit_damage(e_attacking)
             damage = round((e_attacking.sp_atk * (sp_atk.percentage * 0.01)) - e_defending.sp_def * 0.5)
             e_defending.damage(round(damage * crit_damage))
-            print(f"{e_attacking.name} has dealt {damage * crit_damage} damage to {e_defending.name}")
+            self.log.record("damage", f"{e_attacking.name} has dealt {damage * crit_damage} damage to {e_defending.name}",
+                            attacker=e_attacking, target=e_defending, damage=damage * crit_damage,
+                            crit=crit_damage != 1)
             self.aggro = self.team_1.index(e_attacking)
-            print(f"Enemies will now target {e_attacking.name}")
+            self.log.record("aggro", f"Enemies will now target {e_attacking.name}", target=e_attacking)
 
         elif sp_atk.type == "heal_percentage":
-            heal_amount = round(self.get_crit_damage(e_attacking) * (sp_atk.percentage * 0.01) * e_attacking.hp)
+            crit_damage = self.get_crit_damage(e_attacking)
+            heal_amount = round(crit_damage * (sp_atk.percentage * 0.01) * e_attacking.hp)
             e_defending.heal(round(heal_amount))
-            print(f"{e_attacking.name} has healed {e_defending.name} for {heal_amount} hit points")
+            self.log.record("heal", f"{e_attacking.name} has healed {e_defending.name} for {heal_amount} hit points",
+                            target=e_defending, amount=heal_amount, crit=crit_damage != 1)
 
-        e_defending.check_status(self.user_id)
+        e_defending.check_status(self.stats)
 
     def aoe_attack(self, entity_attacking, entity_receiving_team, sp_atk):
-        print(self.colour.return_colour_text("None", f"\n------ {entity_attacking.name} ------"))
+        self.log.record("turn", self.colour.label("None", f"\n------ {entity_attacking.name} ------"),
+                        actor=entity_attacking)
         damage = 0
         crit_damage = 0
         for entity in entity_receiving_team:
@@ -1430,33 +1789,513 @@ class Battle:
                 sp_atk.percentage = 200  # If it is an AOE due to backfire
             damage = round((entity_attacking.sp_atk * (sp_atk.percentage * 0.01)) - entity.sp_def * 0.5)
             entity.damage(round(damage * crit_damage))
-        print(f"An AOE attack worth of {damage * crit_damage} has been dealt to all of the monsters")
-
-    def main_battle(self, mode, team_attacking, team_defending):
-        turn = None
+        self.log.record("aoe", f"An AOE attack worth of {damage * crit_damage} has been dealt to all of the monsters",
+                        attacker=entity_attacking, sp_atk_id=sp_atk.id, damage=damage * crit_damage,
+                        crit=crit_damage != 1)
 
-        if team_attacking == self.team_1:
-            print(self.colour.return_colour_text("underline", "~~~~~~ PLAYER 1's turn: ~~~~~~"))
+    def attack(self, e_attacking, e_defending):
+        self.log.record("turn", self.colour.label("None", f"\n------ {e_attacking.name} ------"),
+                        actor=e_attacking)
+        crit_damage = self.get_crit_damage(e_attacking)
+        additional_atk = round(0.1 * e_attacking.ph_atk)
+        var_atk = self.random.randint(round(e_attacking.ph_atk - additional_atk),
+                                      round(e_attacking.ph_atk + additional_atk))
+        hero_damage = var_atk * crit_damage
+        total_damage = round(hero_damage - 0.05 * e_defending.ph_def)
+        number = self.random.randint(1, 100)
+        if e_attacking.miss_rate >= number:
+            total_damage = 0
+            self.log.record("miss", f"{e_attacking.name} missed the attack, no damage was dealt to {e_defending.name}",
+                            attacker=e_attacking, target=e_defending)
         else:
-            print(self.colour.return_colour_text("underline", "~~~~~~ PLAYER 2's turn: ~~~~~~"))
+            self.log.record("attack", f"{e_attacking.name} dealt {total_damage} damage to {e_defending.name}",
+                            attacker=e_attacking, target=e_defending, damage=total_damage,
+                            crit=crit_damage != 1)
+        e_defending.damage(total_damage)
+        e_defending.check_status(self.stats)
 
-        response = self.print_options()
-        for hero in self.team_1:
-            hero.check_status(self.user_id)
-        for enemy in self.team_2:
-            enemy.check_status(self.user_id)
+    def get_crit_damage(self, entity_selected):
+        crit_rate = self.random.randint(1, 100)
+        if entity_selected.crit_rate <= crit_rate:
+            crit_damage = entity_selected.crit_damage / 100
+        else:
+            crit_damage = 1
+        return crit_damage
 
-        if response == 1:  # attack
-            hero_number = self.select_entity(team_attacking, "Please select a hero to attack with: ")
-            if hero_number + 1 == False:
-                turn = 'skip'
-            else:
-                enemy_number = self.select_entity(team_defending, "Please select an enemy to attack: ")
-                if enemy_number + 1 == False:
+    def enemy_turn(self):
+        # 50% chance of sp atk, 50% chance of normal attack
+        # takes difficulty into consideration of targets
+        self.enemy_target()  # adjusts targets
+        enemy_chosen = self.enemy_choice()
+        if enemy_chosen is None:
+            pass
+        else:
+            number = self.random.randint(0, 100)
+            if number <= 50:
+                self.attack(self.team_2[enemy_chosen], self.team_1[self.team_2[0].target])
+            else:
+                special_attack = self.generate_enemy_special_attack()
+                if special_attack.status_effect.effect_1 == "heal_percentage" or \
+                        special_attack.status_effect.effect_2 == "heal_percentage":
+                    target_to_heal = self.set_heal_target(self.team_2)
+                    self.sp_atk(self.team_2[enemy_chosen], target_to_heal, special_attack)
+                else:
+                    self.sp_atk(self.team_2[enemy_chosen], self.team_1[self.team_2[0].target], special_attack)
+
+    def set_heal_target(self, entity_team):
+        chosen_entity = entity_team[0]
+        for entity in entity_team:
+            if not (self.is_dead(entity)) and (entity.hp - entity.current_hp) > chosen_entity.hp:
+                chosen_entity = entity
+        return chosen_entity
+
+    def generate_enemy_special_attack(self):
+        sp_atk_id_list = []
+        for sp_atk_id in catalog.sp_atks:
+            sp_atk = catalog.get_sp_atk_details(sp_atk_id)
+            # Excluding aggro to prevent the restriction of freedom on the user's side, the old SQL check also left
+            # out every effect without a second status effect so that is kept the same
+            if sp_atk[2] is not None and "aggro" not in (sp_atk[1], sp_atk[2]):
+                sp_atk_id_list.append(sp_atk)
+        sp_atk = self.random.choice(sp_atk_id_list)
+        if sp_atk[1] == "aoe" or sp_atk[2] == "aoe":
+            sp_atk = AOESpecialAttack(sp_atk[0])
+        elif sp_atk[1] == "drain_atk" or sp_atk[2] == "drain_atk":
+            sp_atk = DrainingSpecialAttack(sp_atk[0])
+        elif sp_atk[1] == "heal_percentage" or sp_atk[2] == "heal_percentage":
+            sp_atk = HealingSpecialAttack(sp_atk[0], sp_atk[3])
+        else:
+            sp_atk = StatusSpecialAttack(sp_atk[0])
+        return sp_atk
+
+    @staticmethod
+    def is_dead(entity_list):
+        count = 0
+        for i in range(len(entity_list)):
+            if entity_list[i].current_hp == 0:  # if an enemy is dead
+                count += 1
+        if count == len(entity_list):
+            return True
+        return False
+
+    def enemy_choice(self):
+        if self.is_dead(self.team_2) or self.is_dead(self.team_1):
+            pass
+        elif self.game_mode in ["easy", "medium"]:
+            valid = True
+            while valid:
+                enemy_choice = self.random.randint(1, len(self.team_2)) - 1
+                if not self.team_2[enemy_choice].is_dead:
+                    return enemy_choice
+        else:
+            sp_atk, ph_atk, enemy_choice = 0, 0, 0
+            for i in range(len(self.team_2)):
+                if self.team_2[i].sp_atk >= sp_atk or self.team_2[i].ph_atk >= ph_atk:
+                    sp_atk, ph_atk, enemy_choice = self.team_2[i].sp_atk, self.team_2[i].ph_atk, i
+            return enemy_choice
+
+    def enemy_target(self):
+        number = 0
+        if self.aggro is not None and not self.team_1[self.aggro].is_dead:
+            for enemy in self.team_2:
+                enemy.target = self.aggro
+                return
+        elif self.team_2[0].target is not None and not self.team_1[self.team_2[0].target].is_dead:
+            if self.game_mode == "easy":
+                valid = True
+                while valid:
+                    number = self.random.randint(0, 5)
+                    if not self.team_1[number].is_dead:
+                        valid = False
+
+        elif self.game_mode == "medium":  # they have no target, random attacking
+            valid = True
+            while valid:
+                if not self.team_1[number].is_dead:
+                    valid = False
+                else:
+                    number = self.random.randint(0, 5)
+
+        elif self.game_mode == "hard":  # they target heroes low on sp_def or ph_def
+            current_sp_def, current_ph_def, number = 0, 0, 0
+            for i in range(0, 6):  # linear search since the data will not be ordered by sp_def and ph_def
+                if current_sp_def <= 0 and current_ph_def <= 0:
+                    current_ph_def, current_sp_def = self.team_1[i].ph_def, self.team_1[i].sp_def
+                    number = i
+                else:
+                    sp_def, ph_def = self.team_1[i].sp_def, self.team_1[i].ph_def
+                    if (sp_def <= current_sp_def or ph_def <= current_ph_def) and not self.team_1[i].sp_atk:
+                        current_ph_def, current_sp_def = self.team_1[i].ph_def, self.team_1[i].sp_def
+                        number = i
+
+        elif self.game_mode == "extreme":  # they target heroes high in sp_atk or ph_atk
+            current_sp_atk, current_ph_atk, number = 0, 0, 0
+            for i in range(0, 6):  # linear search since the data will not be ordered by sp_def and ph_def
+                if current_sp_atk <= 0 and current_ph_atk <= 0:
+                    current_ph_atk, current_sp_atk = self.team_1[i].ph_atk, self.team_1[i].sp_atk
+                    number = i
+                else:
+                    sp_atk, ph_atk = self.team_1[i].sp_atk, self.team_1[i].ph_atk
+                    if (sp_atk >= current_sp_atk or ph_atk >= current_ph_atk) and not self.team_1[i].is_dead:
+                        current_ph_atk, current_sp_atk = self.team_1[i].ph_atk, self.team_1[i].sp_atk
+                        number = i
+
+        for enemy in self.team_2:
+            enemy.target = number  # makes all enemies have a common target
+
+    def generate_enemies(self, game_mode):
+        enemy_type = self.convert("game mode to enemy type", game_mode)
+        number_of_enemies = 0
+        if not isinstance(enemy_type, list):  # Checking the types of monsters that will be brought along
+            enemy_type = [enemy_type]
+        enemies = catalog.get_monster_pool(enemy_type)
+
+        if game_mode == "easy":
+            number_of_enemies = self.random.randint(3, 5)
+            # generate a random amount of enemies
+        elif game_mode == "medium":
+            number_of_enemies = self.random.randint(3, 6)
+        elif game_mode == "hard":
+            number_of_enemies = self.random.randint(4, 6)
+        elif game_mode == "extreme":
+            number_of_enemies = self.random.randint(4, 5)
+
+        main_enemy_list = [Enemy(self.level, *self.random.choice(enemies)) for enemy in range(number_of_enemies)]
+        if self.game_mode == 'extreme':
+            main_enemy_list.append(Enemy(self.level, *self.random.choice(catalog.get_monster_pool(["boss"]))))
+        return main_enemy_list
+
+    def convert(self, purpose, data):  # Overloading
+        if purpose == "number to game mode type":
+            dictionary = {1: "easy",
+                          2: "medium",
+                          3: "hard",
+                          4: "extreme"}
+            value = dictionary[data]
+            return value
+
+        elif purpose == "stat":
+            if 0 <= data <= 4:
+                data = round(data * self.level + 15)
+            return data
+
+        elif purpose == "game mode to enemy type":
+            dictionary = {"easy": "weak",
+                          "medium": ["weak", "medium"],
+                          "hard": ["medium", "strong"],
+                          "extreme": "strong"}
+            enemy_type = dictionary[data]
+            return enemy_type
+
+        elif purpose == "USER potion name":
+            keys = ["Lesser Hp Potion", "Medium Hp Potion", "Grand Hp Potion", "Ph Atk Potion",
+                    "Ph Def Potion", "Sp Atk Potion", "Sp Def Potion", "Crit Rate Potion", "Crit Damage Potion"]
+            values = ["lesser_hp_potion", "medium_hp_potion", "grand_hp_potion", "ph_atk_potion", "ph_def_potion",
+                      "sp_atk_potion", "sp_def_potion", "crit_rate_potion", "crit_damage_potion"]
+            dictionary = {keys[i]: values[i] for i in range(len(values))}
+            potion = dictionary[data]
+            return potion
+
+    def roll_reward_number(self, battle_outcome):
+        number = 0
+        if battle_outcome == "win":  # gain 60-200% of gold, exp
+            number = self.random.randint(6, 20)
+        elif battle_outcome == "lose":  # lose up to 5% of balance
+            number = self.random.randint(0, 5)
+        elif battle_outcome == "flee":  # lose up to 10% of balance
+            number = self.random.randint(0, 10)
+        return number
+
+    def get_win_rewards(self, number):  # Works out the gold and exp for a win from the roll above
+        gold, exp = 0, 0
+        dictionary = {
+            "easy": 1,
+            "medium": 1.5,
+            "hard": 2,
+            "extreme": 3
+        }
+
+        try:
+            for enemy in self.team_2:
+                gold += round(enemy.gold * (number / 10) * (1.05 * self.level) * (dictionary[self.game_mode]))
+                exp += round(enemy.exp * (number / 10) * (1.05 * self.level) * dictionary[self.game_mode])
+        except:
+            gold = round(1000 * (number / 10) * (1.1 * self.level) * dictionary[self.game_mode])
+            exp = round(750 * (number / 10) * (1.1 * self.level) * dictionary[self.game_mode])
+        return gold, exp
+
+    def end_of_turn(self):  # Status effect damage and every timer goes down once both sides have had their go
+        for hero in self.team_1:
+            hero.end_of_turn()
+            hero.decrease_duration()
+        for enemy in self.team_2:
+            enemy.end_of_turn()
+            enemy.decrease_duration()
+        self.turn += 1
+        if sql_tracer is not None:
+            sql_tracer.turn = self.turn
+
+
+class Battle(BattleRules):  # Inheritance, adds the menus and saving on top of the battle rules
+    def __init__(self, user_id):
+        super().__init__(user_id)
+        self.user_data = database  # Aggregation
+        self.gold = 0
+        self.exp = 0
+        if replay_path:
+            self.log = ReplayLog(replay_path, console_log)
+
+    def new_battle(self):  # This screen is reused, so anything left over from the last battle is cleared
+        # will help speed up some processes as less SQL will be needed
+        self.level, self.gold, self.exp = self.user_data.query(f"""
+        SELECT lvl, gold, exp
+        FROM USER
+        WHERE user_id = {self.user_id}""")[0]
+        self.team_1 = []
+        self.team_2 = []
+        self.aggro = None
+        self.stats = StatAccumulator(self.user_id)
+        self.turn = 0
+        if sql_tracer is not None:
+            sql_tracer.turn = 0
+        self.set_seed(seed_source.getrandbits(64))
+
+    def menu(self):  # Polymorphism
+        game_io.print("""
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       BATTLE MENU       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        1. Battle a monster
+        2. Battle another player AI
+        3. Battle another player (2P)\n""")
+        response = right_format_response_number(f"Enter a number between 1 and 3", 1, 3)
+        self.new_battle()
+        if response == 1:
+            return self.pve_menu()
+        elif response == 2:
+            return self.pvp_ai_menu()
+        elif response == 3:
+            return self.pvp_non_ai_menu()
+        elif response == False:
+            response = game_io.input("Returning to the main menu, enter any key to return")
+        return "game menu", self.user_id
+
+    def get_game_mode(self):
+        game_io.print("""
+        Select difficulty:
+            1. Easy
+            2. Medium
+            3. Hard
+            4. Extreme
+            5. Leave\n""")
+        response = right_format_response_number("Please select a number between 1 and 5: ", 1, 5)
+        if response == False:
+            response = game_io.input("Returning to the game menu, enter any key to return: ")
+            return False
+        return response  # 5 means leave the game
+
+    def pve_menu(self):
+        response = self.get_game_mode()
+        if response == False:
+            return "battle", self.user_id
+        elif response == 5:
+            return None  # Ends the game
+        self.game_mode = self.convert("number to game mode type", response)
+        self.team_1 = self.get_user_team(self.user_id)
+        if self.team_1 == False:
+            return "battle", self.user_id
+        return self.start_pve_battle()
+
+    def pvp_ai_menu(self):
+        self.team_1 = self.get_user_team(self.user_id)
+        if self.team_1 == False:
+            return "battle", self.user_id
+        enemy_id = self.get_user_id()  # Gets the user id of the opposing team
+        if enemy_id == False:
+            return "battle", self.user_id
+        self.team_2 = self.get_user_team(enemy_id)
+        if self.team_2 == False:
+            return "battle", self.user_id
+        response = self.get_game_mode()
+        if response == False:
+            return "battle", self.user_id
+        elif response == 5:
+            return None
+        self.game_mode = self.convert("number to game mode type", response)
+        return self.start_pvp_battle("ai")
+
+    def pvp_non_ai_menu(self):
+        self.team_1 = self.get_user_team(self.user_id)
+        if self.team_1 == False:
+            return "battle", self.user_id
+        enemy_id = self.get_user_id()  # Gets the user id of the opposing team
+        if enemy_id == False:
+            return "battle", self.user_id
+        self.team_2 = self.get_user_team(enemy_id)
+        if self.team_2 == False:
+            return "battle", self.user_id
+        return self.start_pvp_battle("2p")
+
+    def get_user_id(self):
+        list_of_users = self.user_data.query("""
+        SELECT user_id, save_file_name
+        FROM USER""")
+        dictionary = {i + 1: list_of_users[i][0] for i in range(len(list_of_users))}
+        game_io.print("Select a save file")
+        for i in range(len(list_of_users)):
+            game_io.print(f"    {i + 1}. - {list_of_users[i][1]}")
+        response = right_format_response_number("Please enter the number of the save file you wish to battle: ", 1,
+                                                len(list_of_users))
+        if response == False:
+            return False
+        else:
+            user_id = dictionary[response]
+            return user_id
+
+    def start_pvp_battle(self, mode):
+        self.stats.increment("games_played")
+        self.team_1 = self.generate_heroes(self.team_1, "hero")
+
+        if mode == "2p":
+            self.team_2 = self.generate_heroes(self.team_2, "hero")
+        elif mode == "ai":
+            self.team_2 = self.generate_heroes(self.team_2, "")
+        else:
+            game_io.print("An unknown error has occured, returning to the main menu")
+            return "battle", self.user_id
+        self.mode = mode
+        self.join_battle()
+
+        battle = True
+        while battle == True:
+            battle = self.main_battle(mode, self.team_1, self.team_2)
+        self.log.finish(battle)
+
+        if battle == "win":
+            self.stats.increment("games_won")
+            if mode == "2p":
+                self.stats.increment("pvp_games_won")
+        elif battle == "lose":
+            self.stats.increment("games_lost")
+        elif battle == "flee":
+            self.stats.increment("games_fled")
+        self.stats.flush()
+
+        if battle == "win":
+            if mode == "ai":
+                self.generate_rewards("win")
+            elif mode == "2p":
+                game_io.print("Player 1 wins")
+
+        elif battle == "lose":
+            if mode == "ai":
+                self.generate_rewards("lose")
+            elif mode == "2p":
+                game_io.print("Player 2 wins")
+
+        elif battle == "flee":
+            if mode == "ai":
+                self.generate_rewards("flee")
+            elif mode == "2p":
+                game_io.print("The battle was not decided")
+        return "game menu", self.user_id
+
+    def start_pve_battle(self):
+        self.stats.increment("games_played")
+        self.team_1 = self.generate_heroes(self.team_1, "hero")
+        self.team_2 = self.generate_enemies(self.game_mode)
+        self.mode = "pve"
+        self.join_battle()
+        battle = True
+
+        while battle == True:
+            battle = self.main_battle("pve", self.team_1, self.team_2)
+        self.log.finish(battle)
+        if battle == 'win':
+            self.stats.increment("games_won")
+        elif battle == 'lose':
+            self.stats.increment("games_lost")
+        elif battle == 'flee':
+            self.stats.increment("games_fled")
+        self.stats.flush()
+        self.generate_rewards(battle)
+        return "game menu", self.user_id
+
+    def select_entity(self, team, text):
+        while True:
+            number = 0
+            if type(team[0]) == Hero or type(team[0]) == AiHero:
+                self.print_hp(team)
+                number = right_format_response_number(text, 1, 6)
+                if number == False:
+                    return - 1
+                else:
+                    number -= 1
+                    if team[number].is_dead:
+                        game_io.print("This hero is already dead, please select another one")
+                        number = self.select_entity(team, text)
+
+            elif type(team[0]) == Enemy:
+                game_io.print()
+                self.print_hp(team)
+                number = right_format_response_number("Please select an enemy to attack: ", 1, len(team))
+                game_io.print()
+                if number == False:
+                    return -1
+                else:
+                    number -= 1
+                    if team[number].is_dead:
+                        game_io.print("This enemy is already dead, please select another one")
+                        number = self.select_entity(team, text)
+            return number
+
+    def select_sp_atk(self, entity):
+        for i in range(len(entity.sp_atk_list)):
+            attack_type = "Attack Type"
+            if type(entity.sp_atk_list[i]) == StatusSpecialAttack:
+                attack_type = "Element"
+            special_attack_number = self.colour.label("None", "Special Attack " + str(i + 1))
+            game_io.print(f"\n{special_attack_number}: {entity.sp_atk_list[i].name}\n"
+                  f"{self.colour.label('None', 'Mana Cost')}: {entity.sp_atk_list[i].mana_cost}\n"
+                  f"{self.colour.label('None', attack_type)}: "
+                  f"{self.colour.effect_colour(entity.sp_atk_list[i].status_effect.name)}\n")
+        game_io.print()
+        response = right_format_response_number(f"""Please select a number between  1 and  {len(entity.sp_atk_list)}""",
+                                                1, len(entity.sp_atk_list))
+        if response == False:
+            return False
+        else:
+            response -= 1
+            if not self.check_mana(entity, entity.sp_atk_list[response]):
+                game_io.print("You do not have enough mana for this special attack: ")
+                return False
+            else:
+                return entity.sp_atk_list[response]
+
+    def main_battle(self, mode, team_attacking, team_defending):
+        turn = None
+
+        if team_attacking == self.team_1:
+            game_io.print(self.colour.label("underline", "~~~~~~ PLAYER 1's turn: ~~~~~~"))
+        else:
+            game_io.print(self.colour.label("underline", "~~~~~~ PLAYER 2's turn: ~~~~~~"))
+
+        response = self.print_options()
+        for entity in self.team_1 + self.team_2:  # Only the living, so each defeat is only reported once
+            if not entity.is_dead:
+                entity.check_status(self.stats)
+
+        if response == 1:  # attack
+            hero_number = self.select_entity(team_attacking, "Please select a hero to attack with: ")
+            if hero_number + 1 == False:
+                turn = 'skip'
+            else:
+                enemy_number = self.select_entity(team_defending, "Please select an enemy to attack: ")
+                if enemy_number + 1 == False:
                     turn = 'skip'
                 else:
                     hero_attacking = team_attacking[hero_number]
                     enemy_defending = team_defending[enemy_number]
+                    self.log.action("attack", hero_attacking, enemy_defending)
                     self.attack(hero_attacking, enemy_defending)
                     if mode == "ai" or mode == "pve":
                         self.enemy_turn()
@@ -1489,8 +2328,10 @@ class Battle:
                     if number + 1 == False:
                         turn = 'skip'
                     else:
+                        self.log.action("sp_atk", hero_attacking, entity_selected, sp_atk_selected)
                         self.sp_atk(hero_attacking, entity_selected, sp_atk_selected)
                 elif sp_atk_selected.type == "aoe":
+                    self.log.action("sp_atk", hero_attacking, None, sp_atk_selected)
                     self.aoe_attack(team_attacking[number], team_defending, sp_atk_selected)
                 if turn == 'skip':
                     pass
@@ -1504,8 +2345,9 @@ class Battle:
             if potion_selected == False or hero_selected == False:
                 turn = 'skip'
             else:
+                self.log.action("potion", hero_selected, number=potion_selected)
                 self.apply_potion(potion_selected, hero_selected)
-                self.user_data.increment_value("USER", "potions_used", "user_id", self.user_id)
+                self.stats.increment("potions_used")
                 if mode == "ai" or mode == "pve":
                     self.enemy_turn()
 
@@ -1514,23 +2356,24 @@ class Battle:
             turn = "skip"
 
         elif response == 5:  # fleeing
+            self.log.action("flee")
             return "flee"
 
+        if turn == 'skip' and mode == "player 2":
+            return "skip"
         if mode == "2p" and turn != 'skip' and not self.is_dead(self.team_1) and not self.is_dead(self.team_2):
-            self.main_battle("", self.team_2, self.team_1)
+            battle = "skip"
+            while battle == "skip":  # Player 2 has to make a move before the turn can end, the same as player 1
+                battle = self.main_battle("player 2", self.team_2, self.team_1)
+            return battle
 
         if turn != 'skip' and mode != "2p":
             valid = self.check_effect_list()
             if valid:
-                print(self.colour.return_colour_text("None", "\n------ End Of Turn ------"))
+                game_io.print(self.colour.label("None", "\n------ End Of Turn ------"))
 
-            for hero in self.team_1:
-                hero.end_of_turn()
-                hero.decrease_duration()
-            for enemy in self.team_2:
-                enemy.end_of_turn()
-                enemy.decrease_duration()
-            print()
+            self.end_of_turn()
+            game_io.print()
 
         if self.is_dead(self.team_1):
             return "lose"
@@ -1540,34 +2383,17 @@ class Battle:
 
     def check_effect_list(self):  # Checks if any entity in the list has an effect or not
         for hero in self.team_1:
-            if len(hero.effect_count.counter) != 0:
+            if len(hero.effect_count) != 0:
                 return True
         for enemy in self.team_2:
-            if len(enemy.effect_count.counter) != 0:
+            if len(enemy.effect_count) != 0:
                 return False
 
-    def generate_potions(self):
-        potions = self.user_data.query("""
-        SELECT item_name, percentage, stat, duration
-        FROM POTIONS""")
-        potion_list = []
-        for potion in potions:
-            if potion[3] == 0:  # Means that it is a restoration potion
-                potion_list.append(Potion(potion[0], potion[1]))
-            else:
-                potion_list.append(BuffPotion(potion[0], potion[1], potion[2], potion[3]))
-        return potion_list
-
     def apply_potion(self, potion_selected, hero_selected):
         potion = self.potion_list[potion_selected]
         hero_selected.use_potion(potion)
         potion_name = self.convert("USER potion name", potion.item_name)
-        potions = self.user_data.query(f"""
-        SELECT {potion_name}
-        FROM USER
-        WHERE user_id = {self.user_id}""")[0][0]
-        potions -= 1
-        self.user_data.update_record("USER", potion_name, potions, "user_id", self.user_id)
+        self.user_data.increment_value("USER", potion_name, "user_id", self.user_id, -1)  # Saved straight away as the menu shows what is left
 
     def get_potions(self):
         potions = self.user_data.query(f"""
@@ -1584,111 +2410,30 @@ class Battle:
                   "Critical Chance Potion", "Critical Attack Potion"]
 
         for i in range(len(titles)):
-            print(f"{i + 1}. {titles[i]} : {potions[i]}")
+            game_io.print(f"{i + 1}. {titles[i]} : {potions[i]}")
         potion_selected = right_format_response_number("\nEnter the number of the potion: ", 1, len(potions))
         if potion_selected == False:
             return False, False
         else:
-            potion_selected -= 1
-            if potions[potion_selected] == 0:
-                print("You have not got enough potions, returning back to the option screen")
-                return False, False
-
-        self.print_hp(self.team_1)
-        hero_selected = right_format_response_number("\nEnter the number of the hero: ", 1, 6)
-        if hero_selected == False:
-            return False, False
-        else:
-            hero_selected -= 1
-            if self.team_1[hero_selected].is_dead:
-                print("This hero is dead, you cannot use a potion on him, returning to the option screen")
-                return False, False
-            else:
-                return potion_selected, self.team_1[hero_selected]
-
-    def attack(self, e_attacking, e_defending):
-        print(self.colour.return_colour_text("None", f"\n------ {e_attacking.name} ------"))
-        crit_damage = self.get_crit_damage(e_attacking)
-        additional_atk = round(0.1 * e_attacking.ph_atk)
-        var_atk = random.randint(round(e_attacking.ph_atk - additional_atk), round(e_attacking.ph_atk + additional_atk))
-        hero_damage = var_atk * crit_damage
-        total_damage = round(hero_damage - 0.05 * e_defending.ph_def)
-        number = random.randint(1, 100)
-        if e_attacking.miss_rate >= number:
-            total_damage = 0
-            print(f"{e_attacking.name} missed the attack, no damage was dealt to {e_defending.name}")
-        else:
-            print(f"{e_attacking.name} dealt {total_damage} damage to {e_defending.name}")
-        e_defending.damage(total_damage)
-        e_defending.check_status(self.user_id)
-
-    @staticmethod
-    def get_crit_damage(entity_selected):
-        crit_rate = random.randint(1, 100)
-        if entity_selected.crit_rate <= crit_rate:
-            crit_damage = entity_selected.crit_damage / 100
-        else:
-            crit_damage = 1
-        return crit_damage
-
-    def enemy_turn(self):
-        # 50% chance of sp atk, 50% chance of normal attack
-        # takes difficulty into consideration of targets
-        self.enemy_target()  # adjusts targets
-        enemy_chosen = self.enemy_choice()
-        if enemy_chosen is None:
-            pass
-        else:
-            number = random.randint(0, 100)
-            if number <= 50:
-                self.attack(self.team_2[enemy_chosen], self.team_1[self.team_2[0].target])
-            else:
-                special_attack = self.generate_enemy_special_attack()
-                if special_attack.status_effect.effect_1 == "heal_percentage" or \
-                        special_attack.status_effect.effect_2 == "heal_percentage":
-                    target_to_heal = self.set_heal_target(self.team_2)
-                    self.sp_atk(self.team_2[enemy_chosen], target_to_heal, special_attack)
-                else:
-                    self.sp_atk(self.team_2[enemy_chosen], self.team_1[self.team_2[0].target], special_attack)
-
-    def set_heal_target(self, entity_team):
-        chosen_entity = entity_team[0]
-        for entity in entity_team:
-            if not (self.is_dead(entity)) and (entity.hp - entity.current_hp) > chosen_entity.hp:
-                chosen_entity = entity
-        return chosen_entity
-
-    def generate_enemy_special_attack(self):
-        sp_atk_id_list = self.user_data.query("""
-        SELECT SP_ATK.sp_atk_id, STATUS_EFFECTS.status_effect_1, STATUS_EFFECTS.status_effect_2, SP_ATK.sp_atk_duration
-        FROM SP_ATK
-        INNER JOIN STATUS_EFFECTS
-        ON STATUS_EFFECTS.status_id = SP_ATK.status_id
-        WHERE NOT STATUS_EFFECTS.status_effect_1 = 'aggro' AND NOT STATUS_EFFECTS.status_effect_2 = 'aggro'""")
-        # Excluding aggro to prevent the restriction of freedom on the user's side
-        sp_atk = random.choice(sp_atk_id_list)
-        if sp_atk[1] == "aoe" or sp_atk[2] == "aoe":
-            sp_atk = AOESpecialAttack(sp_atk[0])
-        elif sp_atk[1] == "drain_atk" or sp_atk[2] == "drain_atk":
-            sp_atk = DrainingSpecialAttack(sp_atk[0])
-        elif sp_atk[1] == "heal_percentage" or sp_atk[2] == "heal_percentage":
-            sp_atk = HealingSpecialAttack(sp_atk[0], sp_atk[3])
-        else:
-            sp_atk = StatusSpecialAttack(sp_atk[0])
-        return sp_atk
-
-    @staticmethod
-    def is_dead(entity_list):
-        count = 0
-        for i in range(len(entity_list)):
-            if entity_list[i].current_hp == 0:  # if an enemy is dead
-                count += 1
-        if count == len(entity_list):
-            return True
-        return False
+            potion_selected -= 1
+            if potions[potion_selected] == 0:
+                game_io.print("You have not got enough potions, returning back to the option screen")
+                return False, False
+
+        self.print_hp(self.team_1)
+        hero_selected = right_format_response_number("\nEnter the number of the hero: ", 1, 6)
+        if hero_selected == False:
+            return False, False
+        else:
+            hero_selected -= 1
+            if self.team_1[hero_selected].is_dead:
+                game_io.print("This hero is dead, you cannot use a potion on him, returning to the option screen")
+                return False, False
+            else:
+                return potion_selected, self.team_1[hero_selected]
 
     def print_options(self):
-        print("""
+        game_io.print("""
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       BATTLE       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         1. Attack 
         2. SP Attack  
@@ -1698,136 +2443,14 @@ class Battle:
         """)
         response = right_format_response_number("Please enter a number between 1 and 5: ", 1, 5)
         if response == False:
-            self.print_options()
+            return self.print_options()
         else:
             return response
 
-    def generate_enemies(self, game_mode):
-        enemy_type = self.convert("game mode to enemy type", game_mode)
-        selected_enemies = []
-        main_enemy_list = []
-        number_of_enemies = 0
-        if isinstance(enemy_type, list):  # Checking the types of monsters that will be brought along
-            enemies = self.user_data.query("""
-            SELECT monster_id
-            FROM MONSTERS
-            WHERE enemy_type = '{}'
-            UNION ALL
-            SELECT monster_id
-            FROM MONSTERS
-            WHERE enemy_type = '{}'""".format(enemy_type[0], enemy_type[1]))
-        else:
-            enemies = self.user_data.query("""
-            SELECT monster_id
-            FROM MONSTERS
-            WHERE enemy_type = '{}'""".format(enemy_type))  # selecting monster id only will help save space
-
-        if game_mode == "easy":
-            number_of_enemies = random.randint(3, 5)
-            # generate a random amount of enemies
-        elif game_mode == "medium":
-            number_of_enemies = random.randint(3, 6)
-        elif game_mode == "hard":
-            number_of_enemies = random.randint(4, 6)
-        elif game_mode == "extreme":
-            number_of_enemies = random.randint(4, 5)
-
-        for enemy in range(number_of_enemies):
-            monster_id = random.choice(enemies)
-            temp = self.user_data.query("""
-            SELECT *
-            FROM MONSTERS
-            WHERE monster_id = {}""".format(monster_id[0]))
-            # Created the monsters after finding ids, this way, I will only need 6 full records at most compared to 30
-            # This reduces the total memory used
-            selected_enemies.append(temp)
-
-        if self.game_mode == 'extreme':
-            data = self.user_data.query("""
-            SELECT *
-            FROM MONSTERS
-            WHERE enemy_type = 'boss'""")
-            selected_enemies.append(random.choice(data))
-
-        for enemy in selected_enemies:  # creates an enemy class
-            try:
-                main_enemy_list.append(Enemy(self.level, *enemy[0]))  # For most enemies
-            except:
-                main_enemy_list.append(Enemy(self.level, *enemy))  # For bosses
-        return main_enemy_list
-
-    def enemy_choice(self):
-        if self.is_dead(self.team_2) or self.is_dead(self.team_1):
-            pass
-        elif self.game_mode in ["easy", "medium"]:
-            valid = True
-            while valid:
-                enemy_choice = random.randint(1, len(self.team_2)) - 1
-                if not self.team_2[enemy_choice].is_dead:
-                    return enemy_choice
-        else:
-            sp_atk, ph_atk, enemy_choice = 0, 0, 0
-            for i in range(len(self.team_2)):
-                if self.team_2[i].sp_atk >= sp_atk or self.team_2[i].ph_atk >= ph_atk:
-                    sp_atk, ph_atk, enemy_choice = self.team_2[i].sp_atk, self.team_2[i].ph_atk, i
-            return enemy_choice
-
-    def enemy_target(self):
-        number = 0
-        if self.aggro is not None and not self.team_1[self.aggro].is_dead:
-            for enemy in self.team_2:
-                enemy.target = self.aggro
-                return
-        elif self.team_2[0].target is not None and not self.team_1[self.team_2[0].target].is_dead:
-            if self.game_mode == "easy":
-                valid = True
-                while valid:
-                    number = random.randint(0, 5)
-                    if not self.team_1[number].is_dead:
-                        valid = False
-
-        elif self.game_mode == "medium":  # they have no target, random attacking
-            valid = True
-            while valid:
-                if not self.team_1[number].is_dead:
-                    valid = False
-                else:
-                    number = random.randint(0, 5)
-
-        elif self.game_mode == "hard":  # they target heroes low on sp_def or ph_def
-            current_sp_def, current_ph_def, number = 0, 0, 0
-            for i in range(0, 6):  # linear search since the data will not be ordered by sp_def and ph_def
-                if current_sp_def <= 0 and current_ph_def <= 0:
-                    current_ph_def, current_sp_def = self.team_1[i].ph_def, self.team_1[i].sp_def
-                    number = i
-                else:
-                    sp_def, ph_def = self.team_1[i].sp_def, self.team_1[i].ph_def
-                    if (sp_def <= current_sp_def or ph_def <= current_ph_def) and not self.team_1[i].sp_atk:
-                        current_ph_def, current_sp_def = self.team_1[i].ph_def, self.team_1[i].sp_def
-                        number = i
-
-        elif self.game_mode == "extreme":  # they target heroes high in sp_atk or ph_atk
-            current_sp_atk, current_ph_atk, number = 0, 0, 0
-            for i in range(0, 6):  # linear search since the data will not be ordered by sp_def and ph_def
-                if current_sp_atk <= 0 and current_ph_atk <= 0:
-                    current_ph_atk, current_sp_atk = self.team_1[i].ph_atk, self.team_1[i].sp_atk
-                    number = i
-                else:
-                    sp_atk, ph_atk = self.team_1[i].sp_atk, self.team_1[i].ph_atk
-                    if (sp_atk >= current_sp_atk or ph_atk >= current_ph_atk) and not self.team_1[i].is_dead:
-                        current_ph_atk, current_sp_atk = self.team_1[i].ph_atk, self.team_1[i].sp_atk
-                        number = i
-
-        for enemy in self.team_2:
-            enemy.target = number  # makes all enemies have a common target
-
     def generate_heroes(self, user_team, purpose):
         main_hero_list = []
-        hero_list_temp = self.user_data.query("""
-        SELECT hero_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage
-        FROM HEROES
-        WHERE hero_id in {}
-        """.format(user_team[2:8]))
+        # Sorted by id to keep the same order that the old "hero_id in (...)" query gave
+        hero_list_temp = list(catalog.get_heroes(sorted(set(user_team[2:8]))).values())
         for hero in hero_list_temp:
             if purpose == "hero":
                 main_hero_list.append(Hero(self.level, *hero))
@@ -1838,33 +2461,29 @@ class Battle:
     def print_hp(self, entity_list):
         x = 1
         for entity in entity_list:
-            if entity.effect_count.counter == []:
+            if len(entity.effect_count) == 0:
                 effect_list = None
             else:
                 effect_list = []
-                for count in entity.effect_count.counter:
-                    for key, value in count.items():
-                        if type(value) == StatusSpecialAttack:
-                            effect_list.append(f"{self.colour.effect_colour(value.status_effect.name)}")
-                        else:
-                            effect_list.append(f"{self.colour.effect_colour(value.name)}")
+                for entry_number, name, item in entity.effect_count.active():
+                    effect_list.append(f"{self.colour.effect_colour(entity.effect_count.get_effect(item).name)}")
             if entity.is_dead:
                 defeated = "defeated"
             else:
                 defeated = "None"
 
             if type(entity) == Hero:
-                print(f"{self.colour.return_colour_text(defeated, f'{x}. {entity.name}')}: " +
+                game_io.print(f"{self.colour.label(defeated, f'{x}. {entity.name}')}: " +
                       f"\n      {self.colour.effect_colour('hp')}: {round(entity.current_hp)} / {entity.hp}" +
                       f"\n      {self.colour.effect_colour('mana')}: {entity.mana} / 100")
 
             elif type(entity) == Enemy or type(entity) == AiHero:
-                print(f"{self.colour.return_colour_text(defeated, f'{x}. {entity.name}')} :" +
+                game_io.print(f"{self.colour.label(defeated, f'{x}. {entity.name}')} :" +
                       f"\n      {self.colour.effect_colour('hp')}:{entity.current_hp} / {entity.hp}")
             if effect_list is None:
-                print("      Effects: None\n")
+                game_io.print("      Effects: None\n")
             else:
-                print("      Effects: " + ", ".join(effect for effect in effect_list) + "\n")
+                game_io.print("      Effects: " + ", ".join(effect for effect in effect_list) + "\n")
             x += 1
 
     def get_stat(self, stat):
@@ -1874,123 +2493,71 @@ class Battle:
                     WHERE user_id = {}""".format(stat, self.user_id))
         return stat[0][0]
 
-    def convert(self, purpose, data):  # Overloading
+    def convert(self, purpose, data):  # Overriding, only this purpose needs the database
         if purpose == "status_id to name":
             data = self.user_data.query("""
             SELECT status_name
             FROM STATUS_EFFECTS
             WHERE status_id = {}""".format(data))[0][0]
             return data
-
-        if purpose == "number to game mode type":
-            dictionary = {1: "easy",
-                          2: "medium",
-                          3: "hard",
-                          4: "extreme"}
-            value = dictionary[data]
-            return value
-
-        elif purpose == "stat":
-            if 0 <= data <= 4:
-                data = round(data * self.level + 15)
-            return data
-
-        elif purpose == "game mode to enemy type":
-            dictionary = {"easy": "weak",
-                          "medium": ["weak", "medium"],
-                          "hard": ["medium", "strong"],
-                          "extreme": "strong"}
-            enemy_type = dictionary[data]
-            return enemy_type
-
-        elif purpose == "USER potion name":
-            keys = ["Lesser Hp Potion", "Medium Hp Potion", "Grand Hp Potion", "Ph Atk Potion",
-                    "Ph Def Potion", "Sp Atk Potion", "Sp Def Potion", "Crit Rate Potion", "Crit Damage Potion"]
-            values = ["lesser_hp_potion", "medium_hp_potion", "grand_hp_potion", "ph_atk_potion", "ph_def_potion",
-                      "sp_atk_potion", "sp_def_potion", "crit_rate_potion", "crit_damage_potion"]
-            dictionary = {keys[i]: values[i] for i in range(len(values))}
-            potion = dictionary[data]
-            return potion
+        return super().convert(purpose, data)
 
     def get_user_team(self, user_id):
         teams = Team(user_id)
         team_list = teams.get_team_formations()
         if len(team_list) == 0:
-            print("You need to create a team first, please try to create a team before starting a battle")
-            rpg = Rpg(user_id)
-            rpg.menu()  # recursion
+            game_io.print("You need to create a team first, please try to create a team before starting a battle")
+            return False
         teams.print_team_formations()
         response = right_format_response_number(f"Enter the number of the team you wish to play with: ",
                                                 1, len(team_list))
-        print()
+        game_io.print()
         if response == False:
-            self.menu()
+            return False
         else:
             response -= 1
             try:
                 user_team = teams.get_single_team(response)
                 return user_team
             except:
-                print("Something went wrong, please try again")
+                game_io.print("Something went wrong, please try again")
+                return False
 
     def generate_rewards(self, battle_outcome):
-        number = 0
         self.level += 1
+        number = self.roll_reward_number(battle_outcome)
         if battle_outcome == "win":  # gain 60-200% of gold, exp
-            number = random.randint(6, 20)
-            gold, exp = 0, 0
-            dictionary = {
-                "easy": 1,
-                "medium": 1.5,
-                "hard": 2,
-                "extreme": 3
-            }
-
-            try:
-                for enemy in self.team_2:
-                    gold += round(enemy.gold * (number / 10) * (1.05 * self.level) * (dictionary[self.game_mode]))
-                    exp += round(enemy.exp * (number / 10) * (1.05 * self.level) * dictionary[self.game_mode])
-            except:
-                gold = round(1000 * (number / 10) * (1.1 * self.level) * dictionary[self.game_mode])
-                exp = round(750 * (number / 10) * (1.1 * self.level) * dictionary[self.game_mode])
-            print(f"""
+            gold, exp = self.get_win_rewards(number)
+            game_io.print(f"""
             Defeated {len(self.team_2)} enemies on {self.game_mode} mode.
             Rewards:
-                {self.colour.return_colour_text('None', "Gold")} : {gold}
-                {self.colour.return_colour_text('None', 'Exp')} : {exp}""")
+                {self.colour.label('None', "Gold")} : {gold}
+                {self.colour.label('None', 'Exp')} : {exp}""")
             new_gold = self.gold + gold
             current_exp = self.exp + exp
             check, new_exp, previous_level = self.check_level_up(current_exp)
             if check:
-                print(f"""
+                game_io.print(f"""
                 You have Leveled Up!
-                {self.colour.return_colour_text('None', 'Level')} : {previous_level}  -> {self.level}
-                {self.colour.return_colour_text('None', 'Exp')} :    {current_exp}  -> {new_exp}""")
+                {self.colour.label('None', 'Level')} : {previous_level}  -> {self.level}
+                {self.colour.label('None', 'Exp')} :    {current_exp}  -> {new_exp}""")
             self.user_data.update_record("USER", "lvl", self.level, "user_id", self.user_id)
             self.user_data.update_record("USER", "exp", new_exp, "user_id", self.user_id)
             self.user_data.update_record("USER", "gold", new_gold, "user_id", self.user_id)
-            response = input("Returning to the main menu, enter any button to return to the main menu: ")
-            rpg = Rpg(self.user_id)
-            rpg.menu()
-
-        elif battle_outcome == "lose":  # lose up to 5% of balance
-            number = random.randint(0, 5)
-        elif battle_outcome == "flee":  # lose up to 10% of balance
-            number = random.randint(0, 10)
+            response = game_io.input("Returning to the main menu, enter any button to return to the main menu: ")
+            return
 
         if number == 0:
-            print("You have lost, however, you shall not be penalised this time")
+            game_io.print("You have lost, however, you shall not be penalised this time")
         else:
             number = 0.01 * number  # converting to a usable percentage
             new_gold = round(self.gold - (number * self.gold))
-            print("""
+            game_io.print("""
             The enemies have taken {}% of your balance
             You are now at {} gold.
             """.format(number * 100, new_gold))
             self.user_data.update_record("USER", "gold", new_gold, "user_id", self.user_id)
-        response = input("Enter any button to return to the main menu")
-        rpg = Rpg(self.user_id)
-        rpg.menu()
+        response = game_io.input("Enter any button to return to the main menu")
 
     def check_level_up(self, exp):
         previous_level = self.level
@@ -2037,18 +2604,144 @@ class Battle:
     def present_stats(self, dictionary, data):
         for key, value in dictionary.items():
             stat, hero_name = self.get_highest_stat(key, data)
-            print(f"""
+            game_io.print(f"""
             {value} - {hero_name}
                 Currently - {stat}""")
 
 
+class BattleEngine(BattleRules):  # Inheritance, plays a battle one action at a time without input() or print()
+    def __init__(self, team_1, team_2, mode, seed=None, game_mode="easy", level=0, log=None, basic_attacks=False):
+        super().__init__(None, EventLog() if log is None else log)  # No save file, so nothing is written to the database
+        self.mode = mode  # "pve", "ai" or "2p", the same as Battle.main_battle
+        self.game_mode = game_mode  # Decides how the enemies pick their targets
+        self.level = level
+        self.basic_attacks = basic_attacks  # Nobody uses a special attack, the same battles the numpy kernel plays
+        self.set_seed(seed)
+        # The AI's choices have their own stream, so replaying its actions rolls the battle's dice in the same order
+        # Unseeded battles get a fresh stream too, otherwise they would all share the one seeded from "None:ai"
+        self.ai_random = random.Random(f"{seed}:ai") if seed is not None else random.Random()
+        if team_2 is None:  # Enemies for a pve battle can be generated from the seed, like Battle.start_pve_battle
+            team_2 = self.generate_enemies(game_mode)
+        self.team_1 = team_1
+        self.team_2 = team_2
+        self.player = 1  # Only changes in 2p battles, where player 2 moves before the end of the turn
+        self.outcome = None  # Becomes "win", "lose" or "flee" once the battle is over
+        self.join_battle()
+
+    def step(self, action):  # Plays one action and returns the events that it caused
+        if self.outcome is not None:
+            raise ValueError("The battle is already over")
+        first_event = len(self.log.events)
+        turn = self.turn
+        for entity in self.team_1 + self.team_2:  # Catches anything defeated by damage at the end of the last turn
+            if not entity.is_dead:
+                entity.check_status(self.stats)
+
+        if action[0] == "flee":
+            self.log.action("flee")
+            self.outcome = "flee"
+        else:
+            if self.player == 1:
+                self.do_action(action, self.team_1, self.team_2)
+            else:
+                self.do_action(action, self.team_2, self.team_1)
+            if self.mode in ["ai", "pve"]:
+                self.enemy_turn()
+
+            if self.mode == "2p" and self.player == 1:
+                self.player = 2
+            else:
+                self.player = 1
+                self.end_of_turn()
+
+            if self.is_dead(self.team_1):
+                self.outcome = "lose"
+            elif self.is_dead(self.team_2):
+                self.outcome = "win"
+
+        events = self.log.events[first_event:]
+        for event in events:
+            event["turn"] = turn
+        return events
+
+    def do_action(self, action, team_attacking, team_defending):
+        if action[0] == "attack":  # ("attack", hero number, enemy number)
+            hero, target = self.get_entity(team_attacking, action[1]), self.get_entity(team_defending, action[2])
+            self.log.action("attack", hero, target)
+            self.attack(hero, target)
+
+        elif action[0] == "sp_atk":  # ("sp_atk", hero number, special attack number, target number)
+            hero = self.get_entity(team_attacking, action[1])
+            sp_atk = hero.sp_atk_list[action[2]]
+            if not self.check_mana(hero, sp_atk):
+                raise ValueError(f"{hero.name} does not have enough mana for {sp_atk.name}")
+            if sp_atk.type == "aoe":
+                self.log.action("sp_atk", hero, None, sp_atk)
+                self.aoe_attack(hero, team_defending, sp_atk)
+            else:
+                if sp_atk.type == "heal_percentage":  # Heals target the hero's own team
+                    target = self.get_entity(team_attacking, action[3])
+                else:
+                    target = self.get_entity(team_defending, action[3])
+                self.log.action("sp_atk", hero, target, sp_atk)
+                self.sp_atk(hero, target, sp_atk)
+            self.use_mana(hero, sp_atk)
+
+        elif action[0] == "potion":  # ("potion", Potion object, hero number)
+            hero = self.get_entity(team_attacking, action[2])
+            potion_names = [potion.item_name for potion in self.potion_list]
+            self.log.action("potion", hero, number=potion_names.index(action[1].item_name))
+            hero.use_potion(action[1])
+
+        else:
+            raise ValueError(f"Unknown action '{action[0]}'")
+
+    def choose_action(self):  # Picks an action for whoever moves next, this is how heroes are controlled by the AI
+        if self.player == 1:
+            team, enemies = self.team_1, self.team_2
+        else:
+            team, enemies = self.team_2, self.team_1
+        heroes = [i for i in range(len(team)) if team[i].current_hp > 0]
+        targets = [i for i in range(len(enemies)) if enemies[i].current_hp > 0]
+        number = self.ai_random.choice(heroes)
+        hero = team[number]
+        target = min(targets, key=lambda i: enemies[i].current_hp)  # Finishing off the weakest enemy first
+
+        sp_atks = [i for i in range(len(hero.sp_atk_list)) if self.check_mana(hero, hero.sp_atk_list[i])]
+        # 50% chance of a special attack when there is enough mana
+        if sp_atks and not self.basic_attacks and self.ai_random.randint(1, 100) <= 50:
+            sp_atk_number = self.ai_random.choice(sp_atks)
+            if hero.sp_atk_list[sp_atk_number].type == "heal_percentage":
+                target = max(heroes, key=lambda i: team[i].hp - team[i].current_hp)  # Heals the most injured hero
+            return "sp_atk", number, sp_atk_number, target
+        return "attack", number, target
+
+    def enemy_turn(self):  # Polymorphism, with basic_attacks the enemies only attack but still pick targets the same way
+        if not self.basic_attacks:
+            return super().enemy_turn()
+        self.enemy_target()
+        enemy_chosen = self.enemy_choice()
+        if enemy_chosen is not None:
+            self.attack(self.team_2[enemy_chosen], self.team_1[self.team_2[0].target])
+
+    @staticmethod
+    def get_entity(team, number):
+        if not 0 <= number < len(team) or team[number].is_dead:
+            raise ValueError(f"There is no entity that can be selected at position {number}")
+        return team[number]
+
+
 class Potion:
+    __slots__ = ("item_name", "percentage")  # No __dict__, battles make a lot of these objects
+
     def __init__(self, item_name, percentage):
         self.item_name = item_name
         self.percentage = percentage
 
 
 class BuffPotion(Potion):  # Inheritance and subclass
+    __slots__ = ("stat", "duration")
+
     def __init__(self, item_name, percentage, stat, duration):
         super().__init__(item_name, percentage)
         self.stat = stat
@@ -2056,8 +2749,10 @@ class BuffPotion(Potion):  # Inheritance and subclass
 
 
 class Effect:
+    __slots__ = ("id", "name", "description", "effect_1", "effect_1_percentage", "effect_2", "effect_2_percentage",
+                 "duration", "condition_1", "condition_2")
+
     def __init__(self, effect_id):
-        self.user_data = SQLite()
         self.id = effect_id
         self.name = self.get_data("status_name")
         self.description = self.get_data("status_description")
@@ -2070,16 +2765,14 @@ class Effect:
         self.condition_2 = self.get_data("condition_2")
 
     def get_data(self, attribute):
-        data = self.user_data.query(f"""
-        SELECT {attribute}
-        FROM STATUS_EFFECTS
-        WHERE status_id = {self.id}""")[0][0]
+        data = catalog.status_effects[self.id][attribute]
         return data
 
 
 class SpecialAttack:
+    __slots__ = ("id", "name", "percentage", "status_effect", "mana_cost", "type")
+
     def __init__(self, sp_atk_id):
-        self.user_data = SQLite()
         self.id = sp_atk_id
         self.name = self.get_data("sp_atk_name")
         self.percentage = self.get_data("sp_atk_percentage")
@@ -2088,14 +2781,13 @@ class SpecialAttack:
         self.type = None
 
     def get_data(self, attribute):
-        data = self.user_data.query(f"""
-        SELECT {attribute}
-        FROM SP_ATK
-        WHERE sp_atk_id = {self.id}""")[0][0]
+        data = catalog.sp_atks[self.id][attribute]
         return data
 
 
 class StatusSpecialAttack(SpecialAttack):
+    __slots__ = ("duration",)
+
     def __init__(self, sp_atk_id):
         super().__init__(sp_atk_id)
         self.duration = self.get_data("sp_atk_duration")
@@ -2103,12 +2795,16 @@ class StatusSpecialAttack(SpecialAttack):
 
 
 class AOESpecialAttack(SpecialAttack):
+    __slots__ = ()
+
     def __init__(self, sp_atk_id):
         super().__init__(sp_atk_id)
         self.type = "aoe"
 
 
 class HealingSpecialAttack(SpecialAttack):
+    __slots__ = ("duration",)
+
     def __init__(self, sp_atk_id, duration):
         super().__init__(sp_atk_id)
         self.duration = duration
@@ -2116,117 +2812,171 @@ class HealingSpecialAttack(SpecialAttack):
 
 
 class DrainingSpecialAttack(SpecialAttack):
+    __slots__ = ()
+
     def __init__(self, sp_atk_id):
         super().__init__(sp_atk_id)
         self.type = "draining"
 
 
 class AggroSpecialAttack(SpecialAttack):
+    __slots__ = ()
+
     def __init__(self, sp_atk_id):
         super().__init__(sp_atk_id)
         self.type = "aggro"
 
 
 class Queue:  # Will be used in the counting of buffs as well as effects on the user/enemy
+    __slots__ = ("turn", "expiry_heap", "entries", "entry_number")
+
     def __init__(self):
-        self.user_data = SQLite()
-        self.counter = []  # Will hold dictionaries
+        self.turn = 0  # How many ends of turn this queue has been through
+        self.expiry_heap = []  # (turn it runs out on, entry number), the next thing to run out is always first
+        self.entries = {}  # entry number -> (name, item) for everything still active, oldest first
+        self.entry_number = 0
 
-    def add_to_list(self, name, duration):
-        self.counter.append({name: duration})
+    def add(self, name, item, duration):  # Lasts for the rest of this turn and then "duration" more turns
+        self.entry_number += 1
+        self.entries[self.entry_number] = (name, item)
+        heapq.heappush(self.expiry_heap, (self.turn + duration + 1, self.entry_number))
+        return self.entry_number
 
-    def remove_from_list(self, item):
-        data = list(item.keys())[0]
-        self.counter.remove(item)
-        return data
+    def remove(self, entry_number):  # Left in the heap, it is skipped over when its turn comes up
+        return self.entries.pop(entry_number)
+
+    def expire_due(self):  # Occurs at the end of a turn, only looks at what runs out this turn
+        self.turn += 1
+        expired = []
+        while self.expiry_heap and self.expiry_heap[0][0] <= self.turn:
+            expiry_turn, entry_number = heapq.heappop(self.expiry_heap)
+            if entry_number in self.entries:
+                expired.append(self.entries.pop(entry_number))
+        return expired  # Used in the hero class to restore a certain stat
 
-    def decrease_duration(self):  # Occurs at the end of a turn
-        stat_list = []
-        for count in self.counter:
-            for key, value in count.items():
-                count[key] -= 1
-                if count[key] == -1:  # When the potion wears off
-                    stat = self.remove_from_list(count)
-                    stat_list.append(stat)
-        return stat_list  # Used in the hero class to restore a certain stat
+    def active(self):  # A copy, so entries can be removed while looping over it
+        return [(entry_number, name, item) for entry_number, (name, item) in self.entries.items()]
+
+    def __len__(self):
+        return len(self.entries)
 
 
 class PotionQueue(Queue):  # inheritance
-    def __init__(self):
-        self.potion_counter = super().__init__()
-        self.potion = Potion
+    __slots__ = ()
 
 
 class EffectQueue(Queue):  # inheritance
-    def __init__(self, name):  # This will be used to count the durations on special attacks
-        self.effect_counter = super().__init__()
-        self.colour = Colours()
+    __slots__ = ("colour", "name", "entity", "log")
+
+    def __init__(self, name, entity=None):  # This will be used to count the durations on special attacks
+        super().__init__()
+        self.colour = colours
         self.name = name
+        self.entity = entity  # The entity carrying the effects, events name it so two entities with one name stay apart
+        self.log = console_log
 
-    def check_other_effects(self):  # Check for combinable effects
-        status_effect = None
-        values = self.check_condition()
-        if values:
-            for value in values:
-                status_effect = Effect(value[0])  # value[0] contains the id of the specific status effect
-                print(f"The '{self.colour.effect_colour(status_effect.name)}' status has been added to {self.name}")
-                for count in self.counter:
-                    for value_2 in count.values():
-                        try:
-                            sp_atk_effect = value_2.status_effect.name
-                        except:
-                            sp_atk_effect = value_2.name
-                        if sp_atk_effect in status_effect.condition_1 or sp_atk_effect in status_effect.condition_2:
-                            self.remove_from_list(sp_atk_effect)
-            self.add_to_list(status_effect.name, status_effect)
-            return status_effect
-
-    def remove_from_list(self, sp_atk_effect):
-        for count in self.counter:
-            for value in count.values():
-                if type(value) == StatusSpecialAttack:
-                    self.counter.remove(count)
-                    print(f"The '{self.colour.effect_colour(value.status_effect.name)}' status has been removed "
-                          f"from {self.name}")
-
-    def check_condition(self):
-        values = []
-        conditions = []
-        for count in self.counter:
-            for key, value in count.items():
-                if type(value) == StatusSpecialAttack:
-                    value = value.status_effect
-                values.append(value.name)
-        temp_conditions = self.user_data.query("""
-        SELECT status_id, condition_1, condition_2
-        FROM STATUS_EFFECTS
-        WHERE condition_1 = '{0}' OR condition_2 = '{0}'""".format(*values))
-        for condition in temp_conditions:
-            if condition[1] in values and condition[2] in values:
-                conditions.append(condition)
-        return conditions  # returns id and conditions
-
-    def add_to_list(self, name, object):  # Overriding
-        self.counter.append({name: object})
-        # name of special attack and special attack object
-
-    def decrease_duration(self):
-        effect_list = []
-        for count in self.counter:
-            for key in count.keys():
-                count[key].duration -= 1
-                if count[key].duration == -1:
-                    if type(count[key]) == StatusSpecialAttack:
-                        status_effect = count[key].status_effect.name
-                    else:
-                        status_effect = count[key].name
-                    self.remove_from_list(status_effect)
-                    effect_list.append(count)
-        return effect_list
+    @staticmethod
+    def get_effect(item):  # Special attacks are stored as they are, this gives the effect they carry
+        if isinstance(item, SpecialAttack):
+            return item.status_effect
+        return item
+
+    def check_other_effects(self):  # Check for combinable effects, returns every combo effect that was made
+        combos = []
+        status_ids = self.check_condition()
+        while status_ids:  # One combo at a time, an element shared by two combos is used up by the first one
+            status_effect = Effect(status_ids[0])
+            self.log.record("combo", f"The '{self.colour.effect_colour(status_effect.name)}' status has been "
+                                     f"added to {self.name}", target=self.entity, effect=status_effect.name)
+            self.remove_effects([status_effect.condition_1, status_effect.condition_2])
+            self.add(status_effect.name, status_effect)
+            combos.append(status_effect)
+            status_ids = self.check_condition()  # Without the elements that were just combined
+        return combos
+
+    def remove_effects(self, effect_names):  # Removes the effects that have been combined into a stronger one
+        for entry_number, name, item in self.active():
+            effect = self.get_effect(item)
+            if effect.name in effect_names:
+                self.remove(entry_number)
+                self.log.record("effect removed", f"The '{self.colour.effect_colour(effect.name)}' "
+                                                  f"status has been removed from {self.name}",
+                                target=self.entity, effect=effect.name)
+
+    def check_condition(self):  # returns the ids of the combos that the active effects can make
+        mask = 0
+        for entry_number, name, item in self.active():
+            mask |= catalog.element_bits.get(self.get_effect(item).name, 0)
+        return catalog.combos[mask]
+
+    def add(self, name, item, duration=None):  # Overriding, effects and special attacks carry their own duration
+        if duration is None:
+            duration = item.duration
+        return super().add(name, item, duration)
+
+    def expire_due(self):  # Overriding
+        expired = super().expire_due()
+        for name, item in expired:
+            effect = self.get_effect(item)
+            self.log.record("effect removed", f"The '{self.colour.effect_colour(effect.name)}' "
+                                              f"status has been removed from {self.name}",
+                            target=self.entity, effect=effect.name)
+        return expired
+
+
+class StatusEffectHandler:  # What a status effect does to an entity when it is applied and at the end of each turn
+    def __init__(self, miss=0, stat_changes=(), damage=0, instakill=0, backfire=False):
+        self.miss = miss  # % added to the miss rate
+        self.stat_changes = stat_changes  # (stat, multiplier) pairs applied for the duration of the effect
+        self.damage = damage  # Fraction of max hp lost at the end of every turn
+        self.instakill = instakill
+        self.backfire = backfire
+
+    def on_apply(self, entity, duration):
+        if self.miss:
+            entity.miss(self.miss)
+        for stat, percentage in self.stat_changes:
+            entity.change_stat(stat, percentage, duration)
+        if self.backfire:
+            return entity.do_backfire()
+
+    def end_of_turn(self, entity):  # Returns the damage dealt, or None if the effect doesn't hurt
+        if not self.damage:
+            return None
+        damage = entity.hp * self.damage
+        entity.damage(damage)
+        if self.instakill:
+            entity.instakill(self.instakill)
+        return damage
+
+
+# Built once when the game starts, makes it easier to add more effects
+status_effect_handlers = {
+    "wet": StatusEffectHandler(miss=10),
+    "jolt": StatusEffectHandler(miss=5, damage=0.02),
+    "burn": StatusEffectHandler(stat_changes=[("ph_atk", 0.95)], damage=0.05),
+    "chill": StatusEffectHandler(stat_changes=[("ph_def", 0.95)], damage=0.05),
+    "dark": StatusEffectHandler(miss=50, stat_changes=[("ph_atk", 1.5)]),
+    "light": StatusEffectHandler(miss=50, stat_changes=[("sp_atk", 1.5)]),
+    "shock": StatusEffectHandler(miss=25, damage=0.05),
+    "backfire": StatusEffectHandler(backfire=True),
+    "freeze": StatusEffectHandler(miss=100, stat_changes=[("ph_def", 0.5)]),
+    "holy fire": StatusEffectHandler(miss=20, stat_changes=[("ph_def", 2), ("ph_atk", 2)], damage=0.15),
+    "dark flame": StatusEffectHandler(damage=0.3, instakill=10)
+}
+
+
+class BaseStats(namedtuple("BaseStats", ["hp", "ph_atk", "ph_def", "sp_atk", "sp_def", "crit_rate", "crit_damage",
+                                         "miss_rate"])):  # Inheritance, a tuple so that it can't be changed
+    __slots__ = ()
 
 
 class Entity:
-    def __init__(self, level, hp, ph_atk, ph_def, sp_atk, sp_def):
+    __slots__ = ("name", "level", "hp", "ph_atk", "ph_def", "sp_atk", "sp_def", "crit_rate", "crit_damage", "current_hp",
+                 "is_dead", "effect_count", "miss_rate", "instakill_rate", "base_stats", "modifiers", "stat_queue",
+                 "colours", "log", "random")  # No __dict__, simulations keep thousands of entities alive at once
+
+    def __init__(self, level, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate=5, crit_damage=125):
         self.name = None
         self.level = level
         self.hp = 100 + 5 * round(self.convert(hp))
@@ -2234,13 +2984,25 @@ class Entity:
         self.ph_def = 3 + round(self.convert(ph_def))
         self.sp_atk = 3 + round(self.convert(sp_atk))
         self.sp_def = 3 + round(self.convert(sp_def))
+        self.crit_rate = int(crit_rate)
+        self.crit_damage = int(crit_damage)
         self.current_hp = self.hp
         self.is_dead = False  # Used to signal the amount of dead enemies
-        self.effect_count = EffectQueue(self.name)  # Composition
+        self.effect_count = EffectQueue(self.name, self)  # Composition
         self.miss_rate = 0  # How likely an enemy will miss an attack in %
         self.instakill_rate = False
+        # The stats before any buffs or debuffs, read only so they can always be returned to without any SQL
+        self.base_stats = BaseStats(self.hp, self.ph_atk, self.ph_def, self.sp_atk, self.sp_def, self.crit_rate,
+                                    self.crit_damage, self.miss_rate)
+        self.modifiers = {}  # stat name -> amounts from buffs, debuffs and misses that are still active, in order
         self.stat_queue = Queue()
-        self.colours = Colours()
+        self.colours = colours
+        self.log = console_log
+        self.random = random  # Replaced by the battle's own stream once the entity is in a battle
+
+    def set_log(self, log):  # Sends everything this entity does to a different log, e.g. the headless engine's
+        self.log = log
+        self.effect_count.log = log
 
     def damage(self, amount):
         self.current_hp -= amount
@@ -2252,10 +3014,10 @@ class Entity:
         if self.current_hp > self.hp:
             self.current_hp = self.hp
 
-    def check_status(self, user_id):
+    def check_status(self, stats):
         if self.current_hp == 0:
             self.is_dead = True
-            print(f"{self.name} has been defeated")
+            self.log.record("defeated", f"{self.name} has been defeated", target=self)
 
     def convert(self, stat):  # Overloading
         dictionary = {
@@ -2274,139 +3036,102 @@ class Entity:
         # Only occurs when a special attack has been received with an effect
         try:
             if issubclass(type(element_class), SpecialAttack):
-                element_class = element_class.status_effect
+                element_class = element_class.status_effect  # So I am only dealing with the Effect class
             duration = element_class.duration
         except AttributeError:
             duration = 3
 
-        dictionary = {
-            "wet": ['self.miss(10)'],
-            "jolt": ['self.miss(5)'],
-            "burn": [f'self.change_stat("ph_atk", 0.95, {duration})'],
-            "chill": [f'self.change_stat("ph_def", 0.95, {duration})'],
-            "dark": ['self.miss(50)', f'self.change_stat("ph_atk", 1.5, {duration})'],
-            "light": ['self.miss(50)', f'self.change_stat("sp_atk", 1.5, {duration})'],
-            "shock": ['self.miss(25)'],
-            "backfire": ['effect = self.do_backfire()'],
-            "freeze": ['self.miss(100)', f'self.change_stat("ph_def", 0.5, {duration})'],
-            "holy fire": ['self.miss(20)', f'self.change_stat("ph_def", 2, {duration})',
-                          f'self.change_stat("ph_atk", 2, {duration})']
-        }  # Dictionary to hold commands related to the status effects, makes it easier to add more effects
-
-        if issubclass(type(element_class), SpecialAttack):
-            element_class = element_class.status_effect  # So I am only dealing with the Effect class
-
-        if element_class.name in dictionary.keys():
-            for command in dictionary[element_class.name]:
-                global effect  # Couldn't return values with exec so I made a global statement
-                effect = None
-                exec(command)
-                if effect == "aoe":
-                    return "aoe"
+        handler = status_effect_handlers.get(element_class.name)
+        if handler is not None:
+            return handler.on_apply(self, duration)  # "aoe" when backfire hits every enemy
 
     def end_of_turn(self):
         # Occurs at the end of every turn
-        dictionary = {
-            "jolt": ['self.damage(self.hp * 0.02)'],
-            "burn": ['self.damage(0.05 * self.hp)'],
-            "chill": ['self.damage(0.05 * self.hp)'],
-            "shock": ['self.damage(0.05 * self.hp)'],
-            "holy fire": ['self.damage(0.15 * self.hp)'],
-            "dark flame": ['self.damage(0.3 * self.hp)', 'self.instakill(10)']
-        }
-
-        colours = [self.colours.effect_colour("jolt"), self.colours.effect_colour("burn"),
-                   self.colours.effect_colour("chill"), self.colours.effect_colour("shock"),
-                   self.colours.effect_colour("holy fire"), self.colours.effect_colour("dark flame")]
-        messages = {
-            "jolt": f"{self.name.title()} received {round(self.hp * 0.02)} damage due to the '{colours[0]}' status.",
-            "burn": f"{self.name.title()} received {round(self.hp * 0.05)} damage due to the '{colours[1]}' status.",
-            "chill": f"{self.name.title()} received {round(self.hp * 0.05)} damage due to the '{colours[2]}' status.",
-            "shock": f"{self.name.title()} received {round(self.hp * 0.05)} damage due to the '{colours[3]}' status.",
-            "holy fire": f"{self.name.title()} received {round(self.hp * 0.15)} damage due to the '{colours[4]}' status.",
-            "dark flame": f"{self.name.title()} received {round(self.hp * 0.3)} damage due to the '{colours[5]}' status."
-        }
-
-        for count in self.effect_count.counter:
-            for key, value in count.items():
-                if issubclass(type(value), SpecialAttack):  # If it is a sp_atk, it will be converted to an effect
-                    value = value.status_effect
-
-                if value.name in dictionary.keys():
-                    for command in dictionary[value.name]:
-                        exec(command)  # executes the commands stored in the dictionary
+        for entry_number, name, item in self.effect_count.active():
+            value = self.effect_count.get_effect(item)  # If it is a sp_atk, it will be converted to an effect
+
+            handler = status_effect_handlers.get(value.name)
+            if handler is not None:
+                damage = handler.end_of_turn(self)
+                if damage is not None:
+                    self.log.record("end of turn", f"{self.name.title()} received {round(damage)} damage due to the "
+                                                   f"'{self.colours.effect_colour(value.name)}' status.",
+                                    target=self, effect=value.name, damage=round(damage))
+
+    def add_modifier(self, stat, amount):  # Returns the modifier so it can be removed when it wears off
+        self.modifiers.setdefault(stat, []).append(amount)
+        self.__setattr__(stat, self.get_effective_stat(stat))
+        return stat, amount
+
+    def remove_modifier(self, modifier):
+        stat, amount = modifier
+        self.modifiers[stat].remove(amount)
+        self.reset_stat(stat)
+
+    def get_effective_stat(self, stat):  # The base stat with every modifier that hasn't worn off yet
+        value = getattr(self.base_stats, stat)
+        for amount in self.modifiers.get(stat, []):
+            if stat == "miss_rate":  # Miss chances add up rather than multiply
+                value = min(100, value + amount)
+            else:
+                value = round(value * amount)
+        return value
 
-                if value.name in messages.keys():
-                    print(messages[value.name])
+    def reset_stat(self, stat_name):  # Only the modifiers that are left are applied, so this never needs the database
+        original_stat = self.get_effective_stat(stat_name)
+        self.__setattr__(stat_name, original_stat)
+        self.log.record("stat reset", f"{self.name}'s {stat_name} has returned back to {original_stat}",
+                        target=self, stat=stat_name, new=original_stat)
 
     def miss(self, percentage):
-        self.miss_rate += percentage
-        if self.miss_rate >= 100:
-            self.miss_rate = 100
-        print(f"{self.name.title()} now has a {self.miss_rate}% chance to miss an attack")
-        self.stat_queue.add_to_list("miss_rate", 3)
+        modifier = self.add_modifier("miss_rate", percentage)
+        self.log.record("miss rate", f"{self.name.title()} now has a {self.miss_rate}% chance to miss an attack",
+                        target=self, miss_rate=self.miss_rate)
+        self.stat_queue.add("miss_rate", modifier, 3)
 
     def change_stat(self, stat, percentage, duration):
         old_stat = round(self.__getattribute__(stat))
-        new_stat = round(old_stat * percentage)
+        modifier = self.add_modifier(stat, percentage)
+        new_stat = self.__getattribute__(stat)
         if old_stat > new_stat:
             word = "decreased"
         else:
             word = "increased"
-        print(f"{self.name.title()}'s {stat} has {word} from {old_stat} to {new_stat}")
-        self.__setattr__(stat, new_stat)
-        self.stat_queue.add_to_list(stat, duration + 2)
+        self.log.record("stat change", f"{self.name.title()}'s {stat} has {word} from {old_stat} to {new_stat}",
+                        target=self, stat=stat, old=old_stat, new=new_stat)
+        self.stat_queue.add(stat, modifier, duration + 2)
 
     def instakill(self, percentage_chance):
         self.instakill_rate += percentage_chance
 
     def do_backfire(self):
-        global effect
-        number = random.randint(1, 10)
+        number = self.random.randint(1, 10)
         if number <= 3:  # 30% chance
             self.damage(0.5 * self.sp_atk)
-            print(f"{self.name} has been hurt by Backfire")
+            self.log.record("backfire", f"{self.name} has been hurt by Backfire", target=self)
         elif number <= 4:  # 10% chance
-            effect = "aoe"
-
-    def remove_effect(self, effect_to_remove, type):
-        if type == "combo":
-            for i in range(len(self.effect_count.counter) - 1, 0):
-                if effect_to_remove == self.effect_count.counter[i]:
-                    effect = self.effect_count.counter[i]
-                    for value in effect.values():
-                        if type(value) == StatusSpecialAttack:
-                            effect = value.status_effect
-                        else:
-                            effect = value
-                    print(f"The '{effect.name}' effect has been removed from {self.name}.")
-                    del self.effect_count.counter[i]
-        else:
-            for i in range(len(self.effect_count.counter), 0):
-                value = self.effect_count.counter[i].values()
-                if type(value) == StatusSpecialAttack:
-                    value = value.status_effect
-                if value.name == effect_to_remove:
-                    print(f"The '{value.name}' effect has been removed from {self.name}.")
-                    del self.effect_count.counter[i]
+            return "aoe"
 
 
 class Hero(Entity):  # Inheritance and subclass
-    def __init__(self, level, hero_id, name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage):
-        super().__init__(level, hp, ph_atk, ph_def, sp_atk, sp_def)
-        self.user_data = SQLite()  # Composition
+    __slots__ = ("hero_id", "record", "sp_moves", "potion_count", "sp_atk_list", "mana")
+
+    def __init__(self, level, hero_id, name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage,
+                 sp_atk_ids=None):
+        super().__init__(level, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage)
         self.hero_id = hero_id
+        # The stats the hero was made from, so a replay can make it again even after it has been sold or re-rolled
+        self.record = (hero_id, name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage)
         self.name = name
-        self.crit_rate = int(crit_rate)
-        self.crit_damage = int(crit_damage)
+        self.effect_count.name = name  # The queue is made before the name is known
         self.sp_moves = 3
         self.potion_count = PotionQueue()  # Composition
-        self.sp_atk_list = self.generate_sp_atks()
+        self.sp_atk_list = self.generate_sp_atks(sp_atk_ids)
         self.mana = 100
 
-    def generate_sp_atks(self):
+    def generate_sp_atks(self, sp_atk_ids=None):  # Replays pass the ids the hero had, they may have been re-rolled since
         sp_atk_list = []
-        temp_sp_atk_list = self.get_sp_atks()  # 2D array, index: 0-id, 1-effect1, 2-effect2
+        temp_sp_atk_list = self.get_sp_atks(sp_atk_ids)  # 2D array, index: 0-id, 1-effect1, 2-effect2
 
         # Grouping special attacks by their type makes it easier to work with in the battle system as there is less
         # Indexing needed for finding out the type of special attack
@@ -2423,54 +3148,34 @@ class Hero(Entity):  # Inheritance and subclass
                 sp_atk_list.append(StatusSpecialAttack(sp_atk[0]))
         return sp_atk_list
 
-    def get_sp_atks(self):
-        sp_atk_list = self.user_data.query(f"""
-        SELECT SP_ATK.sp_atk_id, STATUS_EFFECTS.status_effect_1, STATUS_EFFECTS.status_effect_2, SP_ATK.sp_atk_duration
-        FROM ((HEROES_SP_ATK
-        INNER JOIN SP_ATK 
-        ON SP_ATK.sp_atk_id = HEROES_SP_ATK.sp_atk_id)
-        INNER JOIN STATUS_EFFECTS
-        ON STATUS_EFFECTS.status_id = SP_ATK.status_id)
-        WHERE HEROES_SP_ATK.hero_id = {self.hero_id}""")  # Advanced SQL
+    def get_sp_atks(self, sp_atk_ids=None):
+        if sp_atk_ids is None:
+            sp_atk_ids = catalog.hero_sp_atks.get(self.hero_id, [])
+        sp_atk_list = [catalog.get_sp_atk_details(sp_atk_id) for sp_atk_id in sp_atk_ids]
         return sp_atk_list
 
-    def reset_stat(self, stat_name):
-        if stat_name == "miss_rate":
-            self.miss_rate = 0
-        else:
-            original_stat = self.user_data.query(f"""
-            SELECT ({stat_name})
-            FROM HEROES
-            WHERE hero_id = {self.hero_id}""")[0][0]
-            original_stat = self.convert(original_stat)
-            self.__setattr__(stat_name, original_stat)  # Got this using pycharm features and through various tests
-            print(f"{self.name}'s {stat_name} has returned back to {original_stat}")
-
     def decrease_duration(self):  # Will be used for decreasing the count of sp_atk and buff durations
-        indexes = self.potion_count.decrease_duration()
-        for counter in indexes:
-            self.reset_stat(counter)
+        for stat_name, modifier in self.potion_count.expire_due():
+            self.remove_modifier(modifier)
 
-        effect_list = self.effect_count.decrease_duration()
-        for effect in effect_list:
-            pass
+        self.effect_count.expire_due()
 
-        stat_list = self.stat_queue.decrease_duration()
-        for stat in stat_list:
-            self.reset_stat(stat)
+        for stat_name, modifier in self.stat_queue.expire_due():
+            self.remove_modifier(modifier)
 
     def use_potion(self, potion):
         if type(potion) is BuffPotion:
             dictionary = self.create_dictionary("stat name")
             stat_name = dictionary[potion.item_name]
             stat = self.__getattribute__(stat_name)
-            new_stat = round(stat * ((100 + potion.percentage) / 100))
-            self.__setattr__(stat_name, new_stat)
-            self.potion_count.add_to_list(stat_name, potion.duration)
-            print(f"{self.name}'s {stat_name} has increased from {stat} to {new_stat}")
+            modifier = self.add_modifier(stat_name, (100 + potion.percentage) / 100)
+            new_stat = self.__getattribute__(stat_name)
+            self.potion_count.add(stat_name, modifier, potion.duration)
+            self.log.record("potion", f"{self.name}'s {stat_name} has increased from {stat} to {new_stat}",
+                            target=self, stat=stat_name, old=stat, new=new_stat)
 
         elif type(potion) is Potion:
-            print(potion.percentage)
+            self.log.record("potion", potion.percentage, target=self, stat="hp")
             hp_to_add = round(int(potion.percentage) * int(self.hp))
             self.current_hp += hp_to_add
             if self.current_hp > self.hp:
@@ -2487,86 +3192,61 @@ class Hero(Entity):  # Inheritance and subclass
 
 
 class AiHero(Hero):
-    def __init__(self, level, hero_id, name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage):
+    __slots__ = ("target",)
+
+    def __init__(self, level, hero_id, name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage,
+                 sp_atk_ids=None):
         super().__init__(level=level, hp=hp, ph_atk=ph_atk, ph_def=ph_def, sp_atk=sp_atk, sp_def=sp_def,
-                         hero_id=hero_id, name=name, crit_rate=crit_rate, crit_damage=crit_damage)
+                         hero_id=hero_id, name=name, crit_rate=crit_rate, crit_damage=crit_damage,
+                         sp_atk_ids=sp_atk_ids)
         self.target = None
 
     def decrease_duration(self):  # Will be used for decreasing the count of sp_atk and buff durations
-        effect_list = self.effect_count.decrease_duration()
-        for effect in effect_list:
-            self.remove_effect(effect, "duration")
-
-        stat_list = self.stat_queue.decrease_duration()
-        for stat in stat_list:
-            self.reset_stat(stat)
-
-    def reset_stat(self, stat_name):
-        if stat_name == "miss_rate":
-            self.miss_rate = 0
-            original_stat = 0
-        else:
-            original_stat = self.user_data.query(f"""
-            SELECT ({stat_name})
-            FROM HEROES
-            WHERE hero_id = {self.hero_id}""")[0][0]
-            original_stat = self.convert(original_stat)
-        self.__setattr__(stat_name, original_stat)  # Got this using pycharm features and through various tests
-        print(f"{self.name}'s {stat_name} has returned back to {original_stat}")
+        self.effect_count.expire_due()
+
+        for stat_name, modifier in self.stat_queue.expire_due():
+            self.remove_modifier(modifier)
 
 
 class Enemy(Entity):  # Inheritance and subclass
+    __slots__ = ("monster_id", "enemy_type", "gold", "exp", "target")
+
     def __init__(self, level, monster_id, name, enemy_type, hp, ph_atk, ph_def, sp_atk, sp_def, gold, exp):
         super().__init__(level, hp, ph_atk, ph_def, sp_atk, sp_def)
         self.monster_id = monster_id
         self.name = name
+        self.effect_count.name = name
         self.enemy_type = enemy_type
         self.gold = gold
         self.exp = exp
         self.target = None
-        self.crit_rate = 5
-        self.crit_damage = 125
-        self.user_data = SQLite()
 
     def decrease_duration(self):  # Will be used for decreasing the count of sp_atk and buff durations
-        effect_list = self.effect_count.decrease_duration()
-        for effect in effect_list:
-            self.remove_effect(effect, "duration")
-
-        stat_list = self.stat_queue.decrease_duration()
-        for stat in stat_list:
-            self.reset_stat(stat)
-
-    def reset_stat(self, stat_name):
-        if stat_name == "miss_rate":
-            self.miss_rate = 0
-            original_stat = 0
-        else:
-            original_stat = self.user_data.query(f"""
-            SELECT ({stat_name})
-            FROM MONSTERS
-            WHERE monster_id = {self.monster_id}""")[0][0]
-            original_stat = self.convert(original_stat)
-        self.__setattr__(stat_name, original_stat)  # Got this using pycharm features and through various tests
-        print(f"{self.name}'s {stat_name} has returned back to {original_stat}")
-
-    def check_status(self, user_id):  # Polymorphism
+        self.effect_count.expire_due()
+
+        for stat_name, modifier in self.stat_queue.expire_due():
+            self.remove_modifier(modifier)
+
+    def check_status(self, stats):  # Polymorphism
         if self.current_hp == 0:
+            if not self.is_dead:  # Only counted once, this is called every turn
+                stats.increment("enemies_defeated")
+                if self.enemy_type == "boss":
+                    stats.increment("bosses_defeated")
             self.is_dead = True
-            print(f"{self.name} has been defeated")
-            self.user_data.increment_value("USER", "enemies_defeated", "user_id", user_id)
-            if self.enemy_type == "boss":
-                self.user_data.increment_value("USER", "bosses_defeated", "user_id", user_id)
+            self.log.record("defeated", f"{self.name} has been defeated", target=self)
 
 
 class Shop:
     def __init__(self, user_id):
         self.user_id = user_id
-        self.user_data = SQLite()
-        self.colour = Colours()
+        self.user_data = database
+        self.colour = colours
+        self.random = random  # Hero stats and special attacks are rolled from this, every shop visit gets a new seed
 
     def menu(self):  # Polymorphism
-        print("""
+        self.random = random.Random(seed_source.getrandbits(64))
+        game_io.print("""
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~       SHOP       ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
             1. Buy Items  
@@ -2579,20 +3259,22 @@ class Shop:
         if response == False:
             response = 5
 
-        elif response == 1:  # Buy Items
+        if response == 1:  # Buy Items
             items = self.get_items()
             item_chosen = self.print_shop_items()
+            if item_chosen is False:
+                return "shop", self.user_id
             item_price = items[item_chosen][2]  # This chooses the price field from a 2D array
             quantity = self.check('balance', item_price)  # Returns false or the amount of items they can buy
             if not quantity:
-                response = input("""
+                response = game_io.input("""
                 You do not have enough money to buy this item
                 Enter any number to return to the shop menu: """)
             else:
-                print(f"You can buy up to {quantity} {items[item_chosen][1]}s")
+                game_io.print(f"You can buy up to {quantity} {items[item_chosen][1]}s")
                 quantity = right_format_response_number("How many potions do you want to buy: ", 1, quantity)
                 if quantity == False:
-                    self.menu()
+                    return "shop", self.user_id
                 balance = self.get_balance()
                 new_balance = balance - (quantity * item_price)
                 item_name = self.convert("item id to item name", item_chosen)
@@ -2603,41 +3285,35 @@ class Shop:
                 new_quantity = quantity + prev_quantity
                 self.user_data.update_record("USER", "gold", f"{new_balance}", "user_id", f"{self.user_id}")
                 self.user_data.update_record("USER", item_name, f"{new_quantity}", "user_id", f"{self.user_id}")
-                print(f"""You have bought {quantity} {items[item_chosen][1]}s
+                game_io.print(f"""You have bought {quantity} {items[item_chosen][1]}s
     Quantity: {prev_quantity} -> {new_quantity}
     Balance: {balance} -> {new_balance}""")
-                response = input("Enter any key to return to the main menu: ")
+                response = game_io.input("Enter any key to return to the main menu: ")
 
         elif response == 2:  # Buy Heroes
             heroes = self.get_heroes()
             hero_price = 500 + 500 * (2 ** len(heroes))  # 500, 1500, 2500, 4500....
             balance = self.get_balance()
-            print(f"Balance: {balance}")
-            print(f"It will cost {hero_price} for hero number {len(heroes) + 1}")
+            game_io.print(f"Balance: {balance}")
+            game_io.print(f"It will cost {hero_price} for hero number {len(heroes) + 1}")
             response = right_response_list("Do you wish to buy another hero", response_list)
             if response in positive_responses and balance >= hero_price:
                 stats = self.generate_hero_stats()
                 sp_attacks = self.generate_special_attacks()
-                name = input("Please enter a name for the hero: ")
+                name = game_io.input("Please enter a name for the hero: ")
                 records = (f'{self.user_id}', *stats, name)  # Some template user data
                 insert = """INSERT INTO HEROES (user_id, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate, crit_damage, hero_name)
                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
-                cursor.execute(insert, records)
-                hero_id = self.user_data.query("""
-                SELECT hero_id 
-                FROM HEROES
-                WHERE hero_id = (SELECT max(hero_id) FROM HEROES)""")
+                hero_id = self.user_data.execute(insert, records).lastrowid  # The primary key of the new hero
                 for i in sp_attacks:
                     insert = """INSERT INTO HEROES_SP_ATK (hero_id, sp_atk_id)
                              VALUES (?, ?)"""
-                    records = (f'{hero_id[0][0] + 1}', f'{i}')
-                    cursor.execute(insert, records)
-                    connection.commit()
-                print(f"The new hero '{name}' has been created, their stats are:\n")
+                    records = (f'{hero_id}', f'{i}')
+                    self.user_data.execute(insert, records)
+                game_io.print(f"The new hero '{name}' has been created, their stats are:\n")
                 self.print_hero_stats(stats, sp_attacks)
-            response = input("Enter any key to return to the main menu: ")
-            rpg = Rpg(self.user_id)
-            rpg.menu()
+            response = game_io.input("Enter any key to return to the main menu: ")
+            return "game menu", self.user_id
 
         elif response == 3:  # Sell Heroes
             hero_list = self.user_data.query("""
@@ -2645,10 +3321,10 @@ class Shop:
             FROM HEROES
             WHERE user_id = {}""".format(self.user_id))  # Gets the heroes as a 2d list or returns False
             if not hero_list:
-                print("You have no heroes to sell, returning to the main menu, enter any key to continue: ")
+                game_io.print("You have no heroes to sell, returning to the main menu, enter any key to continue: ")
             else:
                 for i in range(len(hero_list)):
-                    print(f"Hero {i + 1}: {hero_list[i][0]}")
+                    game_io.print(f"Hero {i + 1}: {hero_list[i][0]}")
                 balance = self.user_data.query("""
                 SELECT gold
                 FROM USER
@@ -2658,57 +3334,55 @@ class Shop:
                 FROM HEROES
                 WHERE user_id = {}""".format(self.user_id))
                 price = 250 + 250 * (2 ** len(heroes))
-                print(f"Selling a hero will give you {price} gold")
+                game_io.print(f"Selling a hero will give you {price} gold")
                 number = right_format_response_number(f"Enter a number between 1 and {len(hero_list)}", 1,
                                                       len(hero_list))
                 if number == False:
-                    self.menu()
+                    return "shop", self.user_id
                 response = right_response_list("Are you sure you want to do this", response_list)
                 if response in positive_responses:
                     hero_id = self.convert("number to hero id", number)
-                    print(f"{balance} -> {balance + price}")
+                    game_io.print(f"{balance} -> {balance + price}")
                     balance += price
                     self.user_data.delete_record("HEROES", "hero_id", hero_id)  # Deletes from hero table
                     self.user_data.delete_record("HEROES_SP_ATK", "hero_id", hero_id)  # Deletes from link table
                     self.user_data.update_record("USER", "gold", balance, "user_id", self.user_id)
-                response = input("Returning to the shop menu, enter any key to continue: ")
-            self.menu()  # Recursion
+                    catalog.forget_hero(hero_id)
+                response = game_io.input("Returning to the shop menu, enter any key to continue: ")
 
         elif response == 4:  # Re-roll Heroes
             heroes = self.check('user hero', 0)
             if not heroes:
-                response = input("You have not got any heroes to re-roll, Enter any key to return to the shop menu: ")
-                self.menu()
+                response = game_io.input("You have not got any heroes to re-roll, Enter any key to return to the shop menu: ")
             else:
                 self.re_roll_stats()
 
         elif response == 5:  # Returning to the main menu
-            rpg = Rpg(self.user_id)
-            rpg.menu()
+            return "game menu", self.user_id
 
-        self.menu()  # Recursion
+        return "shop", self.user_id
 
-    def re_roll_stats(self):
-        heroes = self.user_data.query("""
-        SELECT hero_id, hero_name
-        FROM HEROES
-        WHERE user_id = {}""".format(self.user_id))
-        balance = self.get_balance()
-        print("Balance: {}".format(balance))
-        response = right_response_list("Do you wish to spend 1000 gold to re-roll these stats: ", response_list)
-
-        if response in negative_responses:
-            self.menu()
-        # To prevent the user re-rolling stats for heroes that don't exist
-        balance -= 1000
-        self.user_data.update_record("USER", "gold", balance, "user_id", self.user_id)
-        for i in range(len(heroes)):
-            print(f"Hero {i + 1} - {heroes[i][1]}")
+    def re_roll_stats(self):  # Keeps re-rolling until the player says no
+        while True:
+            heroes = self.user_data.query("""
+            SELECT hero_id, hero_name
+            FROM HEROES
+            WHERE user_id = {}""".format(self.user_id))
+            balance = self.get_balance()
+            game_io.print("Balance: {}".format(balance))
+            response = right_response_list("Do you wish to spend 1000 gold to re-roll these stats: ", response_list)
 
-        number = right_format_response_number("Please enter an appropriate number: ", 1, len(heroes))
-        if number == False:
-            self.menu()
-        else:
+            if response in negative_responses:
+                return
+            # To prevent the user re-rolling stats for heroes that don't exist
+            balance -= 1000
+            self.user_data.update_record("USER", "gold", balance, "user_id", self.user_id)
+            for i in range(len(heroes)):
+                game_io.print(f"Hero {i + 1} - {heroes[i][1]}")
+
+            number = right_format_response_number("Please enter an appropriate number: ", 1, len(heroes))
+            if number == False:
+                return
             hero_id = self.convert("number to hero id", number)
             stats = self.generate_hero_stats()
             special_attacks = self.generate_special_attacks()
@@ -2723,40 +3397,36 @@ class Shop:
                 insert = """INSERT INTO HEROES_SP_ATK (hero_id, sp_atk_id)
                          VALUES (?, ?)"""
                 records = (f'{hero_id}', f'{i}')
-                cursor.execute(insert, records)
-                connection.commit()
+                self.user_data.execute(insert, records)
+            catalog.forget_hero(hero_id)
 
-            print("The heroes stats have been re-rolled, the new stats are:\n")
+            game_io.print("The heroes stats have been re-rolled, the new stats are:\n")
             self.print_hero_stats(stats, special_attacks)
-            self.re_roll_stats()  # Recursion
 
     def get_items(self):
-        items = self.user_data.query("""
-        SELECT *
-        FROM SHOP_PRICES
-        WHERE item_id BETWEEN 1 AND 9""")
+        items = [item for item in catalog.shop_prices if 1 <= item[0] <= 9]
         return items
 
     def print_hero_stats(self, stats, special_attacks):
         stat_list = ["Hp", "Physical Attack", "Physical Defence", "Special Attack", "Special Defence",
                      "Critical Hit Chance", "Critical Hit Damage"]
         for i in range(len(stat_list)):
-            print(f"{stat_list[i]} - {stats[i]}")
+            game_io.print(f"{stat_list[i]} - {stats[i]}")
         for i in range(len(special_attacks)):
-            special_attack_number = self.colour.return_colour_text("None", "Special Attack " + str(i + 1))
-            print(f"{special_attack_number} - {self.convert('special attack', special_attacks[i])}")
-        print()
+            special_attack_number = self.colour.label("None", "Special Attack " + str(i + 1))
+            game_io.print(f"{special_attack_number} - {self.convert('special attack', special_attacks[i])}")
+        game_io.print()
 
     def print_shop_items(self):
         items = self.get_items()
         for i in range(len(items)):
-            print(f"""
+            game_io.print(f"""
         item {i + 1} : {items[i][1]}
             price : {items[i][2]}
             description : {items[i][3]}""")
         item_chosen = right_format_response_number("\nPlease enter a number between 1 and 9: ", 1, 9)
         if item_chosen == False:
-            self.menu()
+            return False
         else:
             item_chosen -= 1
             return item_chosen
@@ -2807,10 +3477,7 @@ class Shop:
             dictionary = {i + 1: hero_data[i][0] for i in range(len(hero_data))}  # link user input to hero id
 
         elif purpose == 'special attack':
-            attack_name = self.user_data.query("""
-            SELECT sp_atk_name
-            FROM SP_ATK
-            WHERE sp_atk_id = {}""".format(data))[0][0]
+            attack_name = catalog.sp_atks[data]["sp_atk_name"]
             return attack_name
         return dictionary[data]
 
@@ -2821,11 +3488,10 @@ class Shop:
         WHERE user_id = {}""".format(self.user_id))
         return heroes
 
-    @staticmethod
-    def generate_hero_stats():
+    def generate_hero_stats(self):
         stats = []
         for i in range(5):
-            number = random.randint(1, 20)
+            number = self.random.randint(1, 20)
             if number <= 2:  # 10%  chance
                 stats.append("e low")
             elif number <= 6:  # 20% chance
@@ -2836,17 +3502,15 @@ class Shop:
                 stats.append("v high")
             else:  # 15% chance
                 stats.append("e high")
-        stats.append(random.randint(3, 10))  # Critical hit chance
-        stats.append(random.randint(105, 160))  # Critical damage amount
+        stats.append(self.random.randint(3, 10))  # Critical hit chance
+        stats.append(self.random.randint(105, 160))  # Critical damage amount
         return stats
 
     def generate_special_attacks(self):
         sp_atk_ids = []
         loop = 2
-        special_attack_list = self.user_data.query("""
-        SELECT sp_atk_id
-        FROM SP_ATK""")
-        number = random.randint(1, 20)
+        special_attack_list = [(sp_atk_id,) for sp_atk_id in catalog.sp_atks]
+        number = self.random.randint(1, 20)
         if 11 <= number <= 16:  # 30% chance of 3 special attacks
             loop = 3
         elif 17 <= number <= 20:  # 20% chance of 4 special attacks
@@ -2854,16 +3518,888 @@ class Shop:
         for i in range(loop):
             valid = False
             while not valid:
-                sp_atk_id = random.choice(special_attack_list)
+                sp_atk_id = self.random.choice(special_attack_list)
                 if sp_atk_id[0] not in sp_atk_ids:
                     sp_atk_ids.append(sp_atk_id[0])
                     valid = True
         return sp_atk_ids
 
 
-# ------------------------------------------------------------------  Setup2  ------------------------------------------
+class ScreenManager:  # Shows one screen at a time, each menu returns the next screen instead of calling it
+    def __init__(self):
+        self.screen_classes = {
+            "main menu": MainMenu,
+            "game menu": Rpg,
+            "battle": Battle,
+            "shop": Shop,
+            "teams": Team
+        }
+        self.screens = {}  # (screen name, user id) -> screen, so going back to a screen doesn't rebuild it
+
+    def get_screen(self, name, user_id):
+        if (name, user_id) not in self.screens:
+            if user_id is None:  # The main menu isn't tied to a save file
+                self.screens[(name, user_id)] = self.screen_classes[name]()
+            else:
+                self.screens[(name, user_id)] = self.screen_classes[name](user_id)
+        return self.screens[(name, user_id)]
+
+    def show(self, state):  # Shows one screen and returns the one to go to next
+        if sql_tracer is not None:
+            sql_tracer.set_screen(state[0])
+        return self.get_screen(*state).menu()
+
+    def run(self, state=("main menu", None)):  # A state of None means the player has left the game
+        while state is not None:
+            state = self.show(state)
+
+
+# -----------------------------------------------------------  Battle Timing  ------------------------------------------
+class BattleTimer:  # Times each phase of a battle turn, turned on by setting RPG_TIMING to a file name
+    def __init__(self, path):
+        self.path = path
+        self.stack = []  # The phases that are running, outermost first
+        self.child_seconds = []  # Time spent in the phases called by each phase on the stack
+        self.phases = {}  # phase -> [calls, seconds, {histogram bucket: calls}]
+        self.stacks = {}  # "outer;inner" -> seconds spent in the inner phase itself, for flamegraphs
+
+    def wrap(self, name, function):  # Swapped in for the method, so nothing is timed unless the timer exists
+        @functools.wraps(function)
+        def timed(*arguments, **keywords):
+            self.stack.append(name)
+            self.child_seconds.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*arguments, **keywords)
+            finally:
+                seconds = time.perf_counter() - start
+                stack = ";".join(self.stack)
+                self.stack.pop()
+                self.stacks[stack] = self.stacks.get(stack, 0.0) + seconds - self.child_seconds.pop()
+                if self.child_seconds:
+                    self.child_seconds[-1] += seconds
+                phase = self.phases.setdefault(name, [0, 0.0, {}])
+                phase[0] += 1
+                phase[1] += seconds
+                bucket = int(seconds * 1000000).bit_length()  # Bucket n holds calls under 2 ** n microseconds
+                phase[2][bucket] = phase[2].get(bucket, 0) + 1
+        return timed
+
+    def instrument(self, phases):
+        for battle_class, names in phases:
+            for name in names:
+                if name in battle_class.__dict__:  # Only where it is defined, overrides are timed as their own phase
+                    setattr(battle_class, name, self.wrap(f"{battle_class.__name__}.{name}", battle_class.__dict__[name]))
+
+    def write(self):  # The phases as JSON, and the stacks in the collapsed format that flamegraph.pl reads
+        phases = {}
+        for name, (calls, seconds, histogram) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            phases[name] = {"calls": calls, "total_ms": round(seconds * 1000, 3),
+                            "mean_us": round(seconds * 1000000 / calls, 3),
+                            "histogram_us": {f"<{2 ** bucket}": histogram[bucket] for bucket in sorted(histogram)}}
+        with open(self.path, "w") as file:
+            json.dump({"phases": phases}, file, indent=2)
+        with open(self.path + ".folded", "w") as file:
+            for stack, seconds in sorted(self.stacks.items()):
+                if round(seconds * 1000000) > 0:
+                    file.write(f"{stack} {round(seconds * 1000000)}\n")
+
+
+# The phases of a turn, from picking an action to the end of turn effects wearing off
+battle_phases = [
+    (Battle, ["main_battle", "print_options", "select_entity", "select_sp_atk"]),
+    (BattleEngine, ["step", "choose_action", "do_action", "enemy_turn"]),
+    (BattleRules, ["attack", "sp_atk", "aoe_attack", "enemy_turn", "enemy_target", "end_of_turn"]),
+    # Every entry has to be defined by its own class, a method it only inherits is never wrapped for it
+    (Entity, ["end_of_turn"]),
+    (StatusEffectHandler, ["end_of_turn"]),  # Once for each status effect an entity carries
+    (Hero, ["decrease_duration"]),
+    (AiHero, ["decrease_duration"]),
+    (Enemy, ["decrease_duration"])
+]
+# Off unless RPG_TIMING is set, then the methods above are wrapped and the results written out on exit.
+# Simulation worker processes don't write theirs, so only battles played in this process are counted
+battle_timer = BattleTimer(os.environ["RPG_TIMING"]) if os.environ.get("RPG_TIMING") else None
+if battle_timer is not None:
+    battle_timer.instrument(battle_phases)
+    atexit.register(battle_timer.write)
+
+
+# -------------------------------------------------------------  Simulation  -------------------------------------------
+
+
+def simulate_battle(hero_ids, level, game_mode, seed, max_turns=500, replays=None, basic_attacks=False):  # Plays one pve battle with AI controlled heroes
+    records = catalog.get_heroes(hero_ids)  # Save file heroes are read the first time, then kept by the catalog
+    heroes = [Hero(level, *records[hero_id]) for hero_id in hero_ids]
+    log = ReplayLog(replays, EventLog()) if replays else None
+    engine = BattleEngine(heroes, None, "pve", seed, game_mode, level, log, basic_attacks)
+    while engine.outcome is None and engine.turn < max_turns:
+        engine.step(engine.choose_action())
+    engine.log.finish(engine.outcome)
+    return get_result(engine, engine.outcome, engine.turn)
+
+
+def get_result(engine, outcome, turns):  # The outcome, turns, gold and exp of a finished battle for SimulationReport
+    gold, exp = 0, 0
+    if outcome is None:  # Neither side could finish the other off
+        outcome = "draw"
+    elif outcome == "win":
+        engine.level += 1  # generate_rewards raises the level before working out the rewards
+        gold, exp = engine.get_win_rewards(engine.roll_reward_number("win"))
+    else:
+        gold = -engine.roll_reward_number(outcome)  # The % of gold that would be lost
+    return outcome, turns, gold, exp
+
+
+def simulate_battles(task):  # Runs in a worker process, each task is a chunk of seeds for one game mode
+    hero_ids, level, game_mode, seeds, replays, basic_attacks = task
+    if not catalog.heroes:  # Workers that were spawned rather than forked need to load the game data themselves
+        catalog.load()
+    return game_mode, [simulate_battle(hero_ids, level, game_mode, seed, replays=replays, basic_attacks=basic_attacks)
+                       for seed in seeds]
+
+
+class SimulationReport:  # Collects the results of every battle played on one game mode
+    def __init__(self, game_mode, basic_attacks=False):
+        self.game_mode = game_mode
+        self.basic_attacks = basic_attacks  # Only comparable with other reports of basic attack battles
+        self.outcomes = {"win": 0, "lose": 0, "flee": 0, "draw": 0}
+        self.turns = []
+        self.gold = []  # Gold won
+        self.exp = []  # Exp won
+        self.gold_lost = []  # % of gold lost
+
+    def add(self, result):
+        outcome, turns, gold, exp = result
+        self.outcomes[outcome] += 1
+        self.turns.append(turns)
+        if outcome == "win":
+            self.gold.append(gold)
+            self.exp.append(exp)
+        elif outcome != "draw":
+            self.gold_lost.append(-gold)
+
+    @staticmethod
+    def summarise(values):  # mean, 10th, 50th and 90th percentile
+        if not values:
+            return "-"
+        values = sorted(values)
+        percentiles = [values[min(len(values) - 1, len(values) * percentage // 100)] for percentage in (10, 50, 90)]
+        return "mean {:.1f}, p10 {}, p50 {}, p90 {}".format(sum(values) / len(values), *percentiles)
+
+    def print_report(self):
+        battles = len(self.turns)
+        policy = " (basic attacks only, no special attacks or status effects)" if self.basic_attacks else ""
+        print(f"""
+        {self.game_mode.title()} - {battles} battles{policy}
+            Win rate : {100 * self.outcomes['win'] / battles:.1f}%  (lost {self.outcomes['lose']}, """
+              f"""unfinished {self.outcomes['draw']})
+            Average turns : {sum(self.turns) / battles:.1f}
+            Gold won : {self.summarise(self.gold)}
+            Exp won : {self.summarise(self.exp)}
+            Gold lost (%) : {self.summarise(self.gold_lost)}""")
+
+
+class Simulator:  # Plays thousands of seeded pve battles over every cpu core to help balance the monsters
+    def __init__(self, hero_ids, level, battles, processes=None, seed=0, kernel="objects", replays=None,
+                 basic_attacks=False):
+        self.hero_ids = hero_ids
+        self.level = level
+        self.battles = battles  # Number of battles for each game mode
+        self.processes = processes or multiprocessing.cpu_count()
+        self.seed = seed
+        self.game_modes = ["easy", "medium", "hard", "extreme"]
+        self.kernel = kernel  # "objects" plays every battle with BattleEngine, "numpy" plays them in lockstep batches
+        self.replays = replays  # Replay file that every battle is added to, or None
+        self.basic_attacks = basic_attacks or kernel == "numpy"  # The numpy kernel can only play basic attacks
+
+    def get_tasks(self):  # Splits the battles into chunks so that the workers aren't waiting on each other
+        chunk_size = max(1, min(1000, self.battles // (self.processes * 4)))
+        if self.kernel == "numpy":  # Bigger batches are what make the numpy kernel fast, and its results can't
+            chunk_size = 1000  # depend on the number of processes
+        tasks = []
+        for game_mode in self.game_modes:
+            # String seeds give every battle its own stream that doesn't depend on the number of processes
+            seeds = [f"{self.seed}:{game_mode}:{i}" for i in range(self.battles)]
+            for i in range(0, self.battles, chunk_size):
+                tasks.append((self.hero_ids, self.level, game_mode, seeds[i:i + chunk_size], self.replays,
+                              self.basic_attacks))
+        return tasks
+
+    def run(self):
+        reports = {game_mode: SimulationReport(game_mode, self.basic_attacks) for game_mode in self.game_modes}
+        with multiprocessing.Pool(self.processes) as pool:
+            worker = simulate_lockstep_battles if self.kernel == "numpy" else simulate_battles
+            for game_mode, results in pool.imap_unordered(worker, self.get_tasks()):
+                for result in results:
+                    reports[game_mode].add(result)
+        return reports
+
+
+# --------------------------------------------------------  NumPy Battle Kernel  ---------------------------------------
+def load_numpy():  # NumPy is optional and slow to import, so it is only loaded once the numpy kernel is asked for
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("The numpy kernel needs NumPy, install it with 'pip install numpy'") from None
+    return numpy
+
+
+class BattleArrays:  # Structure of arrays, one team's stats across many battles with a row per battle and slot per entity
+    stat_names = ["hp", "current_hp", "ph_atk", "ph_def", "sp_atk", "sp_def", "crit_rate", "crit_damage", "miss_rate"]
+
+    def __init__(self, numpy, teams):
+        self.numpy = numpy
+        slots = max(len(team) for team in teams)
+        self.stats = {stat: numpy.zeros((len(teams), slots)) for stat in self.stat_names}  # Padded slots have 0 hp
+        for row, team in enumerate(teams):
+            for column, entity in enumerate(team):
+                for stat in self.stat_names:
+                    self.stats[stat][row, column] = getattr(entity, stat)
+
+    def alive(self):
+        return self.stats["current_hp"] > 0
+
+    def gather(self, columns):  # The stats of one entity from every battle, columns holds a slot number for each row
+        rows = self.numpy.arange(len(columns))
+        return {stat: values[rows, columns] for stat, values in self.stats.items()}
+
+    def damage(self, columns, amounts):  # Entity.damage for one entity in every battle
+        rows = self.numpy.arange(len(columns))
+        current_hp = self.stats["current_hp"]
+        current_hp[rows, columns] = self.numpy.maximum(current_hp[rows, columns] - amounts, 0)
+
+
+class BattleKernel:  # The damage formulas of BattleRules worked out for every battle at once
+    def __init__(self, seed=None):
+        self.numpy = load_numpy()
+        self.random = self.numpy.random.default_rng(seed)
+
+    def randint(self, low, high, shape=None):  # Same as random.randint, both ends can be picked
+        return self.random.integers(low, self.numpy.add(high, 1), size=shape)
+
+    def attack_rolls(self, attacker):  # The draws of BattleRules.attack, in the order that it makes them
+        shape = attacker["ph_atk"].shape
+        additional_atk = self.numpy.rint(0.1 * attacker["ph_atk"])
+        crit_roll = self.randint(1, 100, shape)
+        var_atk = self.randint(self.numpy.rint(attacker["ph_atk"] - additional_atk),
+                               self.numpy.rint(attacker["ph_atk"] + additional_atk))
+        miss_roll = self.randint(1, 100, shape)
+        return crit_roll, var_atk, miss_roll
+
+    def get_crit_damage(self, crit_rate, crit_damage, crit_roll):
+        return self.numpy.where(crit_rate <= crit_roll, crit_damage / 100, 1)
+
+    def attack(self, attacker, defender, rolls=None):  # The damage BattleRules.attack deals in each battle
+        crit_roll, var_atk, miss_roll = self.attack_rolls(attacker) if rolls is None else rolls
+        crit_damage = self.get_crit_damage(attacker["crit_rate"], attacker["crit_damage"], crit_roll)
+        total_damage = self.numpy.rint(var_atk * crit_damage - 0.05 * defender["ph_def"])
+        return self.numpy.where(attacker["miss_rate"] >= miss_roll, 0, total_damage)
+
+    def aoe_attack(self, attacker, defenders, percentage, crit_rolls=None):  # The damage to every slot of the team
+        crit_rate, crit_damage = attacker["crit_rate"][:, None], attacker["crit_damage"][:, None]
+        if crit_rolls is None:  # One crit roll per defender, the same as BattleRules.aoe_attack
+            crit_rolls = self.randint(1, 100, defenders["sp_def"].shape)
+        crit_damage = self.get_crit_damage(crit_rate, crit_damage, crit_rolls)
+        damage = self.numpy.rint(attacker["sp_atk"][:, None] * (percentage * 0.01) - defenders["sp_def"] * 0.5)
+        return self.numpy.rint(damage * crit_damage)
+
+    def pick(self, choices):  # A random True column from each row, rows without one get column 0
+        scores = self.numpy.where(choices, self.random.random(choices.shape), -1)
+        return scores.argmax(axis=1)
+
+
+class LockstepBattles:  # Plays a batch of pve battles side by side, every battle moves forward one turn per step
+    # Only basic attacks are played, special attacks and status effects branch too much per entity to vectorise.
+    # Compare its results with BattleEngine(basic_attacks=True), not with full battles
+    def __init__(self, hero_ids, level, game_mode, seeds, kernel_seed=None):
+        self.kernel = BattleKernel(kernel_seed)
+        numpy = self.kernel.numpy
+        # The enemies come from the object engine so both kernels fight the same monsters for the same seeds
+        records = catalog.get_heroes(hero_ids)
+        self.engines = [BattleEngine([Hero(level, *records[hero_id]) for hero_id in hero_ids], None, "pve", seed,
+                                     game_mode, level) for seed in seeds]
+        self.heroes = BattleArrays(numpy, [engine.team_1 for engine in self.engines])
+        self.enemies = BattleArrays(numpy, [engine.team_2 for engine in self.engines])
+        self.game_mode = game_mode
+        self.outcomes = [None] * len(seeds)
+        self.turns = numpy.zeros(len(seeds), dtype=int)
+        self.target = numpy.full(len(seeds), -1)  # The enemies' common target in each battle, -1 until they have one
+
+    def enemy_target(self, heroes_alive):  # BattleRules.enemy_target for every battle, aggro needs special attacks
+        numpy = self.kernel.numpy
+        rows = numpy.arange(len(self.target))
+        # With a living target only easy picks again, the other game modes fall through to hero 0 like BattleRules does
+        has_target = (self.target >= 0) & heroes_alive[rows, numpy.maximum(self.target, 0)]
+        if self.game_mode == "easy":
+            self.target = numpy.where(has_target, self.kernel.pick(heroes_alive), 0)
+            return
+        number = numpy.zeros(len(self.target), dtype=int)
+        if self.game_mode == "medium":  # Hero 0 unless they are dead, then a random living hero
+            number = numpy.where(heroes_alive[:, 0], 0, self.kernel.pick(heroes_alive))
+        elif self.game_mode in ["hard", "extreme"]:  # The same linear search, one slot at a time across every battle
+            stats = self.heroes.stats
+            first, second = ("ph_def", "sp_def") if self.game_mode == "hard" else ("ph_atk", "sp_atk")
+            current_first, current_second = numpy.zeros(len(number)), numpy.zeros(len(number))
+            for i in range(stats[first].shape[1]):
+                if self.game_mode == "hard":  # Only heroes without any sp_atk can take over, just as in BattleRules
+                    better = ((stats[second][:, i] <= current_second) | (stats[first][:, i] <= current_first)) & \
+                             (stats["sp_atk"][:, i] == 0)
+                else:
+                    better = ((stats[second][:, i] >= current_second) | (stats[first][:, i] >= current_first)) & \
+                             heroes_alive[:, i]
+                chosen = ((current_first <= 0) & (current_second <= 0)) | better
+                current_first = numpy.where(chosen, stats[first][:, i], current_first)
+                current_second = numpy.where(chosen, stats[second][:, i], current_second)
+                number = numpy.where(chosen, i, number)
+        self.target = numpy.where(has_target, 0, number)
+
+    def enemy_choice(self, enemies_alive):  # BattleRules.enemy_choice, hard and extreme always send the strongest enemy
+        if self.game_mode in ["easy", "medium"]:
+            return self.kernel.pick(enemies_alive)
+        numpy = self.kernel.numpy
+        stats = self.enemies.stats
+        current_sp_atk, current_ph_atk = numpy.zeros(len(self.target)), numpy.zeros(len(self.target))
+        number = numpy.zeros(len(self.target), dtype=int)
+        for i in range(stats["sp_atk"].shape[1]):
+            chosen = (stats["sp_atk"][:, i] >= current_sp_atk) | (stats["ph_atk"][:, i] >= current_ph_atk)
+            current_sp_atk = numpy.where(chosen, stats["sp_atk"][:, i], current_sp_atk)
+            current_ph_atk = numpy.where(chosen, stats["ph_atk"][:, i], current_ph_atk)
+            number = numpy.where(chosen, i, number)
+        return number
+
+    def step(self):  # One turn of every battle that hasn't finished, like BattleEngine.step with only "attack" actions
+        numpy = self.kernel.numpy
+        running = numpy.array([outcome is None for outcome in self.outcomes])
+
+        heroes_alive, enemies_alive = self.heroes.alive(), self.enemies.alive()
+        hero = self.kernel.pick(heroes_alive)  # choose_action, a random hero hits the weakest enemy
+        target = numpy.where(enemies_alive, self.enemies.stats["current_hp"], numpy.inf).argmin(axis=1)
+        damage = self.kernel.attack(self.heroes.gather(hero), self.enemies.gather(target))
+        self.enemies.damage(target, numpy.where(running, damage, 0))
+
+        enemies_alive = self.enemies.alive()
+        attacking = running & enemies_alive.any(axis=1) & heroes_alive.any(axis=1)
+        self.enemy_target(heroes_alive)  # enemy_turn, only the attack half of it
+        enemy = self.enemy_choice(enemies_alive)
+        damage = self.kernel.attack(self.enemies.gather(enemy), self.heroes.gather(self.target))
+        self.heroes.damage(self.target, numpy.where(attacking, damage, 0))
+
+        self.turns += running
+        lost, won = ~self.heroes.alive().any(axis=1), ~self.enemies.alive().any(axis=1)
+        for i in numpy.flatnonzero(running):
+            if lost[i]:
+                self.outcomes[i] = "lose"
+            elif won[i]:
+                self.outcomes[i] = "win"
+
+    def play(self, max_turns=500):
+        for turn in range(max_turns):
+            if None not in self.outcomes:
+                break
+            self.step()
+        return [get_result(engine, outcome, int(turns))
+                for engine, outcome, turns in zip(self.engines, self.outcomes, self.turns)]
+
+
+def simulate_lockstep_battles(task):  # The numpy kernel's version of simulate_battles, the whole chunk is one batch
+    hero_ids, level, game_mode, seeds = task[:4]  # Lockstep battles can't be recorded as replays
+    if not catalog.heroes:
+        catalog.load()
+    kernel_seed = random.Random(seeds[0]).getrandbits(64)  # Every chunk gets its own numpy stream
+    return game_mode, LockstepBattles(hero_ids, level, game_mode, seeds, kernel_seed).play()
+
+
+def run_simulator(arguments):  # python R_RPG.py simulate --heroes 1 2 3 4 5 6 --level 10 --battles 10000
+    parser = argparse.ArgumentParser(prog="R_RPG.py simulate", description="Simulates pve battles on every game mode")
+    parser.add_argument("--heroes", type=int, nargs=6, default=[1, 6, 11, 16, 18, 19], help="hero ids of the team")
+    parser.add_argument("--level", type=int, default=10, help="level of the heroes and the enemies")
+    parser.add_argument("--battles", type=int, default=1000, help="battles to play on each game mode")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to every core")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kernel", choices=["objects", "numpy"], default="objects",
+                        help="numpy plays batches of battles with basic attacks only, it needs NumPy installed")
+    parser.add_argument("--replays", default=None, help="replay file to add every battle to, objects kernel only")
+    parser.add_argument("--basic-attacks", action="store_true",
+                        help="nobody uses special attacks, for comparing the objects kernel with the numpy one")
+    options = parser.parse_args(arguments)
+
+    if options.replays and options.basic_attacks:  # Replays are played again with special attacks allowed
+        parser.error("--replays can't be used with --basic-attacks")
+
+    if options.kernel == "numpy":
+        try:
+            load_numpy()  # Fails here rather than in every worker process
+        except RuntimeError as error:
+            parser.error(str(error))
+    colours.set_plain(True)  # Nobody reads the battle messages, so no escape codes are made for them
+    simulator = Simulator(options.heroes, options.level, options.battles, options.processes, options.seed,
+                          options.kernel, options.replays, options.basic_attacks)
+    start = time.perf_counter()
+    reports = simulator.run()
+    seconds = time.perf_counter() - start
+    for report in reports.values():
+        report.print_report()
+    total = options.battles * len(reports)
+    print(f"\n{total} battles in {seconds:.1f}s ({total / seconds:.0f} battles per second, "
+          f"{simulator.processes} processes, {simulator.kernel} kernel)")
+
+
+# -------------------------------------------------------------  Replays  ----------------------------------------------
+# A battle is a "battle" record followed by its header as JSON, then one record for each event and an "end" record
+replay_record = struct.Struct("<HBbbhiBB")  # turn, event, actor, target, sp_atk_id, amount, crit, detail
+replay_events = ["battle", "end", "attack action", "sp_atk action", "potion action", "flee action", "turn", "attack",
+                 "miss", "sp_atk", "status", "damage", "heal", "aggro", "aoe", "backfire", "combo", "effect removed",
+                 "defeated", "end of turn", "stat change", "stat reset", "miss rate", "potion", "mana"]
+replay_event_codes = {event_type: code for code, event_type in enumerate(replay_events)}
+replay_outcomes = [None, "win", "lose", "flee"]
+replay_stats = list(BaseStats._fields)
+replay_messages = {
+    "attack action": "Player: {actor} attacks {target}",
+    "sp_atk action": "Player: {actor} uses {sp_atk} on {target}",
+    "potion action": "Player: {actor} drinks potion {detail}",
+    "flee action": "Player: flees",
+    "turn": "------ {actor} ------",
+    "attack": "{actor} dealt {amount} damage to {target}{crit}",
+    "miss": "{actor} missed {target}",
+    "sp_atk": "{actor} has used {sp_atk} on {target}",
+    "status": "'{effect}' has been applied to {target}, {amount} damage{crit}",
+    "damage": "{actor} has dealt {amount} damage to {target}{crit}",
+    "heal": "{target} has been healed for {amount} hit points{crit}",
+    "aggro": "Enemies will now target {target}",
+    "aoe": "{actor} dealt {amount} damage to every enemy{crit}",
+    "backfire": "Backfire has dealt {amount} damage{crit}",
+    "combo": "'{effect}' has been added to {target}",
+    "effect removed": "'{effect}' has been removed from {target}",
+    "defeated": "{target} has been defeated",
+    "end of turn": "{target} received {amount} damage due to '{effect}'",
+    "stat change": "{target}'s {stat} is now {amount}",
+    "stat reset": "{target}'s {stat} has returned back to {amount}",
+    "miss rate": "{target} now has a {amount}% chance to miss an attack",
+    "potion": "{target}'s {stat} has been restored or increased",
+    "mana": "{actor} has used {amount} mana",
+    "end": "The battle is over: {outcome}"}
+
+
+class ReplayLog(BattleLog):  # Inheritance, packs every event into a replay record and passes it on to another log
+    def __init__(self, path, log):
+        self.path = path  # The records are only kept in memory when this is None, which is how replays are checked
+        self.log = log
+        self.battle = None
+        self.entities = []  # team 1 + team 2, events are recorded against an entity's position in here
+        self.effect_ids = {}
+        self.buffer = bytearray()  # Written in one go at the end so that a battle is never half in the file
+        self.header_size = 0
+
+    @property
+    def events(self):  # The headless engine reads back what happened from the log that it was given
+        return self.log.events
+
+    def start(self, battle):  # Polymorphism
+        self.battle = battle
+        self.entities = battle.team_1 + battle.team_2
+        self.effect_ids = {effect["status_name"]: status_id for status_id, effect in catalog.status_effects.items()}
+        header = json.dumps({"seed": battle.seed, "mode": battle.mode, "game_mode": battle.game_mode,
+                             "level": battle.level, "teams": [[self.get_entity_data(entity) for entity in team]
+                                                              for team in (battle.team_1, battle.team_2)]}).encode()
+        self.buffer = bytearray(replay_record.pack(0, replay_event_codes["battle"], -1, -1, 0, len(header), 0, 0))
+        self.buffer += header
+        self.header_size = len(self.buffer)
+
+    @staticmethod
+    def get_entity_data(entity):  # Everything needed to make the entity again: type, level, stats and special attacks
+        if isinstance(entity, Hero):
+            kind = "ai hero" if isinstance(entity, AiHero) else "hero"
+            return [kind, entity.level, list(entity.record), [sp_atk.id for sp_atk in entity.sp_atk_list]]
+        return ["enemy", entity.level, list(catalog.monsters[entity.monster_id]), None]
+
+    def record(self, event_type, message, **details):  # Polymorphism
+        self.log.record(event_type, message, **details)
+        if self.battle is None or event_type not in replay_event_codes:
+            return
+        actor = details.get("actor", details.get("attacker", details.get("entity")))
+        amount = 0
+        for key in ("damage", "amount", "new", "miss_rate", "mana_cost"):
+            if key in details:
+                amount = details[key]
+                break
+        detail = 0
+        if "stat" in details:
+            detail = replay_stats.index(details["stat"])
+        elif "effect" in details:
+            detail = self.effect_ids.get(details["effect"], 0)
+        self.add(event_type, self.get_position(actor), self.get_position(details.get("target")),
+                 details.get("sp_atk_id") or 0, amount, details.get("crit", False), detail)
+
+    def action(self, action_type, actor=None, target=None, sp_atk=None, number=0):  # Polymorphism
+        if self.battle is None:
+            return
+        sp_atk_id = 0
+        if sp_atk is not None:  # The position in the hero's list is what the headless engine needs
+            sp_atk_id, number = sp_atk.id, actor.sp_atk_list.index(sp_atk)
+        self.add(action_type + " action", self.get_position(actor), self.get_position(target), sp_atk_id, 0, False,
+                 number)
+
+    def get_position(self, entity):  # By identity, an entity's equal name or stats never makes it another one
+        for index, battle_entity in enumerate(self.entities):
+            if battle_entity is entity:
+                return index
+        return -1
+
+    def add(self, event_type, actor, target, sp_atk_id, amount, crit, detail):
+        self.buffer += replay_record.pack(self.battle.turn, replay_event_codes[event_type], actor, target, sp_atk_id,
+                                          round(amount), bool(crit), detail)
+
+    def finish(self, outcome):  # Polymorphism
+        if self.battle is None:
+            return
+        self.add("end", -1, -1, 0, 0, False, replay_outcomes.index(outcome))
+        if self.path:
+            with open(self.path, "ab") as replay_file:  # Append only, every battle goes on the end
+                replay_file.write(self.buffer)
+        self.battle = None
+
+
+class Replay:  # One battle read back from a replay file
+    def __init__(self, header, records, data):
+        self.header = header
+        self.records = records  # Unpacked replay_record tuples
+        self.data = data  # The packed records, compared byte for byte with a re-simulation
+        self.names = [entity[2][1] for team in header["teams"] for entity in team]
+
+    def get_outcome(self):
+        return replay_outcomes[self.records[-1][7]]
+
+    def get_teams(self):
+        teams = []
+        for team in self.header["teams"]:
+            entities = []
+            for kind, level, stats, sp_atk_ids in team:
+                if kind == "enemy":
+                    entities.append(Enemy(level, *stats))
+                elif kind == "ai hero":
+                    entities.append(AiHero(level, *stats, sp_atk_ids=sp_atk_ids))
+                else:
+                    entities.append(Hero(level, *stats, sp_atk_ids=sp_atk_ids))
+            teams.append(entities)
+        return teams
 
-menu = MainMenu()
+    def describe(self, record):
+        turn, event, actor, target, sp_atk_id, amount, crit, detail = record
+        sp_atk = catalog.sp_atks.get(sp_atk_id)
+        return replay_messages[replay_events[event]].format(
+            actor=self.names[actor] if actor >= 0 else "", target=self.names[target] if target >= 0 else "everyone",
+            sp_atk=sp_atk["sp_atk_name"] if sp_atk else "", amount=amount, crit=" (critical hit)" if crit else "",
+            effect=catalog.status_effects.get(detail, {}).get("status_name", ""), detail=detail + 1,
+            stat=replay_stats[detail] if detail < len(replay_stats) else "",
+            outcome=replay_outcomes[detail] if detail < len(replay_outcomes) else "")
+
+    def play(self, from_turn=0):  # Fast-forwards to the turn without playing anything before it or asking for input
+        header = self.header
+        print(f"{header['mode']} battle on {header['game_mode']} mode at level {header['level']}, seed {header['seed']}")
+        for record in self.records:
+            if record[0] >= from_turn:
+                print(f"{record[0]:>5}  {self.describe(record)}")
+
+    def get_action(self, engine, record):  # Turns an action record back into an action for BattleEngine.step
+        turn, event, actor, target, sp_atk_id, amount, crit, detail = record
+        team_size = len(engine.team_1)
+        actor = actor if actor < team_size else actor - team_size  # Positions are counted within each team
+        target = target if target < team_size else target - team_size
+        action_type = replay_events[event]
+        if action_type == "attack action":
+            return "attack", actor, target
+        elif action_type == "sp_atk action":
+            return "sp_atk", actor, detail, target
+        elif action_type == "potion action":
+            return "potion", engine.potion_list[detail], actor
+        return "flee",
+
+    def verify(self):  # Plays the battle again without a player, returns what came out differently or None
+        header = self.header
+        if header["seed"] is None:
+            return "the battle wasn't seeded so it can't be played again"
+        team_1, team_2 = self.get_teams()
+        if header["mode"] == "pve":  # The enemies were rolled from the battle's stream, so they have to be rolled again
+            team_2 = None
+        log = ReplayLog(None, EventLog())
+        engine = BattleEngine(team_1, team_2, header["mode"], header["seed"], header["game_mode"], header["level"], log)
+        try:
+            for record in self.records:
+                if replay_events[record[1]].endswith(" action"):
+                    engine.step(self.get_action(engine, record))
+        except ValueError as error:
+            return f"the actions could not be played again, {error}"
+        log.finish(engine.outcome)
+
+        data = bytes(log.buffer[log.header_size:])
+        if data == self.data:
+            return None
+        records = list(replay_record.iter_unpack(data))
+        for i in range(min(len(records), len(self.records))):
+            if records[i] != self.records[i]:
+                return (f"turn {self.records[i][0]}, expected '{self.describe(self.records[i])}' but got "
+                        f"'{self.describe(records[i])}'")
+        return f"expected {len(self.records)} records but got {len(records)}"
+
+
+def read_replays(path):  # Every battle in a replay file in the order they were played, a battle cut short is left out
+    with open(path, "rb") as replay_file:
+        data = replay_file.read()
+    replays = []
+    offset = 0
+    while offset + replay_record.size <= len(data):
+        header_record = replay_record.unpack_from(data, offset)
+        if replay_events[header_record[1]] != "battle":
+            raise ValueError(f"{path} is not a replay file, there is no battle at byte {offset}")
+        offset += replay_record.size
+        header = json.loads(data[offset:offset + header_record[5]])
+        offset += header_record[5]
+        start, records = offset, []
+        while offset + replay_record.size <= len(data):
+            record = replay_record.unpack_from(data, offset)
+            offset += replay_record.size
+            records.append(record)
+            if replay_events[record[1]] == "end":
+                replays.append(Replay(header, records, data[start:offset]))
+                break
+    return replays
+
+
+def run_replay(arguments):  # python R_RPG.py replay --list, --battle 3 --from-turn 10 or --verify
+    parser = argparse.ArgumentParser(prog="R_RPG.py replay", description="Plays back or checks recorded battles")
+    parser.add_argument("file", nargs="?", default=replay_path, help="replay file, defaults to the game's own one")
+    parser.add_argument("--battle", type=int, default=-1, help="which battle to play, -1 is the last one")
+    parser.add_argument("--from-turn", type=int, default=0, help="skips straight to this turn")
+    parser.add_argument("--list", action="store_true", help="lists every battle in the file")
+    parser.add_argument("--verify", action="store_true",
+                        help="plays every battle again without a player to check that it comes out the same")
+    options = parser.parse_args(arguments)
+
+    try:
+        replays = read_replays(options.file)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if options.list:
+        for i, replay in enumerate(replays):
+            header = replay.header
+            print(f"{i:>5}  {header['mode']:<4} {str(header['game_mode']):<8} level {header['level']:<4} "
+                  f"{replay.records[-1][0]:>4} turns  {str(replay.get_outcome()):<5} {len(replay.records)} events")
+    elif options.verify:
+        colours.set_plain(True)
+        failures = 0
+        for i, replay in enumerate(replays):
+            problem = replay.verify()
+            if problem is not None:
+                failures += 1
+                print(f"Battle {i}: {problem}")
+        print(f"{len(replays) - failures}/{len(replays)} battles played out the same")
+    elif replays:
+        replays[options.battle].play(options.from_turn)
+
+
+# ---------------------------------------------------------  Save Generator  -------------------------------------------
+# Fake save files are written in batches, each batch is one transaction with one executemany per table
+generator_inserts = {
+    "USER": """INSERT INTO USER (user_id, save_file_name, lvl, exp, gold, pvp_games_won, games_played, games_won,
+               games_fled, games_lost, enemies_defeated, bosses_defeated, potions_used, lesser_hp_potion,
+               medium_hp_potion, grand_hp_potion, ph_atk_potion, ph_def_potion, sp_atk_potion, sp_def_potion,
+               crit_chance_potion, crit_damage_potion)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "HEROES": """INSERT INTO HEROES (hero_id, user_id, hero_name, hp, ph_atk, ph_def, sp_atk, sp_def, crit_rate,
+                 crit_damage)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "HEROES_SP_ATK": """INSERT INTO HEROES_SP_ATK (hero_id, sp_atk_id)
+                        VALUES (?, ?)""",
+    "TEAMS": """INSERT INTO TEAMS (user_id, hero_id_1, hero_id_2, hero_id_3, hero_id_4, hero_id_5, hero_id_6)
+                VALUES (?, ?, ?, ?, ?, ?, ?)"""
+}
+
+
+class Distribution:  # A whole number distribution given on the command line, such as poisson:2 or uniform:0:100
+    kinds = {"fixed": 1, "uniform": 2, "poisson": 1, "exponential": 1, "pareto": 2}  # name -> number of arguments
+
+    def __init__(self, text):
+        name, *arguments = text.split(":")
+        if name not in self.kinds or len(arguments) != self.kinds[name]:
+            options = ", ".join(f"{kind}" + ":x" * count for kind, count in self.kinds.items())
+            raise argparse.ArgumentTypeError(f"'{text}' is not one of {options}")
+        try:
+            self.arguments = [float(argument) for argument in arguments]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"'{text}' has an argument that isn't a number")
+        self.name = name
+        self.text = text
+
+    def draw(self, dice):
+        if self.name == "fixed":
+            return int(self.arguments[0])
+        elif self.name == "uniform":  # uniform:low:high, both ends included
+            return dice.randint(int(self.arguments[0]), int(self.arguments[1]))
+        elif self.name == "poisson":  # poisson:mean, counting one event at a time is fine for the small means used here
+            mean = self.arguments[0]
+            if mean > 30:
+                return max(0, round(dice.gauss(mean, mean ** 0.5)))
+            limit, count, product = 2.718281828459045 ** -mean, 0, dice.random()
+            while product > limit:
+                count += 1
+                product *= dice.random()
+            return count
+        elif self.name == "exponential":  # exponential:mean, most players have a little and a few have a lot
+            return int(dice.expovariate(1 / self.arguments[0])) if self.arguments[0] > 0 else 0
+        else:  # pareto:alpha:scale, a long tail for things like gold
+            return int(self.arguments[1] * (dice.paretovariate(self.arguments[0]) - 1))
+
+    def __repr__(self):
+        return self.text
+
+
+class SaveGenerator:  # Bulk creates save files with heroes, special attacks and teams, to test every screen at scale
+    def __init__(self, seed, heroes, teams, levels, gold, games, batch_size):
+        self.user_data = database  # Aggregation
+        self.random = random.Random(seed)
+        self.shop = Shop(None)  # Aggregation, the heroes are rolled in the same way as the ones bought in the shop
+        self.shop.random = self.random
+        self.heroes = heroes  # Distributions of heroes and teams per save file and of each save file's progress
+        self.teams = teams
+        self.levels = levels
+        self.gold = gold
+        self.games = games
+        self.batch_size = batch_size
+        self.counts = {table: 0 for table in generator_inserts}
+
+    def make_user(self, user_id):
+        dice = self.random
+        level = self.levels.draw(dice)
+        games_played = self.games.draw(dice)
+        games_won = dice.randint(0, games_played)
+        games_fled = dice.randint(0, games_played - games_won)
+        games_lost = games_played - games_won - games_fled
+        potions = [dice.randint(0, 3) * dice.randint(0, 5) for i in range(9)]  # Most players hold on to a few
+        return (user_id, f"save_{user_id}", level, dice.randint(0, 99), self.gold.draw(dice),
+                dice.randint(0, games_won // 4), games_played, games_won, games_fled, games_lost,
+                games_won * dice.randint(3, 6), games_won // 10, dice.randint(0, games_played * 2), *potions)
+
+    def make_batch(self, user_id, hero_id, batch_size, built_in):
+        rows = {table: [] for table in generator_inserts}
+        for i in range(batch_size):
+            user_id += 1
+            rows["USER"].append(self.make_user(user_id))
+            owned = []
+            for number in range(self.heroes.draw(self.random)):
+                hero_id += 1
+                owned.append(hero_id)
+                stats = self.shop.generate_hero_stats()
+                rows["HEROES"].append((hero_id, user_id, f"Hero {number + 1}", *stats))
+                rows["HEROES_SP_ATK"].extend((hero_id, sp_atk_id) for sp_atk_id in self.shop.generate_special_attacks())
+            for number in range(self.teams.draw(self.random)):
+                rows["TEAMS"].append((user_id, *self.random.sample(built_in + owned, 6)))
+        return rows, user_id, hero_id
+
+    def generate(self, users):
+        conn = self.user_data.create_connection()
+        built_in = [row[0] for row in self.user_data.query("SELECT hero_id FROM HEROES WHERE user_id = 0")]
+        # The ids are handed out here so the special attacks and teams can refer to heroes before they are inserted
+        user_id = self.user_data.query("SELECT COALESCE(MAX(user_id), 0) FROM USER")[0][0]
+        hero_id = self.user_data.query("SELECT COALESCE(MAX(hero_id), 0) FROM HEROES")[0][0]
+        made = 0
+        start = time.perf_counter()
+        while made < users:
+            batch_size = min(self.batch_size, users - made)
+            rows, user_id, hero_id = self.make_batch(user_id, hero_id, batch_size, built_in)
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for table, insert in generator_inserts.items():
+                    cursor.executemany(insert, rows[table])
+                    self.counts[table] += len(rows[table])
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            conn.commit()
+            made += batch_size
+            seconds = time.perf_counter() - start
+            print(f"{made}/{users} save files ({made / seconds:.0f} per second)")
+        return time.perf_counter() - start
+
+
+def run_generator(arguments):  # python R_RPG.py generate --users 1000000 --heroes poisson:3 --gold pareto:1.5:500
+    parser = argparse.ArgumentParser(prog="R_RPG.py generate",
+                                     description="Adds fake save files to the database set by RPG_DATABASE")
+    parser.add_argument("--users", type=int, default=10000, help="save files to add")
+    parser.add_argument("--heroes", type=Distribution, default=Distribution("poisson:2"),
+                        help="bought heroes per save file")
+    parser.add_argument("--teams", type=Distribution, default=Distribution("poisson:1"), help="teams per save file")
+    parser.add_argument("--levels", type=Distribution, default=Distribution("exponential:15"))
+    parser.add_argument("--gold", type=Distribution, default=Distribution("pareto:1.5:2000"))
+    parser.add_argument("--games", type=Distribution, default=Distribution("exponential:40"),
+                        help="games played per save file, split at random between won, fled and lost")
+    parser.add_argument("--batch", type=int, default=50000, help="save files written in each transaction")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(arguments)
+
+    generator = SaveGenerator(options.seed, options.heroes, options.teams, options.levels, options.gold,
+                              options.games, max(options.batch, 1))
+    seconds = generator.generate(options.users)
+    rows = sum(generator.counts.values())
+    counts = ", ".join(f"{count} {table}" for table, count in generator.counts.items())
+    print(f"\n{counts} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):.0f} rows per second)")
+
+
+# ---------------------------------------------------------  SQL Trace Report  -----------------------------------------
+sql_report_keys = {
+    "fingerprint": lambda record: record["fingerprint"],
+    "caller": lambda record: record["caller"],
+    "screen": lambda record: record["screen"] or "(no screen)",
+    "turn": lambda record: f"{record['screen']} turn {record['turn']}" if record["turn"] is not None else None
+}
+
+
+def read_sql_trace(path):  # Returns the statements, and screen -> how many times it was shown
+    with open(path) as file:
+        lines = [json.loads(line) for line in file if line.strip()]
+    visits = {}
+    for line in lines:
+        if "statement" not in line:
+            visits[line["screen"]] = visits.get(line["screen"], 0) + 1
+    return [line for line in lines if "statement" in line], visits
+
+
+def run_sql_report(arguments):  # python R_RPG.py sql-report trace.jsonl --by fingerprint
+    parser = argparse.ArgumentParser(prog="R_RPG.py sql-report",
+                                     description="Sums up a trace written by playing with RPG_SQL_TRACE set")
+    parser.add_argument("file")
+    parser.add_argument("--by", choices=list(sql_report_keys), default="screen",
+                        help="what to group the statements by, turn only counts statements run during a battle")
+    parser.add_argument("--top", type=int, default=20, help="groups to show, the slowest in total first")
+    options = parser.parse_args(arguments)
+
+    try:
+        records, visits = read_sql_trace(options.file)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    groups = {}  # key -> [statements, screens, ms, rows, callers]
+    for record in records:
+        key = sql_report_keys[options.by](record)
+        if key is None:
+            continue
+        group = groups.setdefault(key, [0, set(), 0, 0, {}])
+        group[0] += 1
+        group[1].add(record["screen"])
+        group[2] += record["ms"]
+        group[3] += record["rows"]
+        group[4][record["caller"]] = group[4].get(record["caller"], 0) + 1
+
+    print(f"{len(records)} statements, {sum(record['ms'] for record in records):.1f} ms\n")
+    print(f"{'statements':>10} {'per visit':>9} {'total ms':>9} {'mean ms':>8} {'rows':>8}  {options.by}")
+    for key, (count, screens, ms, rows, callers) in sorted(groups.items(), key=lambda item: -item[1][2])[:options.top]:
+        # Every visit to the screens these ran in, so a screen that rarely runs a statement isn't made to look worse
+        screen_visits = sum(visits.get(screen, 0) for screen in screens)
+        per_visit = f"{count / screen_visits:>9.1f}" if screen_visits else f"{'-':>9}"
+        line = f"{count:>10} {per_visit} {ms:>9.2f} {ms / count:>8.3f} {rows:>8}  {key[:100]}"
+        if options.by != "caller":  # The function that ran most of them, which is where an N+1 loop would be
+            line += f"  <- {max(callers, key=callers.get)}"
+        print(line)
 
 
 # ---------------------------------------------------------  Functions/Procedures  -------------------------------------
@@ -2872,38 +4408,54 @@ menu = MainMenu()
 def right_response_list(text, array_list):
     while True:
         try:
-            response = input(text).strip().lower()
+            response = game_io.input(text).strip().lower()
             if response in array_list:
                 return response
             else:
-                print("Please enter the correct value")
-        except:
-            print("Something went wrong, please try again")
+                game_io.print("Please enter the correct value")
+        except ValueError:  # A bare except would also swallow ScriptFinished and Ctrl+C
+            game_io.print("Something went wrong, please try again")
 
 
 # This function makes sure that the number inputted is an integer in the correct range
 def right_format_response_number(text, lower_limit, upper_limit):
     while True:
         try:
-            print(text)
-            response = input("Enter a value to continue or enter 'no' to go back: ")
+            game_io.print(text)
+            response = game_io.input("Enter a value to continue or enter 'no' to go back: ")
             if response in negative_responses:  # to go back
                 return False
             elif lower_limit <= int(response) <= upper_limit:  # to enter a number in the correct range
                 return int(response)
             else:  # If the value is a number but not in range
-                print("Please enter the value within the correct range")
-        except:  # If the value entered is of an incorrect type
-            print("Please enter the data in the correct format")
+                game_io.print("Please enter the value within the correct range")
+        except ValueError:  # If the value entered is of an incorrect type
+            game_io.print("Please enter the data in the correct format")
 
 
 def response_check(text, list):
     while True:
-        response = input(text)
+        response = game_io.input(text)
         if response not in list:
             return response
 
 
 # ---------------------------------------------------------- Main Program ----------------------------------------------
-while True:
-    menu.menu()
+def main(arguments=None):  # Importing this file does nothing, the database is only touched once the game starts
+    arguments = sys.argv[1:] if arguments is None else arguments
+    catalog.load()  # All of the built-in game data is read in one go here
+    if len(arguments) > 0 and arguments[0] == "simulate":
+        run_simulator(arguments[1:])
+    elif len(arguments) > 0 and arguments[0] == "replay":
+        run_replay(arguments[1:])
+    elif len(arguments) > 0 and arguments[0] == "generate":
+        run_generator(arguments[1:])
+    elif len(arguments) > 0 and arguments[0] == "sql-report":
+        run_sql_report(arguments[1:])
+    else:
+        screens = ScreenManager()
+        screens.run()
+
+
+if __name__ == "__main__":  # Worker processes import this file, so they must not start the game
+    main()
@@ -0,0 +1,165 @@
+# Plays whole game flows through the real menus with scripted keystrokes, run with: python benchmarks/flows.py --flows 200
+#   flows       - create a save file, buy a hero, make a team with it, fight a pve battle until it is won or lost
+#                 (the battle menu is only ever given actions, never 5 to flee), then sell the hero,
+#                 delete the team and the save file so that every flow starts from the same database
+#   --fuzz      - types random keystrokes into every screen instead and reports each kind of crash it finds
+# Prints flows per second, SQL statements per flow and the p50/p99 time spent in each screen
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fight = "<fight>"  # Types random battle keystrokes until the battle screen is left
+fight_keys = ["1", "1", "1", "1", "1", "1", "2", "2", "3", "4", "5", "6", "h", "e", "y", "no"]
+action_keys = ["1", "1", "1", "1", "2", "2", "3", "4"]  # Used on the battle menu so that the flows never flee
+battle_menu = "Please enter a number between 1 and 5"  # Printed just before the battle menu's prompt
+fuzz_keys = ["1", "1", "2", "2", "3", "3", "4", "4", "5", "6", "7", "8", "y", "n", "no", "", "x", "-1", "100"]
+
+# Save 1 is one of the built-in save files, it has enough gold for thousands of flows
+flow = (["1", "flow save", ""]  # New game
+        + ["2", "1"]  # Load save 1
+        + ["3", "2", "y", "Flow Hero", ""]  # Shop, buy a hero, back to the game menu
+        + ["5", "3", "1", "6", "11", "16", "18", "20", ""]  # Teams, create a team with the new hero as hero 20
+        + ["5", "1", "1", "1", "2", fight]  # Leave the teams, battle a monster on easy with team 2
+        + ["3", "3", "1", "y", "", "5"]  # Shop, sell the hero, back to the game menu
+        + ["5", "2", "2", "y", "", "5"]  # Teams, delete team 2, back to the game menu
+        + ["6", "4", "4"])  # Back to the main menu, delete save 4 which is the one made at the start
+
+
+def percentile(times, fraction):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+
+class FlowRunner:  # Runs the game's ScreenManager one screen at a time, timing each screen and counting the SQL
+    def __init__(self, R_RPG, seed):
+        self.R_RPG = R_RPG
+        self.random = random.Random(seed)
+        self.screen = None
+        self.game_io = None
+        self.counting = True
+        self.screen_times = {}  # screen name -> seconds for each visit
+        self.statements = 0
+        R_RPG.connection_pool.get_connection().set_trace_callback(self.count_statement)
+
+    def count_statement(self, statement):  # Statements run by a trigger are reported with a "-- TRIGGER" comment
+        if self.counting and not statement.startswith("--"):
+            self.statements += 1
+
+    def type_script(self, script):
+        for keystroke in script:
+            if keystroke == fight:
+                while self.screen == "battle":
+                    if battle_menu in self.game_io.get_last_lines(2)[0]:
+                        yield self.random.choice(action_keys)
+                    else:
+                        yield self.random.choice(fight_keys)
+            else:
+                yield keystroke
+
+    def run(self, game_io):  # Returns the error that stopped the flow, or None if it ran to the end of the script
+        self.R_RPG.game_io = self.game_io = game_io
+        screens = self.R_RPG.ScreenManager()
+        state = ("main menu", None)
+        try:
+            while state is not None:
+                self.screen = state[0]
+                start = time.perf_counter()
+                try:
+                    state = screens.show(state)
+                finally:
+                    self.screen_times.setdefault(self.screen, []).append(time.perf_counter() - start)
+        except self.R_RPG.ScriptFinished:
+            return None
+        except Exception as error:
+            return error
+        return None
+
+    def reset_save(self):  # Battles change save 1's gold and level, so every flow puts them back first
+        self.counting = False
+        self.R_RPG.database.execute("UPDATE USER SET gold = 2300000, lvl = 3000 WHERE user_id = 1")
+        self.counting = True
+
+    def print_report(self, flows, seconds, keystrokes):
+        print(f"{flows} flows in {seconds:.2f}s ({flows / seconds:.1f} flows per second)")
+        print(f"{self.statements / flows:.1f} SQL statements and {keystrokes / flows:.1f} keystrokes per flow")
+        print(f"\n{'screen':<12} {'visits':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        every_visit = []
+        for name, times in self.screen_times.items():
+            every_visit.extend(times)
+            print(f"{name:<12} {len(times):>7} {1000 * percentile(times, 0.5):9.3f} {1000 * percentile(times, 0.99):9.3f}")
+        print(f"{'all':<12} {len(every_visit):>7} {1000 * percentile(every_visit, 0.5):9.3f} "
+              f"{1000 * percentile(every_visit, 0.99):9.3f}")
+
+
+def run_flows(R_RPG, runner, options):
+    # Team 1 can't be deleted from the teams menu, so save 1 is given a team up front and the flows use team 2
+    R_RPG.database.execute("INSERT INTO TEAMS (user_id, hero_id_1, hero_id_2, hero_id_3, hero_id_4, hero_id_5, "
+                           "hero_id_6) VALUES (1, 1, 6, 11, 16, 18, 19)")
+    keystrokes = 0
+    start = time.perf_counter()
+    for number in range(options.flows):
+        runner.reset_save()
+        game_io = R_RPG.ScriptedIO(runner.type_script(flow), echo=options.echo)
+        error = runner.run(game_io)
+        keystrokes += game_io.keystrokes_typed
+        if error is not None:
+            print(f"Flow {number} crashed at: {game_io.get_last_line()!r}")
+            traceback.print_exception(error)
+            sys.exit(1)
+    return time.perf_counter() - start, keystrokes
+
+
+def run_fuzz(R_RPG, runner, options):
+    crashes = {}  # (error type, file, line) -> [count, first error]
+    keystrokes = 0
+    start = time.perf_counter()
+    for number in range(options.flows):
+        script = [runner.random.choice(fuzz_keys) for keystroke in range(options.keystrokes)]
+        game_io = R_RPG.ScriptedIO(script, echo=options.echo)
+        error = runner.run(game_io)
+        keystrokes += game_io.keystrokes_typed
+        if error is not None:
+            frame = traceback.extract_tb(error.__traceback__)[-1]
+            crash = crashes.setdefault((type(error).__name__, os.path.basename(frame.filename), frame.lineno),
+                                       [0, error])
+            crash[0] += 1
+    seconds = time.perf_counter() - start
+    for (name, file_name, line), (count, error) in sorted(crashes.items(), key=lambda item: -item[1][0]):
+        print(f"{count:>5} x {name} at {file_name} line {line}: {error}")
+    print(f"{len(crashes)} kinds of crash in {options.flows} fuzzed flows\n")
+    return seconds, keystrokes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays scripted game flows through the real menus")
+    parser.add_argument("--flows", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fuzz", action="store_true", help="types random keystrokes instead of the scripted flow")
+    parser.add_argument("--keystrokes", type=int, default=300, help="keystrokes in each fuzzed flow")
+    parser.add_argument("--echo", action="store_true", help="shows the game as it is played")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["RPG_DATABASE"] = os.path.join(directory, "flows_database")
+        os.environ["RPG_REPLAYS"] = os.path.join(directory, "flows_replays")
+        os.environ["RPG_SEED"] = str(options.seed)  # Every battle and shop visit plays out the same way each run
+        sys.path.insert(0, repo)
+        import R_RPG
+        R_RPG.catalog.load()
+
+        runner = FlowRunner(R_RPG, options.seed)
+        if options.fuzz:
+            seconds, keystrokes = run_fuzz(R_RPG, runner, options)
+        else:
+            seconds, keystrokes = run_flows(R_RPG, runner, options)
+        runner.print_report(options.flows, seconds, keystrokes)
+        R_RPG.connection_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Checks the numpy battle kernel against the object engine and times both, run with: python benchmarks/kernel.py
+#   same draws  - the kernel's dice rolls are fed into BattleRules.attack and aoe_attack, the damage must match exactly
+#   outcomes    - whole battles on every game mode, the kernel's win rate and turns must match BattleEngine's when it
+#                 plays basic attacks only too. The dice differ, so only the totals are compared
+#   battles     - pve battles per second for the object engine and for the numpy kernel playing them in lockstep
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ScriptedRandom:  # Stands in for BattleRules.random, hands back rolls that were already made by the kernel
+    def __init__(self, rolls):
+        self.rolls = list(rolls)
+
+    def randint(self, low, high):
+        roll = int(self.rolls.pop(0))
+        if not low <= roll <= high:
+            raise ValueError(f"The roll {roll} is not between {low} and {high}")
+        return roll
+
+
+def check_same_draws(R_RPG, battles, seed):  # Returns how many battles the kernel and the object engine disagreed on
+    dice = random.Random(seed)
+    hero_stats, monster_stats = list(R_RPG.catalog.heroes.values()), list(R_RPG.catalog.monsters.values())
+    heroes = [R_RPG.Hero(dice.randint(1, 30), *dice.choice(hero_stats)) for battle in range(battles)]
+    teams = [[R_RPG.Enemy(dice.randint(1, 30), *dice.choice(monster_stats)) for enemy in range(dice.randint(3, 6))]
+             for battle in range(battles)]
+    for entity in heroes + [enemy for team in teams for enemy in team]:
+        entity.add_modifier("miss_rate", dice.choice([0, 0, 20, 50]))  # So that misses are checked too
+
+    numpy = R_RPG.load_numpy()
+    kernel = R_RPG.BattleKernel(seed)
+    attackers = R_RPG.BattleArrays(numpy, [[hero] for hero in heroes]).gather(numpy.zeros(battles, dtype=int))
+    defenders = R_RPG.BattleArrays(numpy, teams)
+    rolls = kernel.attack_rolls(attackers)
+    attack_damage = kernel.attack(attackers, defenders.gather(numpy.zeros(battles, dtype=int)), rolls)
+    sp_atk = R_RPG.AOESpecialAttack(next(sp_atk_id for sp_atk_id in R_RPG.catalog.sp_atks
+                                         if "aoe" in R_RPG.catalog.get_sp_atk_details(sp_atk_id)[1:3]))
+    crit_rolls = kernel.randint(1, 100, defenders.stats["sp_def"].shape)
+    aoe_damage = kernel.aoe_attack(attackers, defenders.stats, sp_atk.percentage, crit_rolls)
+
+    mismatches = 0
+    for battle in range(battles):
+        rules = R_RPG.BattleRules(None, R_RPG.EventLog())
+        team = teams[battle]
+        rules.random = ScriptedRandom(roll[battle] for roll in rolls)
+        rules.attack(heroes[battle], team[0])
+        first_hp = team[0].current_hp
+        rules.random = ScriptedRandom(crit_rolls[battle][:len(team)])
+        rules.aoe_attack(heroes[battle], team, sp_atk)
+
+        expected_hp = max(team[0].hp - attack_damage[battle], 0)
+        expected_team = [max(enemy_hp - damage, 0) for enemy_hp, damage in
+                         zip([first_hp] + [enemy.hp for enemy in team[1:]], aoe_damage[battle])]
+        if first_hp != expected_hp or [enemy.current_hp for enemy in team] != expected_team:
+            mismatches += 1
+    return mismatches
+
+
+def check_outcomes(R_RPG, battles, seed):  # Returns the game modes where the two kernels' battles came out differently
+    hero_ids, level = [1, 6, 11, 16, 18, 19], 10
+    different = []
+    for game_mode in ["easy", "medium", "hard", "extreme"]:
+        seeds = [f"{seed}:{game_mode}:{i}" for i in range(battles)]
+        objects = [R_RPG.simulate_battle(hero_ids, level, game_mode, battle_seed, basic_attacks=True)
+                   for battle_seed in seeds]
+        lockstep = R_RPG.simulate_lockstep_battles((hero_ids, level, game_mode, seeds))[1]
+        (objects_wins, objects_turns), (lockstep_wins, lockstep_turns) = [
+            (100 * sum(result[0] == "win" for result in results) / battles, sum(result[1] for result in results) / battles)
+            for results in (objects, lockstep)]
+        same = abs(objects_wins - lockstep_wins) <= 4 and abs(objects_turns - lockstep_turns) <= 0.05 * objects_turns
+        if not same:
+            different.append(game_mode)
+        print(f"outcomes     {game_mode:<8} win rate {objects_wins:5.1f}% / {lockstep_wins:5.1f}%, "
+              f"turns {objects_turns:5.1f} / {lockstep_turns:5.1f}{'' if same else '  different'}")
+    return different
+
+
+def time_battles(R_RPG, battles, seed):
+    hero_ids, level = [1, 6, 11, 16, 18, 19], 10
+    seeds = [f"{seed}:easy:{i}" for i in range(battles)]
+    start = time.perf_counter()
+    for battle_seed in seeds:
+        R_RPG.simulate_battle(hero_ids, level, "easy", battle_seed)
+    objects = time.perf_counter() - start
+    start = time.perf_counter()
+    R_RPG.simulate_lockstep_battles((hero_ids, level, "easy", seeds))
+    lockstep = time.perf_counter() - start
+    print(f"objects      {battles / objects:9.0f} battles per second")
+    print(f"numpy        {battles / lockstep:9.0f} battles per second (basic attacks only)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks and times the numpy battle kernel")
+    parser.add_argument("--battles", type=int, default=2000)
+    parser.add_argument("--outcome-battles", type=int, default=1000, help="battles on each game mode for outcomes")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["RPG_DATABASE"] = os.path.join(directory, "kernel_database")
+        sys.path.insert(0, repo)
+        import R_RPG
+        R_RPG.catalog.load()
+
+        mismatches = check_same_draws(R_RPG, options.battles, options.seed)
+        print(f"same draws   {options.battles - mismatches}/{options.battles} battles dealt the same damage")
+        different = check_outcomes(R_RPG, options.outcome_battles, options.seed)
+        time_battles(R_RPG, options.battles, options.seed)
+        R_RPG.connection_pool.close_all()
+        if mismatches or different:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Measures how much memory each hero and enemy takes up, run with: python benchmarks/memory.py --entities 5000
+# Simulations keep thousands of entities alive at once, so this is the number to watch when adding attributes
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(name, build, count):  # Bytes still allocated per entity once "count" of them have been built
+    entities = []
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(count):
+        entities.append(build(i))
+    seconds = time.perf_counter() - start
+    used_bytes = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+    print(f"{name:<8} {used_bytes / count:9.0f} bytes each   {1000000 * seconds / count:7.1f} us each to build")
+    return entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the memory used by each battle entity")
+    parser.add_argument("--entities", type=int, default=5000)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["RPG_DATABASE"] = os.path.join(directory, "memory_database")
+        sys.path.insert(0, repo)
+        import R_RPG
+        R_RPG.catalog.load()
+
+        heroes = list(R_RPG.catalog.heroes.values())
+        monsters = list(R_RPG.catalog.monsters.values())
+        measure("hero", lambda i: R_RPG.Hero(10, *heroes[i % len(heroes)]), options.entities)
+        measure("ai hero", lambda i: R_RPG.AiHero(10, *heroes[i % len(heroes)]), options.entities)
+        measure("enemy", lambda i: R_RPG.Enemy(10, *monsters[i % len(monsters)]), options.entities)
+        R_RPG.connection_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Measures how long the game takes to start, run with: python benchmarks/startup.py --runs 20
+#   import      - "import R_RPG" in a new interpreter, minus the time an empty interpreter takes to start
+#   cold start  - launching the game with a new save file until the main menu is shown
+#   warm start  - the same again with a save file that already exists
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+game_file = os.path.join(repo, "R_RPG.py")
+first_menu = "WELCOME TO R.RPG"
+
+
+def time_command(arguments, environment):
+    start = time.perf_counter()
+    subprocess.run(arguments, env=environment, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_to_first_menu(environment, directory):  # Starts the game, waits for the main menu and then picks "7. Exit"
+    start = time.perf_counter()
+    game = subprocess.Popen([sys.executable, "-u", game_file], env=environment, cwd=directory,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    for line in game.stdout:
+        if first_menu in line:
+            break
+    seconds = time.perf_counter() - start
+    game.communicate("7\n", timeout=30)
+    return seconds
+
+
+def summarise(name, times):
+    times = [seconds * 1000 for seconds in times]
+    print(f"{name:<12} min {min(times):7.1f} ms   median {statistics.median(times):7.1f} ms   "
+          f"max {max(times):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times importing and starting R.RPG")
+    parser.add_argument("--runs", type=int, default=10)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        environment = dict(os.environ, PYTHONPATH=repo)
+        environment["RPG_DATABASE"] = os.path.join(directory, "import_database")
+        empty = [time_command([sys.executable, "-c", "pass"], environment) for run in range(options.runs)]
+        imports = [time_command([sys.executable, "-c", "import R_RPG"], environment) for run in range(options.runs)]
+        if os.path.exists(environment["RPG_DATABASE"]):
+            print("Importing the game created a save file, importing should not touch the database")
+
+        cold = []
+        for run in range(options.runs):
+            environment["RPG_DATABASE"] = os.path.join(directory, f"cold_database_{run}")
+            cold.append(time_to_first_menu(environment, directory))
+        warm = [time_to_first_menu(environment, directory) for run in range(options.runs)]  # Reuses the last save file
+
+    summarise("import", [imported - baseline for imported, baseline in zip(sorted(imports), sorted(empty))])
+    summarise("cold start", cold)
+    summarise("warm start", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Times the real game code without a player and compares it with a stored baseline, run with: python benchmarks/suite.py
+#   --save          - writes this run as the new baseline instead of comparing against it
+#   --threshold 0.2 - a benchmark that is more than 20% slower than its baseline fails the run
+#   --only NAME     - runs just the benchmarks whose names contain NAME
+# Every benchmark repeats one operation until it has run for --seconds and keeps the fastest of --repeats runs, the
+# benchmarks take turns so that noise is spread over all of them. Baselines are only comparable on the machine and
+# python version that made them, raise --threshold on a busy machine
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+baseline_file = os.path.join(repo, "benchmarks", "baseline.json")
+hero_ids = [1, 6, 11, 16, 18, 19]
+rival_ids = [2, 7, 12, 17, 3, 8]
+level = 10
+seeds = range(8)  # Battles and enemies are random, so each operation works through the same 8 seeds
+
+
+def get_number(operation, seconds):  # How many calls make one run last long enough to time, like timeit's autorange
+    number = 1
+    while True:
+        taken = time_calls(operation, number)
+        if taken >= seconds:
+            return number
+        number *= 2 if taken == 0 else max(2, min(10, int(seconds / taken) + 1))
+
+
+def time_calls(operation, number):
+    start = time.perf_counter()
+    for i in range(number):
+        operation()
+    return time.perf_counter() - start
+
+
+def time_benchmarks(benchmarks, seconds, repeats):  # The fastest time for one call of each operation, in seconds
+    numbers = {name: get_number(operation, seconds) for name, operation in benchmarks.items()}
+    fastest = {name: float("inf") for name in benchmarks}
+    for repeat in range(repeats):  # Takes turns, so a busy moment on the machine doesn't land on just one benchmark
+        for name, operation in benchmarks.items():
+            fastest[name] = min(fastest[name], time_calls(operation, numbers[name]) / numbers[name])
+    return fastest
+
+
+def get_benchmarks(R_RPG):  # name -> operation, each operation plays one unit of work against the real game code
+    class DiscardLog(R_RPG.EventLog):  # Inheritance, nothing is printed or kept so the log doesn't grow
+        def record(self, event_type, message, **details):
+            pass
+
+    def play_keystrokes(screen, keystrokes):
+        R_RPG.game_io = R_RPG.ScriptedIO(keystrokes)
+        try:
+            screen()
+        except R_RPG.ScriptFinished:
+            raise RuntimeError(f"The benchmark ran out of keystrokes at: {R_RPG.game_io.get_last_line()!r}")
+
+    def construct_heroes():
+        for hero_id in hero_ids:
+            R_RPG.Hero(level, *R_RPG.catalog.heroes[hero_id])
+
+    def generate_enemies(game_mode):  # Every call plays the same seeds, so every run does exactly the same work
+        rules = R_RPG.BattleRules(None, DiscardLog())
+        rules.level = level
+        rules.game_mode = game_mode
+
+        def operation():
+            for seed in seeds:
+                rules.set_seed(seed)
+                rules.generate_enemies(game_mode)
+        return operation
+
+    def play_pve_battles():
+        for seed in seeds:
+            R_RPG.simulate_battle(hero_ids, level, "medium", seed)
+
+    def play_2p_battles():
+        for seed in seeds:
+            team_1 = [R_RPG.Hero(level, *R_RPG.catalog.heroes[hero_id]) for hero_id in hero_ids]
+            team_2 = [R_RPG.Hero(level, *R_RPG.catalog.heroes[hero_id]) for hero_id in rival_ids]
+            engine = R_RPG.BattleEngine(team_1, team_2, "2p", seed, "easy", level, DiscardLog())
+            while engine.outcome is None and engine.turn < 500:
+                engine.step(engine.choose_action())
+
+    # Every entity carries one of each status effect, none of them ever wear off
+    stacked = R_RPG.BattleEngine([R_RPG.Hero(level, *R_RPG.catalog.heroes[hero_id]) for hero_id in hero_ids],
+                                 None, "pve", 0, "hard", level, DiscardLog())
+    for entity in stacked.team_1 + stacked.team_2:
+        for status_id in range(1, 12):
+            effect = R_RPG.Effect(status_id)
+            entity.effect_count.add(effect.name, effect, 10 ** 9)
+
+    # Save 1 is a built-in save file, its gold is topped up so the shop never turns it away
+    R_RPG.database.execute("UPDATE USER SET gold = 1000000000000 WHERE user_id = 1")
+    shop = R_RPG.Shop(1)
+
+    def buy_and_sell_hero():
+        play_keystrokes(shop.menu, ["2", "y", "Benchmark Hero", ""])
+        play_keystrokes(shop.menu, ["3", "1", "y", ""])
+
+    benchmarks = {
+        "hero construction": construct_heroes,
+        "enemies easy": generate_enemies("easy"),
+        "enemies medium": generate_enemies("medium"),
+        "enemies hard": generate_enemies("hard"),
+        "enemies extreme": generate_enemies("extreme"),
+        "pve battles": play_pve_battles,
+        "2p battles": play_2p_battles,
+        "end of turn stacked effects": stacked.end_of_turn,
+        "leaderboard": lambda: play_keystrokes(R_RPG.Leaderboard().present_stats, ["1", "next", "next", "no"]),
+        "shop buy potion": lambda: play_keystrokes(shop.menu, ["1", "1", "1", ""]),
+        "shop buy and sell hero": buy_and_sell_hero
+    }
+    return benchmarks
+
+
+def get_machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.machine()}
+
+
+def compare(results, baseline, threshold):  # Prints each result against its baseline, returns the names that got slower
+    regressions = []
+    print(f"{'benchmark':<30} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<30} {'-':>12} {1000000 * seconds:>10.1f}us {'new':>8}")
+            continue
+        change = seconds / baseline[name]["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  slower"
+        print(f"{name:<30} {1000000 * baseline[name]['seconds']:>10.1f}us {1000000 * seconds:>10.1f}us "
+              f"{100 * change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the game code and compares it with a stored baseline")
+    parser.add_argument("--baseline", default=baseline_file)
+    parser.add_argument("--save", action="store_true", help="stores this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="fraction slower that counts as a regression")
+    parser.add_argument("--only", default="", help="only runs benchmarks with this in their name")
+    parser.add_argument("--seconds", type=float, default=0.2, help="how long each timed run lasts")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--users", type=int, default=20000, help="generated save files for the leaderboard")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["RPG_DATABASE"] = os.path.join(directory, "suite_database")
+        os.environ["RPG_REPLAYS"] = ""  # Battles played through the menus would otherwise be recorded
+        os.environ["RPG_SEED"] = "0"
+        sys.path.insert(0, repo)
+        import R_RPG
+        R_RPG.catalog.load()
+        distributions = [R_RPG.Distribution(text) for text in
+                         ["poisson:2", "poisson:1", "exponential:15", "pareto:1.5:2000", "exponential:40"]]
+        with contextlib.redirect_stdout(io.StringIO()):  # Keeps the generator's progress lines out of the results
+            R_RPG.SaveGenerator(0, *distributions, 50000).generate(options.users)
+
+        benchmarks = {name: operation for name, operation in get_benchmarks(R_RPG).items() if options.only in name}
+        results = time_benchmarks(benchmarks, options.seconds, options.repeats)
+        R_RPG.connection_pool.close_all()
+
+    if options.save:
+        with open(options.baseline, "w") as file:
+            json.dump({"machine": get_machine(), "benchmarks": {name: {"seconds": seconds}
+                                                                for name, seconds in results.items()}}, file, indent=2)
+        print(f"Saved {len(results)} results to {options.baseline}")
+        return
+
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {"machine": get_machine(), "benchmarks": {}}
+        print(f"There is no baseline at {options.baseline} yet, run with --save to make one")
+    if baseline["machine"] != get_machine():
+        print(f"The baseline was made on {baseline['machine']}, the numbers may not be comparable\n")
+    regressions = compare(results, baseline["benchmarks"], options.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks are more than {100 * options.threshold:.0f}% slower: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()